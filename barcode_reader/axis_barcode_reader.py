@@ -1,66 +1,108 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import io
+import argparse
 import logging
+import multiprocessing
+import os
+import signal
+import sys
 import threading
 import time
-import tkinter as tk
-from tkinter import scrolledtext, ttk, filedialog
+from collections import deque
+
+# Tkinter/ImageTk só são necessários na interface; o modo headless roda sem eles
+try:
+    import tkinter as tk
+    from tkinter import scrolledtext, ttk, filedialog
+    from PIL import Image, ImageTk
+except ImportError:  # pragma: no cover - ambientes sem Tk (linha de produção headless)
+    tk = None
 
-from PIL import Image, ImageTk
 import cv2
-import os
-os.environ.setdefault("ZBAR_DEBUG", "0")
-from pyzbar.pyzbar import decode
-from urllib.parse import quote
-import csv
-from openpyxl import Workbook
-import requests
-from requests.auth import HTTPDigestAuth
+import numpy as np
+
+from camera_capabilities import DEFAULT_CACHE_PATH, DEFAULT_TTL, CapabilityCache
+from capture_backends import CAPTURE_BACKENDS
+from code_dedup import CodeDeduplicator, parse_confirm
+from code_geometry import scale_code
+from decode_options import add_decode_arguments, build_decode_stages
+from scan_history import ScanHistory
+from scan_store import ScanStore
+from scanner_engine import LoggingListener, ScannerEngine, ScannerListener
+from supervisor import CameraSupervisor, load_camera_configs
+from trigger import TRIGGER_EDGES, TRIGGER_SOURCES, HttpTriggerServer, TriggerController
+from decode_pool import ProcessDecodePool
+from metrics import MetricsServer
+from motion_gate import MotionGate
+from stream_profiles import DUAL_SOURCES
+
+# Tabela de leituras e log de eventos: só as linhas mais recentes ficam na tela
+LIVE_VIEW_ROWS = 500
+RESULT_LOG_LINES = 1000
+# Taxa máxima de atualização da visualização (independente da taxa de decodificação)
+PREVIEW_FPS = 10
+# Eventos do motor (inclusive o quadro da visualização) são acumulados e aplicados na interface uma vez por tick
+UI_TICK_MS = 1000 // PREVIEW_FPS
+# Intervalo de atualização das métricas na barra de status
+METRICS_REFRESH_S = 1.0
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class AxisCameraBarcodeScannerApp:
+class AxisCameraBarcodeScannerApp(ScannerListener):
     def __init__(self, root):
         self.root = root
         self.root.title("Leitor de Códigos - Câmera Axis")
         self.root.geometry("800x600")
         
-        # Configurações da câmera (serão preenchidas pelo usuário)
-        self.camera_ip = ""
-        self.camera_username = ""
-        self.camera_password = ""
-        self.connected = False  # Estado da conexão RTSP
-        self.scanning = False   # Estado da leitura de códigos
-        self.last_code = None
-        self.last_scan_time = 0
-        self.scan_cooldown = 30  # segundos entre leituras para evitar duplicatas
-        self.current_image = None  # Para armazenar a imagem atual
-        self.current_frame_cv = None  # Para armazenar o último frame OpenCV
-        self.cap = None  # RTSP VideoCapture
-        
-        # Variáveis para controle de thread de captura (baixa latência)
-        self.frame_lock = threading.Lock()
-        self.new_frame_event = threading.Event()
-        self.latest_frame = None
+        # Motor de leitura (captura, decodificação, deduplicação e relatórios)
+        # A janela é apenas mais um assinante dos eventos do motor
+        self.engine = ScannerEngine(motion_gate=MotionGate(enabled=False), capability_cache=CapabilityCache())
+        self.engine.add_listener(self)
+        self.show_video = True
+
+        # Visualização: a thread de vídeo prepara o quadro reduzido em buffers reaproveitados
+        # e a thread principal só faz paste em um único PhotoImage
+        self.preview_interval = 1.0 / PREVIEW_FPS
+        self.last_preview = 0.0
+        self.preview_pending = False    # quadro preparado aguardando o tick da interface
+        self.preview_ready = None       # (rgb, x_offset, y_offset)
+        self.preview_resized = None
+        self.preview_rgb = None
+        self.preview_key = None         # (largura, altura, canvas) da última geometria calculada
+        self.preview_geometry = None    # (nova largura, nova altura, x_offset, y_offset)
+        self.canvas_size = (640, 480)   # atualizado pelo evento <Configure> (thread principal)
+        self.photo = None
+        self.canvas_image_id = None
         
         # Controle de Zoom (API)
         self.zoom_level = 0
         self.zoom_timer = None
-        
-        # Controle de duplicidade por código (tempo e presença)
-        self.code_last_seen = {}      # mapa: codigo -> último timestamp visto
-        self.code_last_emitted = {}   # mapa: codigo -> último timestamp emitido
-        self.code_stats = {}
-        self.scanned_records = []
-        self.live_report_path = None
-        self.live_report_file = None
-        self.live_report_writer = None
+
+        # Filas preenchidas pelas threads do motor e esvaziadas no tick da interface
+        # (append/popleft de deque são atômicos; maxlen descarta o que não caberia na tabela)
+        self.pending_rows = deque(maxlen=LIVE_VIEW_ROWS)
+        self.pending_results = deque(maxlen=RESULT_LOG_LINES)
+        self.pending_status = None
+        self.pending_limits = None      # (mínimo, máximo) do zoom descoberto na conexão
+        self.last_metrics_refresh = 0.0
         
         self.setup_ui()
+        self.root.after(UI_TICK_MS, self.ui_tick)
+
+    @property
+    def connected(self):
+        return self.engine.connected
+
+    @property
+    def scanning(self):
+        return self.engine.scanning
+
+    @property
+    def wants_frames(self):
+        return self.show_video
     
     def setup_ui(self):
         # Frame de configuração
@@ -119,6 +161,14 @@ class AxisCameraBarcodeScannerApp:
         self.show_video_var = tk.BooleanVar(value=True)
         self.show_video_check = ttk.Checkbutton(control_frame, text="Exibir Vídeo", variable=self.show_video_var)
         self.show_video_check.pack(side="left", padx=5)
+        # Espelho em bool simples: a flag é lida pela thread de vídeo do motor
+        self.show_video_var.trace_add("write", lambda *_: setattr(self, "show_video", bool(self.show_video_var.get())))
+
+        # Checkbox para pular a decodificação de frames sem movimento (Economia de CPU)
+        self.motion_gate_var = tk.BooleanVar(value=False)
+        self.motion_gate_check = ttk.Checkbutton(control_frame, text="Só com Movimento", variable=self.motion_gate_var)
+        self.motion_gate_check.pack(side="left", padx=5)
+        self.motion_gate_var.trace_add("write", lambda *_: setattr(self.engine.motion_gate, "enabled", bool(self.motion_gate_var.get())))
         
         # --- Layout Principal dividido em 2 painéis (Horizontal) ---
         main_pane = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
@@ -173,56 +223,36 @@ class AxisCameraBarcodeScannerApp:
         self.status_var.set("Pronto")
         self.status_bar = ttk.Label(self.root, textvariable=self.status_var, relief="sunken", anchor="w")
         self.status_bar.pack(side="bottom", fill="x")
+
+        # Métricas do pipeline (fps, latência de decodificação, frames descartados)
+        self.metrics_var = tk.StringVar()
+        self.metrics_bar = ttk.Label(self.root, textvariable=self.metrics_var, relief="sunken", anchor="w")
+        self.metrics_bar.pack(side="bottom", fill="x")
     
     def toggle_connection(self):
         if not self.connected:
             # Conectar
-            self.camera_ip = self.ip_entry.get()
-            self.camera_username = self.username_entry.get()
-            self.camera_password = self.password_entry.get()
+            self.engine.camera_ip = self.ip_entry.get()
+            self.engine.camera_username = self.username_entry.get()
+            self.engine.camera_password = self.password_entry.get()
             
-            if not all([self.camera_ip, self.camera_username, self.camera_password]):
+            if not all([self.engine.camera_ip, self.engine.camera_username, self.engine.camera_password]):
                 self.update_status("Preencha todos os campos de configuração da câmera")
                 return
 
-            self.open_rtsp_stream()
-            
-            if self.cap is not None and self.cap.isOpened():
-                self.connected = True
+            if self.engine.connect():
                 self.connect_button.config(text="Desconectar Câmera")
                 self.start_button.config(state="normal")
                 self.update_status("Conectado à câmera. Visualização iniciada.")
-                
-                # Iniciar thread de captura (buffer cleaning) para baixa latência
-                self.capture_thread = threading.Thread(target=self.capture_loop)
-                self.capture_thread.daemon = True
-                self.capture_thread.start()
-
-                # Iniciar thread de vídeo (processamento e display)
-                self.video_thread = threading.Thread(target=self.video_loop)
-                self.video_thread.daemon = True
-                self.video_thread.start()
-                
-                # Verificar suporte PTZ e limites
-                self.check_ptz_support()
             else:
                 self.update_status("Falha ao conectar à câmera")
         else:
             # Desconectar
-            self.connected = False
-            self.scanning = False
+            self.engine.disconnect()
             self.connect_button.config(text="Conectar Câmera")
             self.start_button.config(text="Iniciar Leitura", state="disabled")
             self.update_status("Desconectado da câmera")
-            self.stop_live_report()
-            
-            # Liberar recursos
-            try:
-                if self.cap is not None and self.cap.isOpened():
-                    self.cap.release()
-            except Exception:
-                pass
-            self.camera_canvas.delete("all")
+            self.clear_camera_view()
 
     def toggle_scanning(self):
         if not self.connected:
@@ -235,110 +265,61 @@ class AxisCameraBarcodeScannerApp:
                 interval_val = float(self.interval_entry.get())
                 if interval_val < 0:
                     raise ValueError
-                self.scan_cooldown = interval_val
             except ValueError:
                 self.update_status("Intervalo inválido. Deve ser um número positivo.")
                 return
 
-            self.scanning = True
+            self.clear_live_view()
+            self.engine.start_scanning(interval_val)
             self.start_button.config(text="Parar Leitura")
             self.update_status("Leitura de códigos iniciada...")
             
-            # Resetar contadores se necessário ou manter histórico? 
-            # Geralmente reiniciar sessão de leitura limpa cache recente, mas mantém histórico.
-            # Vamos limpar apenas last_seen para permitir releitura imediata se cooldown permitir
-            self.code_last_seen.clear()
-            self.code_last_emitted.clear()
-            self.start_live_report()
-            self.clear_live_view()
-            
         else:
             # Parar escaneamento
-            self.scanning = False
+            self.engine.stop_scanning()
             self.start_button.config(text="Iniciar Leitura")
             self.update_status("Leitura de códigos pausada (visualização ativa)")
-            self.stop_live_report()
     
     def on_zoom_slide(self, val):
         """Callback do slider de zoom - usa timer para debounce"""
         if self.zoom_timer:
             self.root.after_cancel(self.zoom_timer)
-        self.zoom_timer = self.root.after(200, lambda: self.send_zoom_command(val))
+        self.zoom_timer = self.root.after(200, lambda: self.engine.send_zoom_command(val))
 
     def on_focus_slide(self, val):
         """Callback do slider de foco - usa timer para debounce"""
         if self.focus_timer:
             self.root.after_cancel(self.focus_timer)
-        self.focus_timer = self.root.after(200, lambda: self.send_focus_command(val))
+        self.focus_timer = self.root.after(200, lambda: self.engine.send_focus_command(val))
 
-    def check_ptz_support(self):
-        """Verifica suporte a PTZ e obtém limites de zoom"""
-        def _check():
-            try:
-                ip = self.camera_ip
-                if ":" in ip:
-                    ip = ip.split(":")[0]
-                
-                # 1. Verificar INFO geral
-                url_info = f"http://{ip}/axis-cgi/com/ptz.cgi"
-                params_info = {'info': 1, 'camera': 1}
-                auth = HTTPDigestAuth(self.camera_username, self.camera_password)
-                
-                resp = requests.get(url_info, params=params_info, auth=auth, timeout=3)
-                logger.info(f"Resposta PTZ info (status {resp.status_code}): {resp.text.strip()}")
-                
-                if resp.status_code == 200 and "PTZ disabled" not in resp.text:
-                    # 2. Consultar LIMITES (MinZoom, MaxZoom)
-                    params_limits = {'query': 'limits', 'camera': 1}
-                    resp_lim = requests.get(url_info, params=params_limits, auth=auth, timeout=3)
-                    
-                    if resp_lim.status_code == 200:
-                        logger.info(f"Limites PTZ: {resp_lim.text.strip()}")
-                        # Tentar parsear MinZoom e MaxZoom
-                        min_z = 1
-                        max_z = 9999
-                        for line in resp_lim.text.splitlines():
-                            if "MinZoom" in line:
-                                try: min_z = int(line.split("=")[1])
-                                except: pass
-                            if "MaxZoom" in line:
-                                try: max_z = int(line.split("=")[1])
-                                except: pass
-                        
-                        # Atualizar slider na thread principal
-                        self.root.after(0, self.update_zoom_slider_range, min_z, max_z)
-                        self.root.after(0, lambda: self.status_var.set(f"PTZ Ativo. Zoom: {min_z}-{max_z}"))
-                        
-                        # Diagnóstico extra: Verificar se é Digital ou Óptico
-                        try:
-                            url_param = f"http://{ip}/axis-cgi/param.cgi"
-                            params_props = {'action': 'list', 'group': 'Properties.PTZ'}
-                            resp_props = requests.get(url_param, params=params_props, auth=auth, timeout=3)
-                            if resp_props.status_code == 200:
-                                props = resp_props.text
-                                logger.info(f"Hardware PTZ Info: {props.strip()}")
-                                is_digital = "DigitalZoom=yes" in props or "DigitalPTZ=yes" in props
-                                is_optical = "OpticalZoom=yes" in props
-                                
-                                status_msg = f"PTZ Ativo. Zoom: {min_z}-{max_z}"
-                                if is_digital and not is_optical:
-                                    status_msg += " (Digital)"
-                                elif is_optical:
-                                    status_msg += " (Óptico)"
-                                
-                                self.root.after(0, lambda: self.status_var.set(status_msg))
-                        except Exception as e:
-                            logger.warning(f"Não foi possível verificar tipo de zoom: {e}")
-
-                    else:
-                        self.root.after(0, lambda: self.status_var.set("PTZ Ativo (Limites desconhecidos)"))
-                else:
-                    self.root.after(0, lambda: self.status_var.set("PTZ desabilitado ou restrito na câmera"))
+    def trigger_autofocus(self):
+        self.engine.trigger_autofocus()
+
+    # ------------------------------------------------------------------
+    # Eventos do motor (chegam das threads do motor; Tk só na thread principal)
+    # ------------------------------------------------------------------
+    def on_status(self, message):
+        # Só a mensagem mais recente interessa à barra de status
+        self.pending_status = message
+
+    def on_result(self, message):
+        self.pending_results.append((time.time(), message))
+
+    def on_code(self, data, ctype, ts, count):
+        self.pending_rows.append((data, ts, count))
 
-            except Exception as e:
-                logger.error(f"Erro ao checar PTZ: {e}")
-                
-        threading.Thread(target=_check, daemon=True).start()
+    def on_ptz_limits(self, min_z, max_z):
+        self.pending_limits = (min_z, max_z)
+
+    def on_frame(self, frame, codes):
+        # Chega da thread de vídeo: limita a taxa de exibição e descarta quadros enquanto o anterior não foi exibido
+        now = time.monotonic()
+        if self.preview_pending or (now - self.last_preview) < self.preview_interval:
+            return
+        self.last_preview = now
+        # Sem cópia do frame: a anotação é desenhada no quadro já reduzido
+        if self.update_camera_view(frame, codes):
+            self.preview_pending = True  # exibido no próximo tick da interface
 
     def update_zoom_slider_range(self, min_z, max_z):
         try:
@@ -347,465 +328,146 @@ class AxisCameraBarcodeScannerApp:
         except Exception as e:
             logger.error(f"Erro ao atualizar slider: {e}")
 
-    def send_zoom_command(self, val):
-        """Envia comando de zoom para a câmera via API VAPIX"""
-        if not self.connected:
-            return
+    def camera_geometry(self, width, height):
+        """Tamanho reduzido e posição do frame no canvas; recalculado só quando frame ou canvas mudam"""
+        key = (width, height, self.canvas_size)
+        if key != self.preview_key:
+            canvas_width, canvas_height = self.canvas_size
 
-        def _request():
-            try:
-                ip = self.camera_ip
-                if ":" in ip:
-                    ip = ip.split(":")[0]
-
-                url = f"http://{ip}/axis-cgi/com/ptz.cgi"
-                params = {"zoom": int(float(val)), "camera": 1}
-                auth = HTTPDigestAuth(self.camera_username, self.camera_password)
-                response = requests.get(url, params=params, auth=auth, timeout=5)
-                
-                # 200 = OK com corpo, 204 = OK sem corpo (sucesso)
-                if response.status_code in [200, 204]:
-                    logger.info(f"Zoom definido para {val}. Status: {response.status_code}")
-                else:
-                    logger.warning(f"Falha ao definir zoom. Status: {response.status_code}, Msg: {response.text}")
-            except Exception as e:
-                logger.error(f"Erro ao enviar comando de zoom: {e}")
-
-        threading.Thread(target=_request, daemon=True).start()
-
-    def send_focus_command(self, val):
-        """Envia comando de foco manual para a câmera"""
-        if not self.connected:
-            return
-        
-        def _request():
-            try:
-                ip = self.camera_ip
-                if ":" in ip: ip = ip.split(":")[0]
-                url = f"http://{ip}/axis-cgi/com/ptz.cgi"
-                
-                # Primeiro desabilita autofocus para permitir manual
-                auth = HTTPDigestAuth(self.camera_username, self.camera_password)
-                requests.get(url, params={"autofocus": "off", "camera": 1}, auth=auth, timeout=3)
-                
-                # Envia valor de foco
-                params = {"focus": int(float(val)), "camera": 1}
-                response = requests.get(url, params=params, auth=auth, timeout=5)
-                
-                if response.status_code in [200, 204]:
-                    logger.info(f"Foco manual definido para {val}. Status: {response.status_code}")
-                else:
-                    logger.warning(f"Falha ao definir foco. Status: {response.status_code}, Msg: {response.text}")
-            except Exception as e:
-                logger.error(f"Erro ao enviar comando de foco: {e}")
-        
-        threading.Thread(target=_request, daemon=True).start()
+            # Calcular escala para manter proporção e mostrar o frame inteiro
+            scale = min(canvas_width / width, canvas_height / height)
+            new_width = max(1, int(width * scale))
+            new_height = max(1, int(height * scale))
 
-    def trigger_autofocus(self):
-        """Aciona o autofoco da câmera via API VAPIX (Toggle Off/On para forçar)"""
-        if not self.connected:
-            self.update_status("Conecte a câmera primeiro.")
-            return
+            # Centralizar no canvas (letterbox/pillarbox conforme 4:3 ou 16:9)
+            x_offset = (canvas_width - new_width) // 2
+            y_offset = (canvas_height - new_height) // 2
+            self.preview_geometry = (new_width, new_height, x_offset, y_offset)
+            self.preview_key = key
+        return self.preview_geometry
 
-        self.update_status("Tentando realizar autofoco...")
-        
-        def _request():
-            try:
-                ip = self.camera_ip
-                if ":" in ip:
-                    ip = ip.split(":")[0]
-
-                url = f"http://{ip}/axis-cgi/com/ptz.cgi"
-                auth = HTTPDigestAuth(self.camera_username, self.camera_password)
-                
-                # 1. Tenta desabilitar primeiro (Toggle strategy)
-                logger.info("Enviando comando: autofocus=off")
-                requests.get(url, params={"autofocus": "off", "camera": 1}, auth=auth, timeout=5)
-                time.sleep(0.5)
-                
-                # 2. Habilita autofocus
-                logger.info("Enviando comando: autofocus=on")
-                params = {"autofocus": "on", "camera": 1}
-                response = requests.get(url, params=params, auth=auth, timeout=10)
-                
-                if response.status_code in [200, 204]:
-                    logger.info(f"Autofoco acionado com sucesso. Status: {response.status_code}")
-                    self.root.after(0, lambda: self.update_status("Autofoco realizado com sucesso!"))
-                else:
-                    # Fallback: tentar focus=auto (algumas câmeras antigas/específicas)
-                    logger.warning(f"Autofoco padrão falhou ({response.status_code}). Tentando método alternativo...")
-                    params_alt = {"focus": "auto", "camera": 1}
-                    resp_alt = requests.get(url, params=params_alt, auth=auth, timeout=10)
-                    
-                    if resp_alt.status_code in [200, 204]:
-                        logger.info(f"Autofoco alternativo sucesso. Status: {resp_alt.status_code}")
-                        self.root.after(0, lambda: self.update_status("Autofoco realizado (método alt)!"))
-                    else:
-                        logger.warning(f"Falha no autofoco. Msg: {response.text}")
-                        self.root.after(0, lambda: self.update_status("Câmera não suporta autofoco remoto ou falhou."))
-                        
-            except Exception as e:
-                logger.error(f"Erro ao enviar comando de autofoco: {e}")
-                self.root.after(0, lambda: self.update_status(f"Erro no autofoco: {e}"))
-
-        threading.Thread(target=_request, daemon=True).start()
-
-    def capture_loop(self):
-        """Loop dedicado para ler frames o mais rápido possível e manter buffer vazio"""
-        while self.connected:
-            try:
-                if self.cap is not None and self.cap.isOpened():
-                    ret, frame = self.cap.read()
-                    if ret:
-                        with self.frame_lock:
-                            self.latest_frame = frame
-                        self.new_frame_event.set()
-                    else:
-                        time.sleep(0.01)
-                else:
-                    time.sleep(0.1)
-            except Exception as e:
-                logger.error(f"Erro no loop de captura: {e}")
-                time.sleep(0.1)
-
-    def video_loop(self):
-        while self.connected:
-            try:
-                # Capturar frame do stream RTSP (agora sincronizado com evento de nova imagem)
-                frame = self.capture_frame()
-                
-                if frame is not None:
-                    # Se estiver escaneando, processa o frame
-                    if self.scanning:
-                        # Processar a imagem para encontrar códigos
-                        codes = self.decode_barcodes(frame)
-                        # Desenhar retângulos e textos sobre os códigos encontrados
-                        annotated = self.draw_barcodes(frame.copy(), codes)
-                        # Atualizar a visualização com anotações
-                        if self.show_video_var.get():
-                            self.update_camera_view(annotated)
-                        
-                        # Lógica de processamento dos códigos encontrados
-                        self.process_codes(codes)
-                    else:
-                        # Apenas visualização, sem processamento pesado
-                        if self.show_video_var.get():
-                            self.update_camera_view(frame)
-                else:
-                    # Se não houver frame novo (timeout), loop continua
-                    pass
-                
-                # Sem sleep fixo aqui, pois o ritmo é ditado pelo capture_frame (wait)
-                
-            except Exception as e:
-                logger.error(f"Erro no loop de vídeo: {e}")
-                time.sleep(1)
-
-    def process_codes(self, codes):
-        current_time = time.time()
-        if codes:
-            # Mapear códigos visíveis no frame atual
-            visible_codes = {}
-            for code in codes:
-                try:
-                    data = code.data.decode('utf-8')
-                except Exception:
-                    data = str(code.data)
-                visible_codes[data] = code.type
-
-            # Atualizar last_seen e emitir respeitando cooldown por código
-            for data, ctype in visible_codes.items():
-                self.code_last_seen[data] = current_time
-
-                last_emit = self.code_last_emitted.get(data, 0)
-                if (current_time - last_emit) > self.scan_cooldown:
-                    # Emite (novo ou após cooldown)
-                    self.code_last_emitted[data] = current_time
-                    self.last_code = data
-                    self.last_scan_time = current_time
-                    self.root.after(0, self.update_result, f"Tipo: {ctype}, Dados: {data}")
-                    self.root.after(0, self.update_status, f"Código {ctype} detectado!")
-                    try:
-                        self.record_scan(data, ctype, current_time)
-                    except Exception:
-                        pass
-
-            # Limpeza: remover códigos não vistos há muito tempo
-            for data in list(self.code_last_seen.keys()):
-                last_seen = self.code_last_seen.get(data, 0)
-                if (current_time - last_seen) > (self.scan_cooldown * 2):
-                    self.code_last_seen.pop(data, None)
-                    self.code_last_emitted.pop(data, None)
-
-                
-    def update_camera_view(self, image):
-        """Atualiza a visualização da câmera no canvas mantendo a proporção e exibindo o frame inteiro"""
+    def update_camera_view(self, image, codes=()):
+        """Prepara o quadro da visualização (thread de vídeo, sem chamadas Tk): reduz, converte para RGB e anota"""
         try:
-            # Guardar o último frame original para reagir a redimensionamentos do canvas
-            self.current_frame_cv = image
-
-            # Dimensões do frame original
             height, width = image.shape[:2]
+            new_width, new_height, x_offset, y_offset = self.camera_geometry(width, height)
 
-            # Dimensões atuais do canvas
-            canvas_width = self.camera_canvas.winfo_width()
-            canvas_height = self.camera_canvas.winfo_height()
+            # Redimensionar o frame para caber no canvas sem cortar, em buffers reaproveitados
+            shape = (new_height, new_width) + image.shape[2:]
+            if self.preview_resized is None or self.preview_resized.shape != shape:
+                self.preview_resized = np.empty(shape, dtype=np.uint8)
+                self.preview_rgb = np.empty((new_height, new_width, 3), dtype=np.uint8)
+            cv2.resize(image, (new_width, new_height), dst=self.preview_resized, interpolation=cv2.INTER_AREA)
 
-            # Fallback caso o canvas ainda não tenha sido renderizado
-            if canvas_width <= 1 or canvas_height <= 1:
-                canvas_width = max(self.camera_canvas.winfo_reqwidth(), 640)
-                canvas_height = max(self.camera_canvas.winfo_reqheight(), 480)
+            # Converter de BGR para RGB (OpenCV usa BGR, Tkinter usa RGB); cinza vira RGB também
+            code = cv2.COLOR_GRAY2RGB if image.ndim == 2 else cv2.COLOR_BGR2RGB
+            cv2.cvtColor(self.preview_resized, code, dst=self.preview_rgb)
 
-            # Calcular escala para manter proporção e mostrar o frame inteiro
-            scale_w = canvas_width / width
-            scale_h = canvas_height / height
-            scale = min(scale_w, scale_h)
-
-            new_width = max(1, int(width * scale))
-            new_height = max(1, int(height * scale))
-
-            # Redimensionar o frame para caber no canvas sem cortar
-            resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
-
-            # Converter para imagem Tkinter
-            tk_image = self.convert_cv_to_tkinter(resized)
-            if tk_image:
-                self.current_image = tk_image  # evitar GC
-
-                # Centralizar no canvas (letterbox/pillarbox conforme 4:3 ou 16:9)
-                x_offset = (canvas_width - new_width) // 2
-                y_offset = (canvas_height - new_height) // 2
+            if codes:
+                # Coordenadas do frame original levadas para a escala da visualização
+                factor = new_width / float(width)
+                self.draw_barcodes(self.preview_rgb, [scale_code(c, factor) for c in codes])
 
-                # Renderizar no canvas
-                self.camera_canvas.delete("all")
-                self.camera_canvas.create_image(x_offset, y_offset, anchor=tk.NW, image=self.current_image)
-                # Manter referência no próprio canvas
-                self.camera_canvas.image = self.current_image
+            self.preview_ready = (self.preview_rgb, x_offset, y_offset)
+            return True
         except Exception as e:
             logger.error(f"Erro ao atualizar visualização da câmera: {e}")
+            return False
 
-    def on_canvas_resize(self, event):
-        """Redesenha a imagem ao redimensionar o canvas para manter a proporção"""
+    def show_preview(self):
+        """Exibe o quadro preparado (thread principal), reaproveitando o mesmo PhotoImage"""
         try:
-            if self.current_frame_cv is not None:
-                self.update_camera_view(self.current_frame_cv)
+            if self.preview_ready is None or not self.show_video:
+                return
+            rgb, x_offset, y_offset = self.preview_ready
+            pil_image = Image.fromarray(rgb)
+            height, width = rgb.shape[:2]
+            if self.photo is None or self.photo.width() != width or self.photo.height() != height:
+                # Primeiro quadro ou novo tamanho: cria o PhotoImage e o item do canvas uma única vez
+                self.photo = ImageTk.PhotoImage(image=pil_image)
+                if self.canvas_image_id is None:
+                    self.canvas_image_id = self.camera_canvas.create_image(x_offset, y_offset, anchor=tk.NW,
+                                                                           image=self.photo)
+                else:
+                    self.camera_canvas.itemconfig(self.canvas_image_id, image=self.photo)
+            else:
+                self.photo.paste(pil_image)
+            self.camera_canvas.coords(self.canvas_image_id, x_offset, y_offset)
         except Exception as e:
-            logger.error(f"Erro no redimensionamento do canvas: {e}")
-
-    def build_rtsp_url(self):
-        """Constroi a URL RTSP padrão para câmeras Axis com credenciais codificadas e porta padrão"""
-        # Codificar caracteres especiais em usuário e senha (ex.: @, #, :, etc.)
-        username_enc = quote(self.camera_username or "", safe="")
-        password_enc = quote(self.camera_password or "", safe="")
-
-        host = (self.camera_ip or "").strip()
-        # Adicionar porta padrão 554 se nenhuma porta for especificada
-        # Considera IPv4 comum; se houver ':' assumimos que já há porta.
-        if host and ":" not in host:
-            host = f"{host}:554"
+            logger.error(f"Erro ao exibir visualização da câmera: {e}")
+        finally:
+            self.preview_pending = False
 
-        return f"rtsp://{username_enc}:{password_enc}@{host}/axis-media/media.amp"
+    def clear_camera_view(self):
+        self.camera_canvas.delete("all")
+        self.canvas_image_id = None
+        self.photo = None
+        self.preview_ready = None
 
-    def open_rtsp_stream(self):
-        """Abre o stream RTSP da câmera"""
+    def on_canvas_resize(self, event):
+        """Registra o novo tamanho do canvas; o próximo quadro já sai na escala nova"""
         try:
-            # Tratamento robusto de IP:Porta para RTSP
-            ip_raw = self.camera_ip
-            port_part = ""
-            ip_clean = ip_raw
-            
-            if ":" in ip_raw:
-                parts = ip_raw.split(":")
-                # Se for apenas IP:Porta (ex: 192.168.0.90:554)
-                if len(parts) == 2:
-                    ip_clean = parts[0]
-                    port_part = f":{parts[1]}"
-            
-            # Montar URL RTSP corretamente
-            # rtsp://IP:PORT/axis-media/media.amp?camera=1
-            # Credenciais serão passadas de forma codificada para evitar problemas com caracteres especiais
-            
-            from urllib.parse import quote
-            safe_user = quote(self.camera_username)
-            safe_pass = quote(self.camera_password)
-            
-            rtsp_url = f"rtsp://{safe_user}:{safe_pass}@{ip_clean}{port_part}/axis-media/media.amp?camera=1"
-            
-            logger.info(f"Tentando abrir RTSP: {rtsp_url.replace(safe_pass, '******')}")
-            
-            # Opções para reduzir latência e forçar TCP
-            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
-            self.cap = cv2.VideoCapture(rtsp_url)
-            
-            # Otimização para baixa latência: buffer pequeno
-            try:
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            except Exception:
-                pass
-                
-            if self.cap.isOpened():
-                self.update_status("Stream RTSP aberto com sucesso")
-            else:
-                self.update_status("Falha ao abrir stream RTSP")
+            if event.width > 1 and event.height > 1:
+                self.canvas_size = (event.width, event.height)
         except Exception as e:
-            logger.error(f"Erro ao abrir RTSP: {e}")
-            self.update_status(f"Erro ao abrir RTSP: {str(e)}")
+            logger.error(f"Erro no redimensionamento do canvas: {e}")
 
-    def capture_frame(self):
-        """Captura o frame mais recente da thread de captura"""
+    def ui_tick(self):
+        """Aplica de uma vez os eventos acumulados desde o último tick"""
         try:
-            # Espera por um novo frame (com timeout para não travar a UI se a câmera cair)
-            if self.new_frame_event.wait(timeout=0.2):
-                self.new_frame_event.clear()
-                with self.frame_lock:
-                    if self.latest_frame is not None:
-                        return self.latest_frame
+            rows = []
+            while self.pending_rows:
+                rows.append(self.pending_rows.popleft())
+            if rows:
+                self.update_live_view(rows)
+
+            results = []
+            while self.pending_results:
+                results.append(self.pending_results.popleft())
+            if results:
+                self.append_results(results)
+
+            message, self.pending_status = self.pending_status, None
+            if message is not None:
+                self.update_status(message)
+
+            limits, self.pending_limits = self.pending_limits, None
+            if limits is not None:
+                self.update_zoom_slider_range(*limits)
+
+            if self.preview_pending:
+                self.show_preview()
+
+            now = time.monotonic()
+            if now - self.last_metrics_refresh >= METRICS_REFRESH_S:
+                self.last_metrics_refresh = now
+                summary = self.engine.metrics.summary()
+                self.metrics_var.set(summary if self.connected else "")
         except Exception as e:
-            logger.error(f"Erro ao recuperar frame do buffer: {e}")
-        return None
-    
-    def decode_barcodes(self, image):
-        """Decodifica códigos de barras/QR de uma imagem"""
-        try:
-            codes = decode(image)
-            if codes:
-                return codes
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            codes = decode(gray)
-            if codes:
-                return codes
-            eq = cv2.equalizeHist(gray)
-            codes = decode(eq)
-            if codes:
-                return codes
-            _, th = cv2.threshold(eq, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-            codes = decode(th)
-            return codes
-        except Exception as e:
-            logger.error(f"Erro ao decodificar códigos: {e}")
-            return []
-
-    def record_scan(self, data, ctype, ts):
-        try:
-            self.scanned_records.append({"timestamp": ts, "type": ctype, "data": data})
-            st = self.code_stats.get(data)
-            if st is None:
-                self.code_stats[data] = {"type": ctype, "first_seen": ts, "last_seen": ts, "count": 1}
-            else:
-                st["last_seen"] = ts
-                st["count"] += 1
-        except Exception:
-            pass
-        try:
-            self.append_live_record(data, ts)
-        except Exception:
-            pass
+            logger.error(f"Erro ao atualizar interface: {e}")
+        finally:
+            self.root.after(UI_TICK_MS, self.ui_tick)
 
-    def generate_report(self, dir_path=None):
-        try:
-            if not self.scanned_records:
-                self.update_result("Nenhum código lido para relatório")
-                return
-            ts = time.strftime("%Y%m%d-%H%M%S")
-            base = dir_path or os.getcwd()
-            # Gerar apenas o relatório detalhado conforme solicitado
-            report_path = os.path.join(base, f"axis_codes_{ts}.xlsx")
-            
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Relatório de Leituras"
-            
-            ws.append(["Data", "Horário", "Código", "Quantidade"])
-            for rec in self.scanned_records:
-                local_time = time.localtime(rec["timestamp"])
-                date_str = time.strftime("%d/%m/%Y", local_time)
-                time_str = time.strftime("%H:%M:%S", local_time)
-                count = self.code_stats[rec["data"]]["count"]
-                ws.append([date_str, time_str, rec["data"], count])
-            
-            wb.save(report_path)
-            
-            self.update_result(f"Relatório salvo: {report_path}")
-            self.update_status("Relatório gerado com sucesso")
-        except Exception as e:
-            try:
-                self.update_status(f"Erro ao gerar relatórios: {str(e)}")
-            except Exception:
-                pass
-    
-    def start_live_report(self, dir_path=None):
-        try:
-            ts = time.strftime("%Y%m%d-%H%M%S")
-            base = dir_path or os.getcwd()
-            self.live_report_path = os.path.join(base, f"axis_codes_live_{ts}.csv")
-            self.live_report_file = open(self.live_report_path, "w", newline="", encoding="utf-8")
-            self.live_report_writer = csv.writer(self.live_report_file)
-            self.live_report_writer.writerow(["Data", "Horário", "Código", "Quantidade"])
-            try:
-                self.live_report_file.flush()
-                os.fsync(self.live_report_file.fileno())
-            except Exception:
-                pass
-            self.update_result(f"Relatório em tempo real: {self.live_report_path}")
-            self.update_status("Relatório atualizado a cada leitura")
-        except Exception as e:
-            self.live_report_path = None
-            self.live_report_file = None
-            self.live_report_writer = None
-            try:
-                self.update_status(f"Erro ao iniciar relatório: {str(e)}")
-            except Exception:
-                pass
-    
-    def stop_live_report(self):
+    def clear_live_view(self):
         try:
-            if self.live_report_file:
-                try:
-                    self.live_report_file.flush()
-                    os.fsync(self.live_report_file.fileno())
-                except Exception:
-                    pass
-                self.live_report_file.close()
+            self.pending_rows.clear()
+            # Uma única chamada em vez de um delete por linha
+            self.live_tree.delete(*self.live_tree.get_children())
         except Exception:
             pass
-        self.live_report_file = None
-        self.live_report_writer = None
-        self.live_report_path = None
     
-    def append_live_record(self, data, ts):
+    def update_live_view(self, rows):
+        """Insere um lote de leituras [(código, ts, quantidade), ...] e descarta as linhas mais antigas"""
         try:
-            if self.live_report_writer:
+            for data, ts, count in rows:
                 local_time = time.localtime(ts)
                 date_str = time.strftime("%d/%m/%Y", local_time)
                 time_str = time.strftime("%H:%M:%S", local_time)
-                count = self.code_stats.get(data, {}).get("count", 1)
-                self.live_report_writer.writerow([date_str, time_str, data, count])
-                try:
-                    self.live_report_file.flush()
-                    os.fsync(self.live_report_file.fileno())
-                except Exception:
-                    pass
-                try:
-                    self.root.after(0, self.update_live_view, data, ts)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-    
-    def clear_live_view(self):
-        try:
-            for i in self.live_tree.get_children():
-                self.live_tree.delete(i)
-        except Exception:
-            pass
-    
-    def update_live_view(self, data, ts):
-        try:
-            local_time = time.localtime(ts)
-            date_str = time.strftime("%d/%m/%Y", local_time)
-            time_str = time.strftime("%H:%M:%S", local_time)
-            count = self.code_stats.get(data, {}).get("count", 1)
-            self.live_tree.insert("", "end", values=(date_str, time_str, data, count))
+                self.live_tree.insert("", "end", values=(date_str, time_str, data, count))
+            children = self.live_tree.get_children()
+            excess = len(children) - LIVE_VIEW_ROWS
+            if excess > 0:
+                self.live_tree.delete(*children[:excess])
         except Exception:
             pass
 
@@ -813,7 +475,8 @@ class AxisCameraBarcodeScannerApp:
         try:
             directory = filedialog.askdirectory(mustexist=True, title="Selecionar pasta para salvar relatório")
             if directory:
-                self.generate_report(dir_path=directory)
+                # Em segundo plano: sessões longas não congelam a interface; o progresso chega por on_status
+                self.engine.generate_report_async(dir_path=directory)
             else:
                 self.update_status("Exportação cancelada")
         except Exception as e:
@@ -850,36 +513,283 @@ class AxisCameraBarcodeScannerApp:
             logger.error(f"Erro ao desenhar códigos: {e}")
         return frame
             
-    def convert_cv_to_tkinter(self, cv_image):
-        """Converte uma imagem OpenCV para formato compatível com Tkinter"""
-        try:
-            # Converter de BGR para RGB (OpenCV usa BGR, Tkinter usa RGB)
-            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-            
-            # Converter para formato PIL
-            pil_image = Image.fromarray(rgb_image)
-            
-            # Converter para formato Tkinter
-            tk_image = ImageTk.PhotoImage(image=pil_image)
-            return tk_image
-        except Exception as e:
-            logger.error(f"Erro ao converter imagem: {e}")
-            return None
-    
     def update_status(self, message):
         """Atualiza a barra de status"""
         self.status_var.set(message)
     
     def update_result(self, message):
         """Adiciona uma mensagem à área de resultados"""
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        self.result_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        self.append_results([(time.time(), message)])
+
+    def append_results(self, results):
+        """Adiciona um lote de mensagens [(ts, mensagem), ...] mantendo só as últimas linhas"""
+        text = "".join(f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}] {message}\n"
+                       for ts, message in results)
+        self.result_text.insert(tk.END, text)
+        lines = int(self.result_text.index("end-1c").split(".")[0])
+        if lines > RESULT_LOG_LINES:
+            self.result_text.delete("1.0", f"{lines - RESULT_LOG_LINES}.0")
         self.result_text.see(tk.END)  # Rolar para o final
 
-def main():
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Leitor de códigos com câmera Axis (RTSP)")
+    parser.add_argument("--headless", action="store_true", help="executa sem interface gráfica (linha de produção)")
+    parser.add_argument("--ip", default="192.168.0.90", help="IP ou host[:porta] da câmera")
+    parser.add_argument("--http-port", type=int, default=None,
+                        help="porta do VAPIX (axis-cgi), se não for a 80 (ex.: camera_simulator.py)")
+    parser.add_argument("--user", default="root", help="usuário da câmera")
+    parser.add_argument("--password", default=os.environ.get("AXIS_PASSWORD", ""),
+                        help="senha da câmera (padrão: variável de ambiente AXIS_PASSWORD)")
+    parser.add_argument("--interval", type=float, default=30, help="intervalo (s) entre leituras do mesmo código")
+    parser.add_argument("--dedup-confirm", type=parse_confirm, default=(1, 1), metavar="K/N",
+                        help="só registra um código visto em K dos últimos N frames decodificados (ex.: 2/3)")
+    parser.add_argument("--dedup-scope", choices=("camera", "global"), default="camera",
+                        help="com --cameras, 'global' não registra de novo um código já lido por outra câmera "
+                             "dentro do intervalo")
+    parser.add_argument("--report-dir", default=None, help="pasta dos relatórios (padrão: diretório atual)")
+    parser.add_argument("--commit-interval", type=float, default=1.0,
+                        help="grava o CSV em tempo real em lote a cada N s (máximo de leituras perdidas numa queda)")
+    parser.add_argument("--commit-records", type=int, default=100,
+                        help="antecipa a gravação do CSV quando o lote atinge N leituras")
+    parser.add_argument("--history-size", type=int, default=50000,
+                        help="leituras mantidas em memória; as mais antigas vão para um segmento em disco")
+    parser.add_argument("--scan-db", default=None,
+                        help="grava todas as leituras em um banco SQLite indexado (consultas: python scan_store.py)")
+    parser.add_argument("--stall-timeout", type=float, default=5.0,
+                        help="reabre o stream após N s sem frames (0 = sem reconexão automática)")
+    parser.add_argument("--reconnect-max-delay", type=float, default=30.0,
+                        help="espera máxima (s) entre tentativas de reconexão (recuo exponencial a partir de 1 s)")
+    parser.add_argument("--capabilities-cache", default=DEFAULT_CACHE_PATH,
+                        help="arquivo do cache de recursos das câmeras (PTZ, limites), por número de série")
+    parser.add_argument("--capabilities-ttl", type=float, default=DEFAULT_TTL,
+                        help="validade (s) do cache de recursos (0 = sempre consulta a câmera)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="expõe métricas no formato Prometheus em http://127.0.0.1:PORTA/metrics (0 = desligado)")
+    parser.add_argument("--export-xlsx", action="store_true", help="gera o relatório XLSX da sessão ao encerrar")
+    add_decode_arguments(parser)
+    parser.add_argument("--capture-backend", choices=CAPTURE_BACKENDS, default="opencv",
+                        help="backend de captura RTSP (gstreamer/pyav permitem decodificador por hardware e descarte de frames)")
+    parser.add_argument("--gray", action="store_true",
+                        help="captura direto em tons de cinza (plano Y), que é tudo que o zbar precisa")
+    parser.add_argument("--keyframes-only", action="store_true",
+                        help="decodifica só frames-chave do vídeo (gstreamer/pyav)")
+    parser.add_argument("--hw-decoder", default="",
+                        help="elemento decodificador do GStreamer (ex.: vaapih264dec, nvh264dec, d3d11h264dec)")
+    parser.add_argument("--resolution", default="",
+                        help="resolução pedida à câmera no media.amp (ex.: 640x360)")
+    parser.add_argument("--fps", type=int, default=0, help="fps pedido à câmera (0 = padrão da câmera)")
+    parser.add_argument("--compression", type=int, default=None, help="compressão do stream (0-100, VAPIX)")
+    parser.add_argument("--stream-profile", default="", help="perfil de stream configurado na câmera (streamprofile)")
+    parser.add_argument("--dual-stream", choices=DUAL_SOURCES, default=None,
+                        help="stream leve para vídeo/movimento e decodificação em alta resolução só com atividade "
+                             "(snapshot JPEG ou segundo stream RTSP)")
+    parser.add_argument("--decode-resolution", default="",
+                        help="resolução da imagem de decodificação no stream duplo (padrão: máxima da câmera)")
+    parser.add_argument("--trigger", choices=TRIGGER_SOURCES, default=None,
+                        help="modo disparado: decodifica só após eventos da entrada digital (input) ou de /trigger (http)")
+    parser.add_argument("--trigger-input", type=int, default=1, help="número da entrada digital da câmera")
+    parser.add_argument("--trigger-edge", choices=TRIGGER_EDGES, default="rising",
+                        help="borda da entrada que dispara a janela")
+    parser.add_argument("--trigger-delay", type=float, default=0.0, help="atraso (s) entre o disparo e a janela")
+    parser.add_argument("--trigger-window", type=float, default=1.0, help="duração (s) da janela de decodificação")
+    parser.add_argument("--trigger-snapshot", action="store_true",
+                        help="na janela, decodifica um JPEG em alta resolução (image.cgi) em vez do vídeo")
+    parser.add_argument("--trigger-http-port", type=int, default=9110,
+                        help="porta do servidor de disparos HTTP (/trigger?camera=NOME)")
+    parser.add_argument("--trigger-bind", default="127.0.0.1",
+                        help="endereço do servidor de disparos (0.0.0.0 para receber da rede/da câmera)")
+    parser.add_argument("--trigger-token", default=os.environ.get("AXIS_TRIGGER_TOKEN"),
+                        help="token exigido nos disparos HTTP (?token=, X-Trigger-Token ou Bearer; "
+                             "padrão: AXIS_TRIGGER_TOKEN)")
+    parser.add_argument("--cameras", default=None,
+                        help="arquivo JSON com a lista de câmeras (modo headless multi-câmera)")
+    parser.add_argument("--decode-workers", type=int, default=None,
+                        help="workers de decodificação compartilhados (padrão: núcleos - 1)")
+    parser.add_argument("--max-decode-fps", type=float, default=0,
+                        help="limite global de decodificações/s somando todas as câmeras (0 = sem limite)")
+    parser.add_argument("--decode-processes", type=int, default=0,
+                        help="decodifica em N processos via memória compartilhada (0 = threads no próprio processo)")
+    parser.add_argument("--decode-timeout", type=float, default=5.0,
+                        help="com --decode-processes, segundos até reiniciar um worker que não responde")
+    return parser
+
+def build_process_pool(args):
+    """Pool de processos de decodificação, se solicitado na linha de comando"""
+    if args.decode_processes and args.decode_processes > 0:
+        return ProcessDecodePool(processes=args.decode_processes, max_decode_fps=args.max_decode_fps,
+                                 decode_timeout=args.decode_timeout)
+    return None
+
+def build_capture_options(args):
+    options = {"gray": args.gray, "keyframes_only": args.keyframes_only}
+    if args.hw_decoder:
+        options["decoder"] = args.hw_decoder
+    return options
+
+def build_stream_params(args):
+    params = {"resolution": args.resolution, "fps": args.fps or None, "compression": args.compression,
+              "streamprofile": args.stream_profile}
+    return {k: v for k, v in params.items() if v not in (None, "")}
+
+def start_trigger_server(args):
+    try:
+        return HttpTriggerServer(args.trigger_http_port, host=args.trigger_bind, token=args.trigger_token).start()
+    except OSError as e:
+        logger.error(f"Não foi possível abrir a porta de disparos {args.trigger_http_port}: {e}")
+        return None
+
+def build_trigger(args, server=None):
+    if not args.trigger:
+        return None
+    snapshot_params = {"resolution": args.decode_resolution} if args.decode_resolution else {}
+    return TriggerController(args.trigger, port=args.trigger_input, edge=args.trigger_edge, delay=args.trigger_delay,
+                             duration=args.trigger_window, snapshot=args.trigger_snapshot,
+                             snapshot_params=snapshot_params, http_server=server)
+
+def build_reconnect(args):
+    return {"enabled": args.stall_timeout > 0, "stall_timeout": args.stall_timeout or 5.0,
+            "max_delay": args.reconnect_max_delay}
+
+def build_capability_cache(args):
+    if args.capabilities_ttl <= 0:
+        return None
+    return CapabilityCache(args.capabilities_cache, ttl=args.capabilities_ttl)
+
+def build_dual_stream(args):
+    if not args.dual_stream:
+        return None
+    params = {"resolution": args.decode_resolution} if args.decode_resolution else {}
+    return {"source": args.dual_stream, "params": params}
+
+def wait_for_shutdown():
+    """Bloqueia até Ctrl+C ou SIGTERM"""
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    try:
+        while not stop_event.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+
+def run_supervisor(args):
+    """Executa várias câmeras no mesmo processo com decodificação compartilhada"""
+    try:
+        configs = load_camera_configs(args.cameras)
+    except Exception as e:
+        logger.error(f"Erro ao ler lista de câmeras: {e}")
+        return 2
+    if not configs:
+        logger.error("Nenhuma câmera configurada")
+        return 2
+
+    store = ScanStore(args.scan_db) if args.scan_db else None
+    trigger_server = None
+    if any((cfg.trigger or {}).get("source") == "http" for cfg in configs):
+        trigger_server = start_trigger_server(args)
+    supervisor = CameraSupervisor(configs, report_dir=args.report_dir, workers=args.decode_workers,
+                                  max_decode_fps=args.max_decode_fps, scheduler=build_process_pool(args),
+                                  scan_store=store, capability_cache=build_capability_cache(args),
+                                  trigger_server=trigger_server, confirm=args.dedup_confirm,
+                                  dedup=CodeDeduplicator(args.interval) if args.dedup_scope == "global" else None)
+    try:
+        if not supervisor.start():
+            supervisor.stop()
+            supervisor.close()
+            return 1
+        try:
+            wait_for_shutdown()
+        finally:
+            supervisor.stop()
+            if args.export_xlsx:
+                supervisor.generate_reports()
+            supervisor.close()
+    finally:
+        if store is not None:
+            store.close()
+        if trigger_server is not None:
+            trigger_server.stop()
+    return 0
+
+def run_headless(args):
+    """Executa o motor sem Tk: conecta, lê continuamente e encerra com Ctrl+C/SIGTERM"""
+    if args.cameras:
+        return run_supervisor(args)
+    if args.interval < 0:
+        logger.error("Intervalo inválido. Deve ser um número positivo.")
+        return 2
+
+    pool = build_process_pool(args)
+    trigger_server = start_trigger_server(args) if args.trigger == "http" else None
+    engine = ScannerEngine(args.ip, args.user, args.password, scan_cooldown=args.interval,
+                           report_dir=args.report_dir, decode_scheduler=pool,
+                           dedup=CodeDeduplicator(args.interval, *args.dedup_confirm),
+                           capture_backend=args.capture_backend, capture_options=build_capture_options(args),
+                           stream_params=build_stream_params(args), dual_stream=build_dual_stream(args),
+                           live_report_options={"commit_interval": args.commit_interval,
+                                                "commit_records": args.commit_records},
+                           history=ScanHistory(max_recent=args.history_size),
+                           scan_store=ScanStore(args.scan_db) if args.scan_db else None,
+                           http_port=args.http_port, capability_cache=build_capability_cache(args),
+                           reconnect=build_reconnect(args), trigger=build_trigger(args, trigger_server),
+                           **build_decode_stages(args))
+    engine.add_listener(LoggingListener())
+
+    if pool is not None:
+        pool.start()
+    # Com reconexão automática, câmera fora do ar na partida não encerra o processo
+    if not engine.connect(retry=args.stall_timeout > 0):
+        logger.error("Falha ao conectar à câmera")
+        engine.close()
+        if pool is not None:
+            pool.stop()
+        if engine.scan_store is not None:
+            engine.scan_store.close()
+        if trigger_server is not None:
+            trigger_server.stop()
+        return 1
+
+    engine.start_scanning()
+    try:
+        wait_for_shutdown()
+    finally:
+        engine.disconnect()
+        if pool is not None:
+            pool.stop()
+        if args.export_xlsx:
+            engine.generate_report()
+        engine.close()
+        if engine.scan_store is not None:
+            engine.scan_store.close()
+        if trigger_server is not None:
+            trigger_server.stop()
+    return 0
+
+def start_metrics_server(args):
+    if not args.metrics_port:
+        return None
+    try:
+        return MetricsServer(port=args.metrics_port).start()
+    except OSError as e:
+        logger.error(f"Não foi possível abrir a porta de métricas {args.metrics_port}: {e}")
+        return None
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    start_metrics_server(args)
+    if args.headless:
+        return run_headless(args)
+
+    if tk is None:
+        logger.error("Tkinter/Pillow indisponíveis; use --headless")
+        return 1
     root = tk.Tk()
     app = AxisCameraBarcodeScannerApp(root)
     root.mainloop()
+    # Janela fechada: encerra a câmera e apaga os segmentos do histórico em disco
+    app.engine.close()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    # Necessário para os workers de decodificação no executável PyInstaller (Windows)
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark offline: reproduz vídeos gravados ou pastas de imagens pelo mesmo
+pipeline do motor (detector de movimento → decode_frame → process_codes),
+sem câmera.
+
+Modos de ritmo:
+- max: processa cada frame assim que o anterior termina (vazão máxima).
+- realtime: entrega os frames no fps do vídeo; frames que chegariam enquanto
+  o anterior ainda está sendo decodificado são descartados, como na captura
+  ao vivo (último frame vence).
+
+Relata frames/s, percentis de latência por etapa, CPU/memória do processo e,
+com um arquivo de gabarito, a cobertura (recall) e falsos positivos.
+
+Gabarito (CSV, uma linha por código esperado):
+
+    frame,codigo          # frame = índice no vídeo (0, 1, ...) ou nome do arquivo de imagem
+    ,codigo               # sem frame: o código deve aparecer em algum frame
+
+Exemplo:
+
+    python benchmark.py --video esteira.mp4 --truth esteira.csv --localizer --track-codes --json resultado.json
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import cv2
+
+from decode_options import add_decode_arguments, build_decode_stages
+from scan_history import ScanHistory
+from scanner_engine import ScannerEngine
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+
+def iter_video(path, gray=False):
+    """(chave, frame) de um arquivo de vídeo; a chave é o índice do frame"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Não foi possível abrir o vídeo: {path}")
+    index = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if gray:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            yield str(index), frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def video_fps(path):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    cap.release()
+    return fps if fps > 0 else 25.0
+
+
+def iter_images(directory, gray=False):
+    """(chave, frame) de uma pasta de imagens em ordem alfabética; a chave é o nome do arquivo"""
+    flag = cv2.IMREAD_GRAYSCALE if gray else cv2.IMREAD_COLOR
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        frame = cv2.imread(os.path.join(directory, name), flag)
+        if frame is not None:
+            yield name, frame
+
+
+def load_truth(path):
+    """Lê o gabarito: ({chave do frame: {códigos}}, {códigos esperados em qualquer frame})"""
+    per_frame = {}
+    anywhere = set()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#") or len(row) < 2:
+                continue
+            key, code = row[0].strip(), row[1].strip()
+            if key.lower() == "frame":
+                continue  # cabeçalho
+            if key:
+                per_frame.setdefault(key, set()).add(code)
+            else:
+                anywhere.add(code)
+    return per_frame, anywhere
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    if not values:
+        return {f"p{p}": 0.0 for p in points}
+    ordered = sorted(values)
+    out = {}
+    for p in points:
+        k = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        out[f"p{p}"] = ordered[k] * 1000.0
+    out["max"] = ordered[-1] * 1000.0
+    return out
+
+
+def code_text(code):
+    try:
+        return code.data.decode("utf-8")
+    except Exception:
+        return str(code.data)
+
+
+def build_engine(args, report_dir):
+    return ScannerEngine(name="benchmark", scan_cooldown=args.interval, report_dir=report_dir,
+                         history=ScanHistory(), **build_decode_stages(args))
+
+
+def run_benchmark(args):
+    frames_source = []
+    for path in args.video:
+        frames_source.append(("video", path))
+    for path in args.images:
+        frames_source.append(("images", path))
+    if not frames_source:
+        raise ValueError("Informe --video e/ou --images")
+
+    per_frame_truth, anywhere_truth = load_truth(args.truth) if args.truth else ({}, set())
+
+    gate_times, decode_times, process_times, total_times = [], [], [], []
+    frames = decoded = skipped = dropped = 0
+    found_pairs = expected_pairs = false_positives = 0
+    seen_codes = set()
+
+    with tempfile.TemporaryDirectory(prefix="axis_bench_") as report_dir:
+        engine = build_engine(args, report_dir)
+        engine.start_scanning()
+        usage_start = resource.getrusage(resource.RUSAGE_SELF)
+        wall_start = time.perf_counter()
+
+        for _ in range(max(1, args.repeat)):
+            for kind, path in frames_source:
+                if kind == "video":
+                    source = iter_video(path, args.gray)
+                    fps = args.fps or video_fps(path)
+                else:
+                    source = iter_images(path, args.gray)
+                    fps = args.fps or 10.0
+                frame_interval = 1.0 / fps
+                clock = time.perf_counter()
+                next_due = clock
+
+                for key, frame in source:
+                    if args.pace == "realtime":
+                        now = time.perf_counter()
+                        if now > next_due + frame_interval:
+                            # A câmera já teria entregue um frame mais novo: este se perde
+                            dropped += 1
+                            next_due += frame_interval
+                            continue
+                        if now < next_due:
+                            time.sleep(next_due - now)
+                        next_due += frame_interval
+
+                    frames += 1
+                    t0 = time.perf_counter()
+                    changed = engine.scene_changed(frame)
+                    t1 = time.perf_counter()
+                    gate_times.append(t1 - t0)
+                    if changed:
+                        codes = engine.decode_frame(frame)
+                        t2 = time.perf_counter()
+                        engine.process_codes(codes)
+                        t3 = time.perf_counter()
+                        decode_times.append(t2 - t1)
+                        process_times.append(t3 - t2)
+                        decoded += 1
+                    else:
+                        codes = engine.last_codes
+                        t3 = time.perf_counter()
+                        skipped += 1
+                    total_times.append(t3 - t0)
+
+                    found = {code_text(c) for c in codes}
+                    seen_codes |= found
+                    expected = per_frame_truth.get(key)
+                    if expected is not None:
+                        expected_pairs += len(expected)
+                        found_pairs += len(expected & found)
+                        false_positives += len(found - expected)
+
+        wall = time.perf_counter() - wall_start
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+        engine.stop_scanning()
+        emitted = len(engine.history)
+        engine.close()
+
+    cpu = (usage_end.ru_utime - usage_start.ru_utime) + (usage_end.ru_stime - usage_start.ru_stime)
+    # ru_maxrss em KiB no Linux (bytes no macOS)
+    max_rss_mb = usage_end.ru_maxrss / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+
+    result = {
+        "frames": frames,
+        "decoded_frames": decoded,
+        "skipped_frames": skipped,
+        "dropped_frames": dropped,
+        "wall_seconds": wall,
+        "fps": frames / wall if wall > 0 else 0.0,
+        "decode_fps": decoded / wall if wall > 0 else 0.0,
+        "latency_ms": {
+            "motion_gate": percentiles(gate_times),
+            "decode": percentiles(decode_times),
+            "process_codes": percentiles(process_times),
+            "total": percentiles(total_times),
+        },
+        "cpu_seconds": cpu,
+        "cpu_percent": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "max_rss_mb": max_rss_mb,
+        "emitted_scans": emitted,
+        "distinct_codes": len(seen_codes),
+        "cascade": engine.cascade.summary(),
+    }
+    if per_frame_truth:
+        result["frame_recall"] = found_pairs / expected_pairs if expected_pairs else 0.0
+        result["false_positives"] = false_positives
+    if anywhere_truth:
+        result["session_recall"] = len(anywhere_truth & seen_codes) / len(anywhere_truth)
+        result["missing_codes"] = sorted(anywhere_truth - seen_codes)
+    return result
+
+
+def print_report(result):
+    print(f"Frames: {result['frames']} (decodificados {result['decoded_frames']}, "
+          f"ignorados {result['skipped_frames']}, descartados {result['dropped_frames']})")
+    print(f"Tempo: {result['wall_seconds']:.2f} s | {result['fps']:.1f} frames/s | "
+          f"{result['decode_fps']:.1f} decodificações/s")
+    print(f"CPU: {result['cpu_seconds']:.2f} s ({result['cpu_percent']:.0f}%) | memória máx.: {result['max_rss_mb']:.0f} MB")
+    print("Latência (ms)      p50      p90      p95      p99      max")
+    for stage, values in result["latency_ms"].items():
+        print(f"  {stage:<14}" + "".join(f"{values[k]:9.2f}" for k in ("p50", "p90", "p95", "p99", "max")))
+    print(f"Leituras registradas: {result['emitted_scans']} | códigos distintos: {result['distinct_codes']}")
+    print(f"Acertos por variante: {result['cascade']}")
+    if "frame_recall" in result:
+        print(f"Recall por frame: {result['frame_recall'] * 100:.1f}% | falsos positivos: {result['false_positives']}")
+    if "session_recall" in result:
+        print(f"Recall da sessão: {result['session_recall'] * 100:.1f}%")
+        if result["missing_codes"]:
+            print(f"Não lidos: {', '.join(result['missing_codes'][:20])}")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de leitura")
+    parser.add_argument("--video", action="append", default=[], help="arquivo de vídeo (pode repetir)")
+    parser.add_argument("--images", action="append", default=[], help="pasta de imagens (pode repetir)")
+    parser.add_argument("--truth", default=None, help="gabarito CSV (frame,codigo)")
+    parser.add_argument("--pace", choices=("max", "realtime"), default="max", help="ritmo de entrega dos frames")
+    parser.add_argument("--fps", type=float, default=0, help="fps no modo realtime (padrão: do vídeo; 10 para imagens)")
+    parser.add_argument("--repeat", type=int, default=1, help="repete as fontes N vezes")
+    parser.add_argument("--json", default=None, help="grava o resultado em JSON para comparação")
+    parser.add_argument("--interval", type=float, default=30, help="intervalo (s) entre leituras do mesmo código")
+    parser.add_argument("--gray", action="store_true", help="entrega os frames em tons de cinza")
+    add_decode_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_arg_parser().parse_args(argv)
+    try:
+        result = run_benchmark(args)
+    except (IOError, ValueError) as e:
+        logger.error(str(e))
+        return 2
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
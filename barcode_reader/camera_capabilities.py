@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Descoberta de recursos da câmera (PTZ, limites de zoom/foco, resoluções) com cache em disco.
+
+Tudo o que o leitor precisa vem de uma única consulta param.cgi com os
+grupos concatenados (VAPIX aceita group=A,B,C), interpretada em um modelo
+tipado (CameraCapabilities). Só quando a câmera não publica os limites de
+PTZ em parâmetros é feita uma segunda consulta (ptz.cgi?query=limits).
+
+O resultado é guardado em um JSON por número de série, com validade (TTL),
+e um índice host → série: em reconexões e na partida de várias câmeras a
+descoberta sai do cache e a conexão fica só com o handshake RTSP. Mesmo
+assim o número de série do host é conferido em segundo plano a cada conexão
+(fetch_serial); se outra câmera assumiu o endereço, o host sai do índice
+(invalidate) e a descoberta completa roda de novo.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".axis_barcode_reader", "capabilities.json")
+DEFAULT_TTL = 24 * 3600.0
+
+# Grupos consultados de uma vez no param.cgi
+PARAM_GROUPS = (
+    "Brand.ProdShortName",
+    "Brand.ProdNbr",
+    "Properties.System.SerialNumber",
+    "Properties.Firmware.Version",
+    "Properties.PTZ",
+    "Properties.Image.Resolution",
+    "PTZ.Limit.L1",
+)
+
+
+def parse_params(text):
+    """Resposta do param.cgi ('root.A.B=valor' por linha) → {'A.B': 'valor'}; linhas de erro são ignoradas"""
+    params = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, _, value = line.partition("=")
+        if key.startswith("root."):
+            key = key[5:]
+        params[key] = value.strip()
+    return params
+
+
+def parse_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CameraCapabilities:
+    """Recursos da câmera relevantes para o leitor"""
+    serial: str = ""
+    model: str = ""
+    firmware: str = ""
+    ptz: bool = False
+    digital_zoom: bool = False
+    optical_zoom: bool = False
+    min_zoom: Optional[int] = None
+    max_zoom: Optional[int] = None
+    min_focus: Optional[int] = None
+    max_focus: Optional[int] = None
+    resolutions: List[str] = field(default_factory=list)
+    fetched_at: float = 0.0
+
+    @classmethod
+    def from_params(cls, params):
+        def yes(key):
+            return params.get(key, "").lower() == "yes"
+
+        resolutions = [r.strip() for r in params.get("Properties.Image.Resolution", "").split(",") if r.strip()]
+        return cls(
+            serial=params.get("Properties.System.SerialNumber", ""),
+            model=params.get("Brand.ProdShortName") or params.get("Brand.ProdNbr", ""),
+            firmware=params.get("Properties.Firmware.Version", ""),
+            ptz=yes("Properties.PTZ.PTZ"),
+            digital_zoom=yes("Properties.PTZ.DigitalZoom") or yes("Properties.PTZ.DigitalPTZ"),
+            optical_zoom=yes("Properties.PTZ.OpticalZoom"),
+            min_zoom=parse_int(params.get("PTZ.Limit.L1.MinZoom")),
+            max_zoom=parse_int(params.get("PTZ.Limit.L1.MaxZoom")),
+            min_focus=parse_int(params.get("PTZ.Limit.L1.MinFocus")),
+            max_focus=parse_int(params.get("PTZ.Limit.L1.MaxFocus")),
+            resolutions=resolutions,
+            fetched_at=time.time(),
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def to_dict(self):
+        return asdict(self)
+
+    def has_zoom_limits(self):
+        return self.min_zoom is not None and self.max_zoom is not None
+
+    def zoom_kind(self):
+        """Sufixo da mensagem de status: ' (Digital)', ' (Óptico)' ou ''"""
+        if self.optical_zoom:
+            return " (Óptico)"
+        if self.digital_zoom:
+            return " (Digital)"
+        return ""
+
+
+def fetch_capabilities(vapix, timeout=3):
+    """Descobre os recursos pela API VAPIX (rodar na thread do VapixClient)"""
+    resp = vapix.get("param.cgi", params={"action": "list", "group": ",".join(PARAM_GROUPS)}, timeout=timeout)
+    if resp.status_code != 200:
+        raise IOError(f"param.cgi respondeu {resp.status_code}")
+    params = parse_params(resp.text)
+    if "Properties.PTZ.PTZ" not in params and "# Error" in resp.text:
+        # Alguns firmwares rejeitam a consulta inteira se um grupo não existe: consulta um a um
+        logger.info(f"[{vapix.name}] param.cgi em lote incompleto; consultando grupos separadamente")
+        for group in PARAM_GROUPS:
+            r = vapix.get("param.cgi", params={"action": "list", "group": group}, timeout=timeout)
+            if r.status_code == 200:
+                params.update(parse_params(r.text))
+    caps = CameraCapabilities.from_params(params)
+
+    if caps.ptz and not caps.has_zoom_limits():
+        # Limites não publicados como parâmetros: pergunta ao ptz.cgi
+        r = vapix.get("com/ptz.cgi", params={"query": "limits", "camera": 1}, timeout=timeout)
+        if r.status_code == 200:
+            limits = parse_params(r.text)
+            caps.min_zoom = parse_int(limits.get("MinZoom"))
+            caps.max_zoom = parse_int(limits.get("MaxZoom"))
+            caps.min_focus = parse_int(limits.get("MinFocus"))
+            caps.max_focus = parse_int(limits.get("MaxFocus"))
+    return caps
+
+
+def fetch_serial(vapix, timeout=3):
+    """Só o número de série (consulta barata para conferir se o cache ainda vale para o host)"""
+    resp = vapix.get("param.cgi", params={"action": "list", "group": "Properties.System.SerialNumber"},
+                     timeout=timeout)
+    if resp.status_code != 200:
+        raise IOError(f"param.cgi respondeu {resp.status_code}")
+    return parse_params(resp.text).get("Properties.System.SerialNumber", "")
+
+
+class CapabilityCache:
+    """Cache em disco dos recursos por número de série, com validade (TTL) e índice host → série"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.serials = {}  # série -> dict de CameraCapabilities
+        self.hosts = {}    # host -> série
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.serials = dict(data.get("serials") or {})
+            self.hosts = dict(data.get("hosts") or {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Cache de recursos ilegível ({self.path}), ignorado: {e}")
+
+    def save(self):
+        """Grava de forma atômica (arquivo temporário + os.replace); chamar com o lock"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"serials": self.serials, "hosts": self.hosts}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o cache de recursos: {e}")
+
+    def get(self, host):
+        """Recursos ainda válidos da câmera que respondeu por último neste host, ou None"""
+        with self.lock:
+            serial = self.hosts.get(host)
+            data = self.serials.get(serial) if serial else None
+        if not data:
+            return None
+        caps = CameraCapabilities.from_dict(data)
+        if time.time() - caps.fetched_at > self.ttl:
+            return None
+        return caps
+
+    def put(self, host, caps):
+        if not caps.serial:
+            return  # sem série não há como reconhecer a câmera depois
+        with self.lock:
+            self.serials[caps.serial] = caps.to_dict()
+            self.hosts[host] = caps.serial
+            self.save()
+
+    def invalidate(self, host):
+        with self.lock:
+            if self.hosts.pop(host, None) is not None:
+                self.save()
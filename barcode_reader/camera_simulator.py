@@ -0,0 +1,758 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Simulador local de câmeras Axis (RTSP + VAPIX) para testes de carga e de resistência.
+
+Cada câmera simulada escuta em uma porta TCP que atende os dois protocolos:
+
+- RTSP (axis-media/media.amp): MJPEG sobre RTP (RFC 2435), intercalado no
+  próprio TCP (RTP/AVP/TCP). Os parâmetros resolution e fps da URL são
+  respeitados por sessão.
+- HTTP (axis-cgi): ptz.cgi (info, limits, zoom, foco, autofoco), param.cgi,
+  jpg/image.cgi e io/port.cgi (entrada 1 = fotocélula no centro da esteira,
+  com checkactive e monitor=1), com autenticação digest como na câmera real.
+
+Os frames são sintéticos: uma esteira com caixas que passam da esquerda para a
+direita, cada uma com um QR code único (PREFIXO-câmera-sequência). Para testar
+reconexão, --drop-after derruba as sessões RTSP periodicamente, --stall-after
+para de enviar frames sem fechar a conexão (rede muda) e --refuse-for recusa
+novas conexões por alguns segundos depois de cada queda.
+
+Exemplo (4 câmeras nas portas 8554..8557 e arquivo pronto para --cameras):
+
+    python camera_simulator.py --cameras 4 --password pass --write-config sim_cameras.json
+    python axis_barcode_reader.py --headless --cameras sim_cameras.json
+
+Limites: MJPEG/RTP só descreve imagens até 2040x2040 px; UDP não é suportado
+(o cliente deve usar RTSP sobre TCP, que é o padrão dos backends do leitor).
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REALM = "AXIS_SIMULATOR"
+RTP_CLOCK = 90000
+RTP_PAYLOAD_JPEG = 26
+MAX_FRAGMENT = 16000  # bytes de JPEG por pacote RTP (o TCP intercalado aceita até 64 KiB)
+
+
+# ----------------------------------------------------------------------
+# Cena sintética
+# ----------------------------------------------------------------------
+class SyntheticScene:
+    """Esteira com caixas e QR codes únicos, renderizada em função do tempo"""
+
+    def __init__(self, width=1280, height=720, prefix="SIM", camera_index=0, speed=240.0, spacing=420,
+                 module_px=6):
+        self.width = width
+        self.height = height
+        self.prefix = prefix
+        self.camera_index = camera_index
+        self.speed = speed        # pixels por segundo
+        self.spacing = spacing    # pixels entre o início de duas caixas
+        self.module_px = module_px
+        self.encoder = cv2.QRCodeEncoder.create()
+        self.cache = {}           # sequência -> imagem da caixa (só as visíveis)
+        self.background = np.full((height, width, 3), 70, dtype=np.uint8)
+        belt_top, belt_bottom = int(height * 0.2), int(height * 0.8)
+        self.background[belt_top:belt_bottom] = (45, 45, 45)
+        for x in range(0, width, 80):
+            cv2.line(self.background, (x, belt_top), (x, belt_bottom), (55, 55, 55), 2)
+        self.box_side = self.box_image(0).shape[0]  # todos os códigos têm o mesmo tamanho
+        self.start = time.monotonic()
+
+    def code_for(self, seq):
+        return f"{self.prefix}-{self.camera_index}-{seq:06d}"
+
+    def box_image(self, seq):
+        box = self.cache.get(seq)
+        if box is None:
+            qr = self.encoder.encode(self.code_for(seq))
+            qr = cv2.resize(qr, None, fx=self.module_px, fy=self.module_px, interpolation=cv2.INTER_NEAREST)
+            pad = 4 * self.module_px  # zona de silêncio
+            side = qr.shape[0] + 2 * pad
+            box = np.full((side, side, 3), 235, dtype=np.uint8)
+            box[pad:pad + qr.shape[0], pad:pad + qr.shape[1]] = cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR)
+            self.cache[seq] = box
+        return box
+
+    def render(self, now=None):
+        """Frame BGR no instante now (monotonic) e a lista de códigos visíveis por inteiro"""
+        elapsed = (now if now is not None else time.monotonic()) - self.start
+        frame = self.background.copy()
+        travelled = elapsed * self.speed
+        # A caixa seq entra pela esquerda quando travelled == seq * spacing
+        first = max(0, int((travelled - self.width) // self.spacing))
+        last = int(travelled // self.spacing)
+        visible = []
+        for seq in range(first, last + 1):
+            box = self.box_image(seq)
+            side = box.shape[0]
+            x = int(travelled - seq * self.spacing) - side
+            y = (self.height - side) // 2
+            x0, x1 = max(0, x), min(self.width, x + side)
+            y0, y1 = max(0, y), min(self.height, y + side)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            frame[y0:y1, x0:x1] = box[y0 - y:y1 - y, x0 - x:x1 - x]
+            if x >= 0 and x + side <= self.width:
+                visible.append(self.code_for(seq))
+        for seq in [s for s in self.cache if s < first]:
+            del self.cache[seq]
+        cv2.putText(frame, time.strftime("%H:%M:%S"), (16, 36), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        return frame, visible
+
+    def sensor_active(self, now=None):
+        """Fotocélula no centro da esteira: True enquanto alguma caixa cobre a coluna central"""
+        elapsed = (now if now is not None else time.monotonic()) - self.start
+        travelled = elapsed * self.speed
+        centre = self.width / 2
+        # Última caixa cuja borda direita já passou do centro
+        seq = int((travelled - centre) // self.spacing)
+        if seq < 0:
+            return False
+        return travelled - seq * self.spacing - self.box_side <= centre
+
+
+# ----------------------------------------------------------------------
+# MJPEG sobre RTP (RFC 2435)
+# ----------------------------------------------------------------------
+def parse_jpeg(data):
+    """Extrai de um JPEG baseline: (tipo RTP, largura, altura, tabelas de quantização, dados do scan)"""
+    pos = 2  # depois do SOI
+    tables = {}
+    width = height = 0
+    jpeg_type = None
+    while pos < len(data) - 4:
+        if data[pos] != 0xFF:
+            raise ValueError("JPEG inválido: marcador esperado")
+        marker = data[pos + 1]
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        segment = data[pos + 4:pos + 2 + length]
+        if marker == 0xDB:  # DQT (uma ou mais tabelas de 8 bits)
+            i = 0
+            while i < len(segment):
+                table_id = segment[i] & 0x0F
+                tables[table_id] = segment[i + 1:i + 65]
+                i += 65
+        elif marker == 0xC0:  # SOF0
+            height, width = struct.unpack(">HH", segment[1:5])
+            if segment[5] != 3:
+                raise ValueError("Somente JPEG colorido (3 componentes)")
+            sampling = segment[7]
+            jpeg_type = {0x21: 0, 0x22: 1}.get(sampling)
+            if jpeg_type is None:
+                raise ValueError(f"Subamostragem não suportada: {sampling:#x}")
+        elif marker == 0xDD:
+            raise ValueError("Marcadores de reinício não suportados")
+        elif marker == 0xDA:  # SOS: o restante até o EOI é o scan
+            scan = data[pos + 2 + length:]
+            if scan[-2:] == b"\xff\xd9":
+                scan = scan[:-2]
+            qtables = b"".join(bytes(tables[k]) for k in sorted(tables))
+            return jpeg_type, width, height, qtables, scan
+        pos += 2 + length
+    raise ValueError("JPEG sem SOS")
+
+
+def jpeg_rtp_packets(jpeg, seq, timestamp, ssrc, max_fragment=MAX_FRAGMENT):
+    """Fragmenta um JPEG em pacotes RTP; devolve (pacotes, próximo número de sequência)"""
+    jpeg_type, width, height, qtables, scan = parse_jpeg(jpeg)
+    if width > 2040 or height > 2040:
+        raise ValueError("MJPEG/RTP limitado a 2040x2040")
+    packets = []
+    offset = 0
+    while offset < len(scan):
+        chunk = scan[offset:offset + max_fragment]
+        last = offset + len(chunk) >= len(scan)
+        rtp = struct.pack(">BBHII", 0x80, (0x80 if last else 0) | RTP_PAYLOAD_JPEG, seq & 0xFFFF,
+                          timestamp & 0xFFFFFFFF, ssrc)
+        # Cabeçalho JPEG: tipo específico, offset (24 bits), tipo, Q=255 (tabelas em banda), largura/8, altura/8
+        header = struct.pack(">BBHBBBB", 0, (offset >> 16) & 0xFF, offset & 0xFFFF, jpeg_type, 255,
+                             width // 8, height // 8)
+        if offset == 0:
+            header += struct.pack(">BBH", 0, 0, len(qtables)) + qtables
+        packets.append(rtp + header + chunk)
+        offset += len(chunk)
+        seq += 1
+    return packets, seq
+
+
+# ----------------------------------------------------------------------
+# Autenticação digest (HTTP e RTSP)
+# ----------------------------------------------------------------------
+def md5_hex(text):
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def parse_digest(header):
+    if not header or not header.lower().startswith("digest "):
+        return None
+    return {k.lower(): v1 or v2 for k, v1, v2 in re.findall(r'(\w+)=(?:"([^"]*)"|([^\s,]+))', header[7:])}
+
+
+class DigestAuth:
+    """Verificação digest (MD5, qop=auth ou legado) com nonces emitidos pelo próprio servidor"""
+
+    def __init__(self, username, password, nonce_ttl=300.0):
+        self.username = username
+        self.password = password
+        self.nonce_ttl = nonce_ttl
+        self.lock = threading.Lock()
+        self.nonces = {}  # nonce -> instante de emissão
+
+    def enabled(self):
+        return bool(self.password)
+
+    def challenge(self):
+        nonce = os.urandom(16).hex()
+        now = time.monotonic()
+        with self.lock:
+            self.nonces = {n: t for n, t in self.nonces.items() if now - t < self.nonce_ttl}
+            self.nonces[nonce] = now
+        return f'Digest realm="{REALM}", nonce="{nonce}", algorithm=MD5, qop="auth"'
+
+    def check(self, method, header):
+        if not self.enabled():
+            return True
+        fields = parse_digest(header)
+        if not fields or fields.get("username") != self.username:
+            return False
+        with self.lock:
+            if fields.get("nonce") not in self.nonces:
+                return False
+        ha1 = md5_hex(f"{self.username}:{REALM}:{self.password}")
+        ha2 = md5_hex(f"{method}:{fields.get('uri', '')}")
+        if fields.get("qop"):
+            expected = md5_hex(f"{ha1}:{fields['nonce']}:{fields.get('nc', '')}:{fields.get('cnonce', '')}:"
+                               f"{fields['qop']}:{ha2}")
+        else:
+            expected = md5_hex(f"{ha1}:{fields['nonce']}:{ha2}")
+        return expected == fields.get("response")
+
+
+# ----------------------------------------------------------------------
+# Câmera simulada
+# ----------------------------------------------------------------------
+class SimulatedCamera:
+    """Uma câmera: cena renderizada por uma thread própria e servidor RTSP/HTTP em uma porta"""
+
+    def __init__(self, index=0, host="127.0.0.1", port=8554, username="root", password="", width=1280,
+                 height=720, fps=25.0, quality=80, prefix="SIM", speed=240.0, spacing=420, drop_after=0.0,
+                 refuse_for=0.0, stall_after=0.0):
+        self.index = index
+        self.name = f"sim{index}"
+        self.fps = fps
+        self.quality = quality
+        self.scene = SyntheticScene(width, height, prefix=prefix, camera_index=index, speed=speed, spacing=spacing)
+        self.auth = DigestAuth(username, password)
+        self.drop_after = drop_after  # derruba cada sessão RTSP depois de N s (0 = nunca)
+        self.refuse_for = refuse_for  # depois de uma queda, recusa conexões por N s
+        self.stall_after = stall_after  # para de enviar (sem fechar) depois de N s de sessão
+        self.refuse_until = 0.0
+        # Estado VAPIX simulado
+        self.zoom = 1
+        self.focus = 5000
+        self.autofocus = "on"
+        # Frame mais recente (compartilhado pelas sessões)
+        self.cond = threading.Condition()
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = 0.0
+        self.jpeg_cache = {}  # (largura, altura) -> (frame_id, jpeg) do frame atual
+        self.sessions = 0
+        self.frames_sent = 0
+        self.running = False
+        self.render_thread = None
+
+        camera = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                ConnectionHandler(camera, self.connection, self.rfile).serve()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.server_thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self):
+        self.running = True
+        self.render_thread = threading.Thread(target=self.render_loop, name=f"{self.name}-render", daemon=True)
+        self.render_thread.start()
+        self.server_thread = threading.Thread(target=self.server.serve_forever, name=f"{self.name}-server",
+                                              daemon=True)
+        self.server_thread.start()
+        logger.info(f"[{self.name}] rtsp://{self.address}/axis-media/media.amp e http://{self.address}/axis-cgi")
+        return self
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def render_loop(self):
+        interval = 1.0 / self.fps
+        next_due = time.monotonic()
+        while self.running:
+            frame, _ = self.scene.render()
+            with self.cond:
+                self.frame = frame
+                self.frame_id += 1
+                self.frame_time = time.monotonic()
+                self.jpeg_cache = {}
+                self.cond.notify_all()
+            next_due += interval
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_due = time.monotonic()  # atrasado: não tenta compensar em rajada
+
+    def wait_frame(self, last_id, timeout=1.0):
+        """Espera um frame mais novo que last_id: (frame_id, frame) ou (last_id, None)"""
+        with self.cond:
+            if self.frame_id == last_id:
+                self.cond.wait(timeout)
+            if self.frame_id == last_id or self.frame is None:
+                return last_id, None
+            return self.frame_id, self.frame
+
+    def jpeg(self, frame_id, frame, size=None, quality=None):
+        """JPEG do frame na resolução pedida; o mesmo frame/resolução é codificado uma vez só"""
+        key = (size, quality)
+        with self.cond:
+            cached = self.jpeg_cache.get(key)
+        if cached is not None and cached[0] == frame_id:
+            return cached[1]
+        if size and size != (frame.shape[1], frame.shape[0]):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality or self.quality])
+        data = buf.tobytes() if ok else b""
+        with self.cond:
+            if self.frame_id == frame_id:
+                self.jpeg_cache[key] = (frame_id, data)
+        return data
+
+    def snapshot(self, size=None, quality=None):
+        with self.cond:
+            frame_id, frame = self.frame_id, self.frame
+        if frame is None:
+            frame, _ = self.scene.render()
+        return self.jpeg(frame_id, frame, size, quality)
+
+    def refusing(self):
+        return time.monotonic() < self.refuse_until
+
+    def dropped(self):
+        if self.refuse_for > 0:
+            self.refuse_until = time.monotonic() + self.refuse_for
+
+
+def parse_resolution(text, default):
+    """'640x360' → (640, 360), ajustado a múltiplos de 8 (exigência do MJPEG/RTP)"""
+    try:
+        w, h = (int(v) for v in str(text).lower().split("x"))
+    except (TypeError, ValueError):
+        return default
+    w, h = max(8, min(2040, w - w % 8)), max(8, min(2040, h - h % 8))
+    return (w, h)
+
+
+class ConnectionHandler:
+    """Uma conexão TCP: decide entre HTTP e RTSP pela linha de requisição"""
+
+    def __init__(self, camera, sock, rfile):
+        self.camera = camera
+        self.sock = sock
+        self.rfile = rfile
+        self.write_lock = threading.Lock()
+        self.session_id = None
+        self.stream_thread = None
+        self.streaming = threading.Event()
+        self.closed = threading.Event()
+        self.stream_size = None
+        self.stream_fps = camera.fps
+        self.interleaved = 0
+        self.ssrc = random.getrandbits(32)
+
+    def send(self, data):
+        with self.write_lock:
+            self.sock.sendall(data)
+
+    def read_request(self):
+        """(linha de requisição, cabeçalhos) ou None quando a conexão fecha"""
+        while True:
+            first = self.rfile.peek(1)[:1] if hasattr(self.rfile, "peek") else b""
+            if first == b"$":
+                # RTCP/RTP intercalado enviado pelo cliente: descartado
+                header = self.rfile.read(4)
+                if len(header) < 4:
+                    return None
+                self.rfile.read(struct.unpack(">H", header[2:4])[0])
+                continue
+            line = self.rfile.readline(65537)
+            if not line:
+                return None
+            line = line.decode("latin-1").strip()
+            if line:
+                break
+        headers = {}
+        while True:
+            raw = self.rfile.readline(65537)
+            if not raw or raw in (b"\r\n", b"\n"):
+                break
+            key, _, value = raw.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if length:
+            self.rfile.read(length)
+        return line, headers
+
+    def serve(self):
+        if self.camera.refusing():
+            return  # fecha sem responder, como uma câmera reiniciando
+        try:
+            while not self.closed.is_set():
+                request = self.read_request()
+                if request is None:
+                    break
+                line, headers = request
+                parts = line.split()
+                if len(parts) != 3:
+                    break
+                method, uri, version = parts
+                if version.startswith("RTSP/"):
+                    self.handle_rtsp(method, uri, headers)
+                elif version.startswith("HTTP/"):
+                    if not self.handle_http(method, uri, version, headers):
+                        break
+                else:
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.streaming.clear()
+            self.closed.set()
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # HTTP (axis-cgi)
+    # ------------------------------------------------------------------
+    def http_response(self, version, status, body=b"", content_type="text/plain", extra=None, keep_alive=True):
+        reasons = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found"}
+        lines = [f"{version} {status} {reasons.get(status, 'OK')}", f"Content-Type: {content_type}",
+                 f"Content-Length: {len(body)}", "Connection: " + ("keep-alive" if keep_alive else "close")]
+        for key, value in (extra or {}).items():
+            lines.append(f"{key}: {value}")
+        self.send(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    def handle_http(self, method, uri, version, headers):
+        """Atende uma requisição HTTP; devolve False quando a conexão deve fechar"""
+        keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+        if not self.camera.auth.check(method, headers.get("authorization")):
+            self.http_response(version, 401, b"Unauthorized", extra={"WWW-Authenticate": self.camera.auth.challenge()},
+                               keep_alive=keep_alive)
+            return keep_alive
+        url = urlsplit(uri)
+        query = dict(parse_qsl(url.query))
+        if url.path == "/axis-cgi/io/port.cgi" and "monitor" in query:
+            self.monitor_port(version)
+            return False
+        status, body, content_type = self.axis_cgi(url.path, query)
+        self.http_response(version, status, body, content_type, keep_alive=keep_alive)
+        return keep_alive
+
+    def axis_cgi(self, path, query):
+        camera = self.camera
+        if path == "/axis-cgi/jpg/image.cgi":
+            size = parse_resolution(query.get("resolution"), None)
+            quality = None
+            if "compression" in query:
+                try:
+                    quality = max(5, min(100, 100 - int(query["compression"])))
+                except ValueError:
+                    pass
+            return 200, camera.snapshot(size, quality), "image/jpeg"
+        if path == "/axis-cgi/com/ptz.cgi":
+            if "info" in query:
+                return 200, b"Available commands:\nzoom=n\nfocus=n\nautofocus=on|off\n", "text/plain"
+            if query.get("query") == "limits":
+                return 200, b"MinZoom=1\nMaxZoom=9999\nMinFocus=1\nMaxFocus=9999\n", "text/plain"
+            if query.get("query") == "position":
+                return 200, (f"zoom={camera.zoom}\nfocus={camera.focus}\nautofocus={camera.autofocus}\n"
+                             .encode("utf-8")), "text/plain"
+            for key in ("zoom", "focus"):
+                if key in query:
+                    try:
+                        setattr(camera, key, int(float(query[key])))
+                    except ValueError:
+                        return 400, b"Error: invalid value\n", "text/plain"
+            if "autofocus" in query:
+                camera.autofocus = query["autofocus"]
+            return 204, b"", "text/plain"
+        if path == "/axis-cgi/param.cgi":
+            w, h = camera.scene.width, camera.scene.height
+            params = {
+                "root.Brand.ProdShortName": "AXIS Simulator",
+                "root.Brand.ProdNbr": "SIM-1",
+                "root.Properties.System.SerialNumber": f"ACCC8E{camera.index:06X}",
+                "root.Properties.Firmware.Version": "10.12.0",
+                "root.Properties.PTZ.PTZ": "yes",
+                "root.Properties.PTZ.DigitalPTZ": "yes",
+                "root.Properties.Image.Resolution": f"{w}x{h},{w // 2}x{h // 2},{w // 4}x{h // 4}",
+                "root.Properties.Image.Format": "jpeg,mjpeg",
+                "root.Properties.API.HTTP.Version": "3",
+                "root.PTZ.Limit.L1.MinZoom": "1",
+                "root.PTZ.Limit.L1.MaxZoom": "9999",
+                "root.PTZ.Limit.L1.MinFocus": "1",
+                "root.PTZ.Limit.L1.MaxFocus": "9999",
+            }
+            groups = [g.strip() for g in query.get("group", "").split(",") if g.strip()] or ["root"]
+            lines = []
+            for group in groups:
+                prefix = group if group.startswith("root") else "root." + group
+                matches = [f"{k}={v}" for k, v in params.items() if k == prefix or k.startswith(prefix + ".")]
+                lines.extend(matches or [f"# Error: Error -1 getting param in group '{group}'"])
+            return 200, ("\n".join(lines) + "\n").encode("utf-8"), "text/plain"
+        if path == "/axis-cgi/io/port.cgi":
+            if query.get("checkactive") == "1":
+                state = "active" if camera.scene.sensor_active() else "inactive"
+                return 200, f"port1={state}\n".encode("utf-8"), "text/plain"
+            return 400, b"Error: unsupported action\n", "text/plain"
+        return 404, b"Not Found", "text/plain"
+
+    def monitor_port(self, version):
+        """port.cgi?monitor=1: multipart contínuo com "1:H"/"1:L" a cada mudança da fotocélula"""
+        self.send((f"{version} 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=myboundary\r\n"
+                   "Connection: close\r\n\r\n").encode("latin-1"))
+        state = None
+        while not self.closed.is_set() and self.camera.running:
+            active = self.camera.scene.sensor_active()
+            if active != state:
+                state = active
+                self.send(f"--myboundary\r\nContent-Type: text/plain\r\n\r\n1:{'H' if active else 'L'}\r\n"
+                          .encode("latin-1"))
+            time.sleep(0.01)
+
+    # ------------------------------------------------------------------
+    # RTSP (media.amp)
+    # ------------------------------------------------------------------
+    def rtsp_response(self, cseq, status=200, reason="OK", headers=None, body=b""):
+        lines = [f"RTSP/1.0 {status} {reason}", f"CSeq: {cseq}", "Server: AXIS Simulator"]
+        if self.session_id:
+            lines.append(f"Session: {self.session_id};timeout=60")
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        if body:
+            lines.append(f"Content-Length: {len(body)}")
+        self.send(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    def handle_rtsp(self, method, uri, headers):
+        cseq = headers.get("cseq", "0")
+        camera = self.camera
+        if method == "OPTIONS":
+            self.rtsp_response(cseq, headers={"Public": "OPTIONS, DESCRIBE, SETUP, PLAY, TEARDOWN, GET_PARAMETER"})
+            return
+        if not camera.auth.check(method, headers.get("authorization")):
+            self.rtsp_response(cseq, 401, "Unauthorized", {"WWW-Authenticate": camera.auth.challenge()})
+            return
+        if method == "DESCRIBE":
+            url = urlsplit(uri)
+            if not url.path.startswith("/axis-media/media.amp"):
+                self.rtsp_response(cseq, 404, "Not Found")
+                return
+            query = dict(parse_qsl(url.query))
+            self.stream_size = parse_resolution(query.get("resolution"), None)
+            try:
+                self.stream_fps = min(camera.fps, float(query.get("fps") or camera.fps)) or camera.fps
+            except ValueError:
+                self.stream_fps = camera.fps
+            w, h = self.stream_size or (camera.scene.width, camera.scene.height)
+            sdp = (f"v=0\r\no=- {self.ssrc} 1 IN IP4 127.0.0.1\r\ns=AXIS Simulator {camera.name}\r\n"
+                   f"c=IN IP4 0.0.0.0\r\nt=0 0\r\na=control:*\r\n"
+                   f"m=video 0 RTP/AVP {RTP_PAYLOAD_JPEG}\r\na=rtpmap:{RTP_PAYLOAD_JPEG} JPEG/{RTP_CLOCK}\r\n"
+                   f"a=framerate:{self.stream_fps:g}\r\na=x-dimensions:{w},{h}\r\na=control:trackID=1\r\n")
+            base = uri.split("?")[0].rstrip("/") + "/"
+            self.rtsp_response(cseq, headers={"Content-Type": "application/sdp", "Content-Base": base},
+                               body=sdp.encode("ascii"))
+            return
+        if method == "SETUP":
+            transport = headers.get("transport", "")
+            if "RTP/AVP/TCP" not in transport.upper():
+                self.rtsp_response(cseq, 461, "Unsupported Transport")
+                return
+            match = re.search(r"interleaved=(\d+)", transport)
+            self.interleaved = int(match.group(1)) if match else 0
+            self.session_id = self.session_id or os.urandom(6).hex().upper()
+            self.rtsp_response(cseq, headers={
+                "Transport": f"RTP/AVP/TCP;unicast;interleaved={self.interleaved}-{self.interleaved + 1};"
+                             f"ssrc={self.ssrc:08X}"})
+            return
+        if method == "PLAY":
+            self.rtsp_response(cseq, headers={"Range": "npt=0.000-"})
+            if not self.streaming.is_set():
+                self.streaming.set()
+                self.stream_thread = threading.Thread(target=self.stream_loop, name=f"{camera.name}-rtp",
+                                                      daemon=True)
+                self.stream_thread.start()
+            return
+        if method == "TEARDOWN":
+            self.streaming.clear()
+            self.rtsp_response(cseq)
+            self.closed.set()
+            return
+        if method in ("GET_PARAMETER", "SET_PARAMETER"):
+            self.rtsp_response(cseq)
+            return
+        self.rtsp_response(cseq, 405, "Method Not Allowed")
+
+    def stream_loop(self):
+        camera = self.camera
+        with camera.cond:
+            camera.sessions += 1
+        started = time.monotonic()
+        interval = 1.0 / self.stream_fps
+        next_due = started
+        seq = random.getrandbits(16)
+        frame_id = 0
+        logger.info(f"[{camera.name}] Sessão RTSP {self.session_id} iniciada ({self.stream_size or 'nativa'}, "
+                    f"{self.stream_fps:g} fps)")
+        try:
+            while self.streaming.is_set() and camera.running:
+                if camera.drop_after and time.monotonic() - started >= camera.drop_after:
+                    logger.info(f"[{camera.name}] Derrubando a sessão {self.session_id} (--drop-after)")
+                    camera.dropped()
+                    break
+                if camera.stall_after and time.monotonic() - started >= camera.stall_after:
+                    logger.info(f"[{camera.name}] Sessão {self.session_id} muda (--stall-after)")
+                    camera.dropped()
+                    while self.streaming.is_set() and camera.running and not self.closed.is_set():
+                        time.sleep(0.2)  # conexão aberta, nenhum dado: o cliente precisa perceber sozinho
+                    break
+                frame_id, frame = camera.wait_frame(frame_id)
+                if frame is None:
+                    continue
+                now = time.monotonic()
+                if now < next_due:
+                    continue  # fps da sessão menor que o da cena
+                next_due = max(next_due + interval, now - interval)
+                data = camera.jpeg(frame_id, frame, self.stream_size)
+                timestamp = int((now - started) * RTP_CLOCK)
+                packets, seq = jpeg_rtp_packets(data, seq, timestamp, self.ssrc)
+                chunks = [struct.pack(">BBH", 0x24, self.interleaved, len(p)) + p for p in packets]
+                self.send(b"".join(chunks))
+                camera.frames_sent += 1
+        except (OSError, ValueError) as e:
+            logger.debug(f"[{camera.name}] Sessão {self.session_id} encerrada: {e}")
+        finally:
+            with camera.cond:
+                camera.sessions -= 1
+            self.streaming.clear()
+            self.closed.set()
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+# ----------------------------------------------------------------------
+# Linha de comando
+# ----------------------------------------------------------------------
+def start_cameras(count, host="127.0.0.1", base_port=8554, **options):
+    return [SimulatedCamera(index=i, host=host, port=base_port + i, **options).start() for i in range(count)]
+
+
+def camera_configs(cameras, username, password, host):
+    """Lista no formato do --cameras (supervisor): RTSP e VAPIX na mesma porta"""
+    configs = []
+    for cam in cameras:
+        port = cam.server.server_address[1]
+        configs.append({"name": cam.name, "ip": f"{host}:{port}", "http_port": port,
+                        "username": username, "password": password})
+    return configs
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Simulador local de câmeras Axis (RTSP MJPEG + axis-cgi)")
+    parser.add_argument("--cameras", type=int, default=1, help="número de câmeras simuladas")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço de escuta")
+    parser.add_argument("--base-port", type=int, default=8554, help="porta da primeira câmera (as demais em sequência)")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("AXIS_PASSWORD", ""),
+                        help="senha digest (vazio = sem autenticação)")
+    parser.add_argument("--resolution", default="1280x720", help="resolução nativa das câmeras")
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--quality", type=int, default=80, help="qualidade JPEG (1-100)")
+    parser.add_argument("--prefix", default="SIM", help="prefixo dos códigos gerados")
+    parser.add_argument("--speed", type=float, default=240.0, help="velocidade da esteira (px/s)")
+    parser.add_argument("--spacing", type=int, default=420, help="distância entre caixas (px)")
+    parser.add_argument("--drop-after", type=float, default=0, help="derruba cada sessão RTSP depois de N s")
+    parser.add_argument("--stall-after", type=float, default=0,
+                        help="para de enviar frames depois de N s, sem fechar a conexão")
+    parser.add_argument("--refuse-for", type=float, default=0, help="recusa conexões por N s depois de cada queda")
+    parser.add_argument("--write-config", default=None, help="grava o JSON de câmeras para o --cameras do leitor")
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_arg_parser().parse_args(argv)
+    width, height = parse_resolution(args.resolution, (1280, 720))
+    try:
+        cameras = start_cameras(args.cameras, args.host, args.base_port, username=args.user, password=args.password,
+                                width=width, height=height, fps=args.fps, quality=args.quality, prefix=args.prefix,
+                                speed=args.speed, spacing=args.spacing, drop_after=args.drop_after,
+                                refuse_for=args.refuse_for, stall_after=args.stall_after)
+    except OSError as e:
+        logger.error(f"Não foi possível abrir as portas a partir de {args.base_port}: {e}")
+        return 2
+
+    if args.write_config:
+        with open(args.write_config, "w", encoding="utf-8") as f:
+            json.dump({"cameras": camera_configs(cameras, args.user, args.password, args.host)}, f, indent=2)
+        logger.info(f"Configuração das câmeras gravada em {args.write_config}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    last_sent = 0
+    while not stop.wait(10.0):
+        sent = sum(c.frames_sent for c in cameras)
+        sessions = sum(c.sessions for c in cameras)
+        logger.info(f"{sessions} sessões RTSP ativas | {(sent - last_sent) / 10.0:.1f} frames/s enviados")
+        last_sent = sent
+    for cam in cameras:
+        cam.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Backends de captura RTSP selecionáveis.
+
+Todos expõem a mesma interface mínima de cv2.VideoCapture usada pelo motor
+(isOpened/read/set/release), então o capture_loop não muda. Diferenças:
+
+- opencv: cv2.VideoCapture + FFmpeg (comportamento original).
+- gstreamer: pipeline rtspsrc → (decodificador por hardware, se indicado) →
+  GRAY8/BGR direto no appsink, com descarte de frames não-chave opcional.
+- pyav: FFmpeg via PyAV, com skip_frame=NONKEY e leitura do plano Y.
+
+Todos aceitam open_timeout/read_timeout (segundos): uma conexão muda não
+bloqueia o read() para sempre, e o capture_loop consegue detectar a queda e
+reabrir o stream (ver stream_watchdog.py).
+
+Com gray=True o frame entregue já é o plano de luminância (tudo que o zbar
+precisa). Os frames são escritos em um anel de buffers pré-alocados em vez de
+um array novo por frame. Um buffer só é reaproveitado depois que nenhum
+consumidor o referencia mais (frame mais recente, fila do escalonador,
+decodificação, preview, views/recortes): a contagem de referências do Python
+serve de empréstimo. Se todos estiverem em uso, o frame que chega é
+descartado (ring_full) em vez de sobrescrever um buffer ainda lido.
+"""
+
+import logging
+import os
+import sys
+from urllib.parse import quote, urlsplit, urlunsplit
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_BACKENDS = ("opencv", "gstreamer", "pyav")
+
+
+def with_credentials(url, username, password):
+    """Insere usuário/senha codificados em uma URL rtsp://host/..."""
+    if not username:
+        return url
+    parts = urlsplit(url)
+    netloc = f"{quote(username, safe='')}:{quote(password or '', safe='')}@{parts.netloc}"
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+class FrameRing:
+    """Anel de buffers pré-alocados; realoca só quando o formato do frame muda.
+
+    next() devolve um buffer que ninguém fora do anel referencia (nem por uma
+    view), ou None quando todos ainda estão em uso.
+    """
+
+    # Referências de um buffer livre vistas por sys.getrefcount: a lista do anel e o próprio argumento
+    FREE_REFS = 2
+
+    def __init__(self, size=5):
+        self.size = max(2, size)
+        self.buffers = []
+        self.shape = None
+        self.dtype = None
+        self.index = 0
+        self.dropped = 0  # frames descartados por falta de buffer livre
+
+    def next(self, shape, dtype=np.uint8):
+        shape = tuple(shape)
+        if shape != self.shape or dtype != self.dtype:
+            # Buffers antigos ainda em uso ficam com quem os segura e são liberados pelo GC
+            self.buffers = [np.empty(shape, dtype=dtype) for _ in range(self.size)]
+            self.shape = shape
+            self.dtype = dtype
+            self.index = 0
+        for offset in range(self.size):
+            i = (self.index + offset) % self.size
+            if sys.getrefcount(self.buffers[i]) <= self.FREE_REFS:
+                self.index = (i + 1) % self.size
+                return self.buffers[i]
+        self.dropped += 1
+        return None
+
+
+class CaptureBackend:
+    """Interface comum (subconjunto de cv2.VideoCapture)"""
+
+    name = ""
+
+    def __init__(self, gray=False, keyframes_only=False, ring_size=5):
+        self.gray = gray
+        self.keyframes_only = keyframes_only
+        self.ring = FrameRing(ring_size)
+        self.ring_full = False  # o último read() descartou o frame por falta de buffer livre
+
+    def isOpened(self):
+        return False
+
+    def drop(self):
+        """Frame lido do stream, mas descartado: todos os buffers do anel ainda estão em uso"""
+        self.ring_full = True
+        return False, None
+
+    def read(self):
+        return False, None
+
+    def position(self):
+        """Timestamp (ms) do último frame no stream, ou None se o backend não informa"""
+        return None
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+class OpenCVCapture(CaptureBackend):
+    """cv2.VideoCapture com FFmpeg; grab/retrieve escrevem direto no anel"""
+
+    name = "opencv"
+
+    def __init__(self, url, username="", password="", open_timeout=10.0, read_timeout=5.0, **options):
+        super().__init__(**options)
+        if self.keyframes_only:
+            logger.warning("Backend opencv não suporta descartar frames não-chave; use gstreamer ou pyav")
+        # Opções para reduzir latência e forçar TCP
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
+        url = with_credentials(url, username, password)
+        if hasattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC"):
+            self.cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000),
+            ])
+        else:
+            self.cap = cv2.VideoCapture(url)
+        self.scratch = None  # frame BGR reaproveitado quando a saída é em cinza
+        self.convert_gray = True  # o FFmpeg do OpenCV sempre entrega BGR
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        self.ring_full = False
+        if not self.cap.grab():
+            return False, None
+        if self.gray and self.convert_gray:
+            ok, bgr = self.cap.retrieve(self.scratch)
+            if not ok:
+                return False, None
+            self.scratch = bgr
+            buf = self.ring.next(bgr.shape[:2])
+            if buf is None:
+                return self.drop()
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY, dst=buf)
+            return True, buf
+
+        buf = None
+        if self.ring.shape:
+            buf = self.ring.next(self.ring.shape, self.ring.dtype)
+            if buf is None:
+                return self.drop()  # grab() já consumiu o frame; sem retrieve() ele não é copiado
+        ok, frame = self.cap.retrieve(buf)
+        if not ok:
+            return False, None
+        if buf is None or frame is not buf:
+            # Primeiro frame ou troca de resolução: o anel passa a ter o formato real
+            buf = self.ring.next(frame.shape, frame.dtype)
+            if buf is None:
+                return self.drop()
+            np.copyto(buf, frame)
+        return True, buf
+
+    def position(self):
+        try:
+            return self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        except Exception:
+            return None
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+class GStreamerCapture(OpenCVCapture):
+    """Pipeline GStreamer via cv2.CAP_GSTREAMER (requer OpenCV compilado com GStreamer)"""
+
+    name = "gstreamer"
+
+    def __init__(self, url, username="", password="", codec="h264", decoder="", latency=0, open_timeout=10.0,
+                 read_timeout=5.0, **options):
+        CaptureBackend.__init__(self, **options)
+        self.read_timeout = read_timeout
+        self.pipeline = self.build_pipeline(url, username, password, codec, decoder, latency)
+        self.cap = cv2.VideoCapture(self.pipeline, cv2.CAP_GSTREAMER)
+        self.scratch = None
+        self.convert_gray = False  # o appsink já entrega GRAY8
+
+    def build_pipeline(self, url, username, password, codec, decoder, latency):
+        def q(value):
+            return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+        # tcp-timeout (µs): sem dados nesse intervalo o rtspsrc gera erro e o read() falha
+        src = (f"rtspsrc location={q(url)} protocols=tcp latency={int(latency)} drop-on-latency=true "
+               f"tcp-timeout={int(self.read_timeout * 1000000)}")
+        if username:
+            src += f" user-id={q(username)} user-pw={q(password)}"
+
+        if decoder or self.keyframes_only:
+            # Cadeia explícita: permite escolher decodificador (ex.: vaapih264dec, nvh264dec,
+            # d3d11h264dec) e descartar frames não-chave antes de decodificá-los
+            codec = codec.lower()
+            depay, parse = ("rtph265depay", "h265parse") if codec in ("h265", "hevc") else ("rtph264depay", "h264parse")
+            decoder = decoder or ("avdec_h265" if codec in ("h265", "hevc") else "avdec_h264")
+            chain = f"{depay} ! {parse}"
+            if self.keyframes_only:
+                chain += " ! identity drop-buffer-flags=delta-unit"
+            chain += f" ! {decoder}"
+        else:
+            # decodebin escolhe sozinho, preferindo decodificadores de hardware de maior rank
+            chain = "decodebin"
+
+        fmt = "GRAY8" if self.gray else "BGR"
+        sink = "appsink drop=true max-buffers=1 sync=false"
+        return f"{src} ! {chain} ! videoconvert ! video/x-raw,format={fmt} ! {sink}"
+
+
+class PyAVCapture(CaptureBackend):
+    """FFmpeg via PyAV: descarte de frames não-chave no decodificador e leitura do plano Y"""
+
+    name = "pyav"
+
+    def __init__(self, url, username="", password="", timeout=None, open_timeout=10.0, read_timeout=5.0, **options):
+        super().__init__(**options)
+        import av  # dependência opcional
+
+        if timeout is None:
+            timeout = (open_timeout, read_timeout)
+        self.container = None
+        self.frames = None
+        self.last_time = None
+        try:
+            self.container = av.open(
+                with_credentials(url, username, password),
+                options={"rtsp_transport": "tcp", "fflags": "nobuffer", "flags": "low_delay"},
+                timeout=timeout,
+            )
+            stream = self.container.streams.video[0]
+            stream.thread_type = "AUTO"
+            if self.keyframes_only:
+                stream.codec_context.skip_frame = "NONKEY"
+            self.frames = self.container.decode(stream)
+        except Exception as e:
+            logger.error(f"Erro ao abrir stream com PyAV: {e}")
+            self.release()
+
+    def isOpened(self):
+        return self.container is not None
+
+    def read(self):
+        self.ring_full = False
+        if self.frames is None:
+            return False, None
+        try:
+            frame = next(self.frames)
+        except StopIteration:
+            return False, None
+        except Exception as e:
+            logger.error(f"Erro ao decodificar frame (PyAV): {e}")
+            return False, None
+        self.last_time = frame.time
+
+        if self.gray and frame.format.name in ("yuv420p", "yuvj420p", "nv12", "yuv422p", "yuvj422p", "gray"):
+            # Plano Y direto da memória do decodificador (respeitando o stride); uma única cópia para o anel
+            plane = frame.planes[0]
+            y = np.frombuffer(plane, dtype=np.uint8).reshape(frame.height, plane.line_size)[:, :frame.width]
+            buf = self.ring.next((frame.height, frame.width))
+            if buf is None:
+                return self.drop()
+            np.copyto(buf, y)
+            return True, buf
+
+        array = frame.to_ndarray(format="gray" if self.gray else "bgr24")
+        buf = self.ring.next(array.shape)
+        if buf is None:
+            return self.drop()
+        np.copyto(buf, array)
+        return True, buf
+
+    def position(self):
+        return self.last_time * 1000.0 if self.last_time is not None else None
+
+    def release(self):
+        try:
+            if self.container is not None:
+                self.container.close()
+        except Exception:
+            pass
+        self.container = None
+        self.frames = None
+
+
+def open_capture(backend, url, username="", password="", **options):
+    """Cria o backend pedido. url sem credenciais; opções: gray, keyframes_only, ring_size e específicas do backend."""
+    if backend == "gstreamer":
+        return GStreamerCapture(url, username, password, **options)
+    if backend == "pyav":
+        return PyAVCapture(url, username, password, **options)
+    if backend == "opencv":
+        return OpenCVCapture(url, username, password, **options)
+    raise ValueError(f"Backend de captura desconhecido: {backend}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Deduplicação de leituras com expiração em O(1) amortizado por frame.
+
+Cada código visto fica em um dicionário (última vez visto, última emissão,
+prazo de expiração) e em um heap ordenado pelo prazo. A limpeza só olha o
+topo do heap: entradas cujo prazo foi adiado por uma nova leitura são
+reinseridas com o prazo atual (uma entrada no heap por código), então o
+custo por frame não depende de quantos códigos distintos estão na janela.
+
+Escopo: cada câmera usa sua própria instância por padrão; uma instância
+compartilhada (supervisor com --dedup-scope global) faz um código lido por
+uma câmera não ser emitido de novo por outra dentro do cooldown.
+
+Confirmação K de N: com confirm_hits > 1, o código só é emitido depois de
+aparecer em K dos últimos N frames decodificados da mesma câmera, o que
+descarta leituras espúrias de um único frame. Cooldown e (K, N) podem vir em
+cada chamada de observe(), então câmeras com configurações diferentes
+compartilham a mesma instância sem perder as suas.
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+
+DEFAULT_COOLDOWN = 30.0
+
+
+def parse_confirm(text):
+    """'K/N' (ou só 'K', com N = K) → (K, N)"""
+    hits, _, frames = str(text).partition("/")
+    hits = int(hits)
+    frames = int(frames) if frames else hits
+    if hits < 1 or frames < hits:
+        raise ValueError(f"Confirmação inválida: {text} (use K/N com 1 <= K <= N)")
+    return hits, frames
+
+
+class DedupEntry:
+    __slots__ = ("last_seen", "last_emitted", "deadline", "source", "hits")
+
+    def __init__(self):
+        self.last_seen = 0.0
+        self.last_emitted = None
+        self.deadline = 0.0
+        self.source = ""
+        self.hits = None  # origem -> deque com os números dos frames em que o código apareceu
+
+
+class CodeDeduplicator:
+    """Decide quais códigos de um frame devem ser emitidos (cooldown por código, confirmação K de N)"""
+
+    def __init__(self, cooldown=DEFAULT_COOLDOWN, confirm_hits=1, confirm_frames=1):
+        if confirm_hits < 1 or confirm_frames < confirm_hits:
+            raise ValueError(f"Confirmação inválida: {confirm_hits}/{confirm_frames}")
+        self.cooldown = cooldown  # padrão quando observe() não recebe o cooldown da câmera
+        self.confirm_hits = confirm_hits
+        self.confirm_frames = confirm_frames
+        self.lock = threading.Lock()
+        self.entries = {}  # código -> DedupEntry
+        self.heap = []     # (prazo, código); o prazo real está na entrada
+        self.frames = {}   # origem -> frames decodificados
+
+    def __len__(self):
+        return len(self.entries)
+
+    def observe(self, codes, now=None, source="", cooldown=None, confirm=None):
+        """Registra os códigos de um frame decodificado (pode ser vazio) e devolve os que devem ser emitidos.
+
+        cooldown e confirm=(K, N) da origem substituem os padrões da instância.
+        """
+        now = time.time() if now is None else now
+        cooldown = self.cooldown if cooldown is None else cooldown
+        hits_needed, frames_window = confirm or (self.confirm_hits, self.confirm_frames)
+        emitted = []
+        with self.lock:
+            frame = self.frames.get(source, 0) + 1
+            self.frames[source] = frame
+            for code in codes:
+                entry = self.entries.get(code)
+                if entry is None:
+                    entry = self.entries[code] = DedupEntry()
+                    heapq.heappush(self.heap, (now + cooldown * 2, code))
+                entry.last_seen = now
+                entry.deadline = now + cooldown * 2  # esquecido se não for visto por 2x o cooldown
+                entry.source = source
+                if hits_needed > 1 and not self.confirmed(entry, source, frame, hits_needed, frames_window):
+                    continue
+                if entry.last_emitted is None or (now - entry.last_emitted) > cooldown:
+                    # Emite (novo ou após cooldown)
+                    entry.last_emitted = now
+                    emitted.append(code)
+            self.expire(now)
+        return emitted
+
+    def confirmed(self, entry, source, frame, hits_needed, frames_window):
+        """Código visto em hits_needed dos últimos frames_window frames desta origem (chamar com o lock)"""
+        if entry.hits is None:
+            entry.hits = {}
+        hits = entry.hits.get(source)
+        if hits is None or hits.maxlen != hits_needed:
+            hits = entry.hits[source] = deque(hits or (), maxlen=hits_needed)
+        hits.append(frame)
+        return len(hits) == hits_needed and frame - hits[0] < frames_window
+
+    def expire(self, now):
+        """Remove as entradas vencidas olhando só o topo do heap (chamar com o lock)"""
+        heap = self.heap
+        while heap and heap[0][0] < now:
+            _, code = heapq.heappop(heap)
+            entry = self.entries.get(code)
+            if entry is None:
+                continue
+            if entry.deadline < now:
+                del self.entries[code]
+            else:
+                # Visto de novo depois de entrar no heap: volta com o prazo atual
+                heapq.heappush(heap, (entry.deadline, code))
+
+    def reset(self, source=None):
+        """Nova sessão de leitura: esquece os códigos vistos por último nesta origem (ou todos)"""
+        with self.lock:
+            if source is None:
+                self.entries.clear()
+                self.heap = []
+                self.frames.clear()
+                return
+            self.frames.pop(source, None)
+            self.entries = {c: e for c, e in self.entries.items() if e.source != source}
+            for entry in self.entries.values():
+                if entry.hits:
+                    entry.hits.pop(source, None)
+            # Reconstrói o heap para manter uma única entrada por código
+            self.heap = [(e.deadline, c) for c, e in self.entries.items()]
+            heapq.heapify(self.heap)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Geometria dos resultados do pyzbar (rect/polygon) entre recortes, escalas e o frame inteiro.
+
+Usada pelo motor, pelo rastreador, pela pirâmide de resolução e pela
+visualização, sem que esses módulos dependam uns dos outros.
+"""
+
+from pyzbar.locations import Point, Rect
+
+
+def offset_code(code, dx, dy):
+    """Desloca rect/polygon de um resultado do pyzbar (decodificado em um recorte) para o frame inteiro"""
+    if not dx and not dy:
+        return code
+    x, y, w, h = code.rect
+    polygon = [Point(px + dx, py + dy) for px, py in (code.polygon or [])]
+    return code._replace(rect=Rect(x + dx, y + dy, w, h), polygon=polygon)
+
+
+def scale_code(code, factor):
+    """Leva rect/polygon de um resultado decodificado em imagem reduzida para a escala original"""
+    if factor == 1:
+        return code
+    x, y, w, h = code.rect
+    polygon = [Point(int(round(px * factor)), int(round(py * factor))) for px, py in (code.polygon or [])]
+    rect = Rect(int(round(x * factor)), int(round(y * factor)), int(round(w * factor)), int(round(h * factor)))
+    return code._replace(rect=rect, polygon=polygon)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Rastreamento leve de códigos já confirmados para evitar redecodificá-los a cada frame.
+
+Depois que um código é decodificado, a área do seu rect vira um template em
+tons de cinza. Nos frames seguintes o template é procurado só em uma janela
+ao redor da última posição (cv2.matchTemplate), o que custa uma fração de uma
+chamada ao zbar. Enquanto todos os rastros estiverem firmes, o motor só
+decodifica regiões novas (com localizador) ou faz uma varredura completa a
+cada refresh_interval para descobrir códigos que entraram na cena.
+"""
+
+import threading
+import time
+
+import cv2
+
+from code_geometry import offset_code
+
+
+def to_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+class Track:
+    __slots__ = ("code", "bbox", "template", "misses", "followed")
+
+    def __init__(self, code, bbox, template):
+        self.code = code          # resultado do pyzbar com rect/polygon na posição atual
+        self.bbox = bbox          # (x, y, w, h) da área usada como template
+        self.template = template
+        self.misses = 0
+        self.followed = True
+
+
+class CodeTracker:
+    def __init__(self, match_threshold=0.6, search_margin=0.5, max_misses=2, refresh_interval=1.0,
+                 min_template=16):
+        self.match_threshold = match_threshold    # correlação mínima (TM_CCOEFF_NORMED) para seguir o rastro
+        self.search_margin = search_margin        # janela de busca em relação ao tamanho do template
+        self.max_misses = max_misses              # frames sem casar antes de descartar o rastro
+        self.refresh_interval = refresh_interval  # varredura completa periódica mesmo com rastros firmes
+        self.min_template = min_template          # lado mínimo do template (rect de código 1D pode ser fino)
+        self.lock = threading.Lock()
+        self.tracks = {}          # (data, type) -> Track
+        self.lost = False
+        self.last_decode = 0.0
+        self.followed_frames = 0
+        self.skipped_decodes = 0
+
+    def reset(self):
+        with self.lock:
+            self.tracks.clear()
+            self.lost = False
+            self.last_decode = 0.0
+
+    def template_box(self, rect, frame_w, frame_h):
+        x, y, w, h = rect
+        # Garante uma área com textura suficiente ao redor de rects muito finos
+        w2 = max(w, self.min_template)
+        h2 = max(h, int(w * 0.3), self.min_template)
+        x0 = max(0, x - (w2 - w) // 2)
+        y0 = max(0, y - (h2 - h) // 2)
+        x1 = min(frame_w, x0 + w2)
+        y1 = min(frame_h, y0 + h2)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def follow(self, frame):
+        """Atualiza a posição de todos os rastros no frame atual"""
+        frame_h, frame_w = frame.shape[:2]
+        with self.lock:
+            for key, track in list(self.tracks.items()):
+                x, y, w, h = track.bbox
+                mx = int(w * self.search_margin) + 4
+                my = int(h * self.search_margin) + 4
+                x0, y0 = max(0, x - mx), max(0, y - my)
+                x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+                score = -1.0
+                if (x1 - x0) >= w and (y1 - y0) >= h:
+                    window = to_gray(frame[y0:y1, x0:x1])
+                    result = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+                    _, score, _, loc = cv2.minMaxLoc(result)
+
+                if score >= self.match_threshold:
+                    nx, ny = x0 + loc[0], y0 + loc[1]
+                    track.code = offset_code(track.code, nx - x, ny - y)
+                    track.bbox = (nx, ny, w, h)
+                    track.misses = 0
+                    track.followed = True
+                else:
+                    track.followed = False
+                    track.misses += 1
+                    if track.misses > self.max_misses:
+                        del self.tracks[key]
+                        self.lost = True
+            if self.tracks:
+                self.followed_frames += 1
+
+    def needs_decode(self):
+        """Sem localizador: decide se o frame precisa de varredura completa"""
+        with self.lock:
+            now = time.monotonic()
+            need = (not self.tracks or self.lost
+                    or any(not t.followed for t in self.tracks.values())
+                    or (now - self.last_decode) >= self.refresh_interval)
+            if not need:
+                self.skipped_decodes += 1
+            return need
+
+    def covers(self, x, y, w, h, min_overlap=0.5):
+        """True se a região já está majoritariamente ocupada por um rastro firme"""
+        area = max(1, w * h)
+        with self.lock:
+            for track in self.tracks.values():
+                if not track.followed:
+                    continue
+                tx, ty, tw, th = track.bbox
+                ix = max(0, min(x + w, tx + tw) - max(x, tx))
+                iy = max(0, min(y + h, ty + th) - max(y, ty))
+                if ix * iy >= min_overlap * area:
+                    return True
+        return False
+
+    def confirm(self, frame, codes, decoded=True):
+        """Cria/renova rastros a partir dos códigos decodificados e devolve decodificados + rastreados"""
+        frame_h, frame_w = frame.shape[:2]
+        with self.lock:
+            if decoded:
+                self.last_decode = time.monotonic()
+                self.lost = False
+            seen = set()
+            for code in codes:
+                key = (code.data, code.type)
+                seen.add(key)
+                bx, by, bw, bh = self.template_box(tuple(code.rect), frame_w, frame_h)
+                if bw < 4 or bh < 4:
+                    continue
+                template = to_gray(frame[by:by + bh, bx:bx + bw]).copy()
+                self.tracks[key] = Track(code, (bx, by, bw, bh), template)
+
+            merged = list(codes)
+            for key, track in self.tracks.items():
+                if key not in seen and track.followed:
+                    merged.append(track.code)
+            return merged
+
+    def counters(self):
+        with self.lock:
+            return {"tracks": len(self.tracks), "followed_frames": self.followed_frames,
+                    "skipped_decodes": self.skipped_decodes}
+
+    def summary(self):
+        c = self.counters()
+        return (f"{c['tracks']} rastros, {c['followed_frames']} frames seguidos, "
+                f"{c['skipped_decodes']} varreduras evitadas")
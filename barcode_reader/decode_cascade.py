@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Cascata de pré-processamento para o pyzbar.
+
+As variantes (original → cinza → equalizada → Otsu) podem rodar em sequência,
+como sempre foi, ou ao mesmo tempo em um pool de threads (OpenCV e zbar
+liberam o GIL), ficando com o primeiro resultado. Cada câmera mantém
+estatísticas de acerto por variante; no modo adaptativo a ordem é refeita
+pelos acertos e variantes que nunca acertam deixam de ser tentadas (com uma
+nova tentativa periódica para o caso de a cena mudar).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cv2
+os.environ.setdefault("ZBAR_DEBUG", "0")
+from pyzbar.pyzbar import decode
+
+VARIANT_ORDER = ("raw", "gray", "equalized", "otsu")
+CASCADE_MODES = ("sequential", "parallel")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_cascade_executor():
+    """Pool de threads compartilhado por todas as câmeras no modo paralelo"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = min(32, (os.cpu_count() or 2) * 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cascade")
+        return _executor
+
+
+def to_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+def preprocess(variant, image, gray=None):
+    """Gera a imagem da variante pedida; gray pode vir pronto para não recalcular"""
+    if variant == "raw":
+        return image
+    if gray is None:
+        gray = to_gray(image)
+    if variant == "gray":
+        return gray
+    eq = cv2.equalizeHist(gray)
+    if variant == "equalized":
+        return eq
+    _, th = cv2.threshold(eq, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return th
+
+
+def decode_variant(variant, image, gray=None):
+    return decode(preprocess(variant, image, gray))
+
+
+def decode_variant_timed(variant, image, gray=None):
+    start = time.perf_counter()
+    codes = decode_variant(variant, image, gray)
+    return codes, time.perf_counter() - start
+
+
+def effective_order(image, order):
+    # Imagem já em cinza (ex.: captura do plano Y): "raw" e "gray" seriam a mesma decodificação
+    if image.ndim == 2 and "raw" in order:
+        return [v for v in order if v != "gray"]
+    return list(order)
+
+
+def decode_variants(image, order=VARIANT_ORDER):
+    """Tenta as variantes em sequência até a primeira com resultado.
+
+    Retorna (códigos, tentativas) onde tentativas é uma lista de (variante, acertou, segundos).
+    """
+    order = effective_order(image, order)
+    attempts = []
+    gray = eq = None
+    for variant in order:
+        start = time.perf_counter()
+        if variant == "raw":
+            target = image
+        else:
+            if gray is None:
+                gray = to_gray(image)
+            if variant == "gray":
+                target = gray
+            else:
+                if eq is None:
+                    eq = cv2.equalizeHist(gray)
+                if variant == "equalized":
+                    target = eq
+                else:
+                    _, target = cv2.threshold(eq, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        codes = decode(target)
+        attempts.append((variant, bool(codes), time.perf_counter() - start))
+        if codes:
+            return codes, attempts
+    return [], attempts
+
+
+def decode_variants_parallel(image, order=VARIANT_ORDER, executor=None, on_late=None):
+    """Dispara todas as variantes ao mesmo tempo e fica com o primeiro acerto.
+
+    As variantes que ainda estão rodando quando o resultado sai são entregues
+    a on_late([(variante, acertou, segundos)]) ao terminar, para as estatísticas
+    não favorecerem só as variantes rápidas. As que nem começaram (pool
+    ocupado) são canceladas e não entram nas tentativas: sem execução, não há
+    acerto nem erro para registrar.
+    """
+    executor = executor or get_cascade_executor()
+    order = effective_order(image, order)
+    gray = to_gray(image) if any(v != "raw" for v in order) else None
+    futures = {executor.submit(decode_variant_timed, v, image, gray): v for v in order}
+    pending = set(futures)
+    codes = []
+    attempts = []
+    while pending and not codes:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        # Em caso de empate, prefere a variante que vem antes na ordem
+        for future in sorted(done, key=lambda f: order.index(futures[f])):
+            result, elapsed = future_result(future)
+            attempts.append((futures[future], bool(result), elapsed))
+            if result and not codes:
+                codes = result
+    for future in pending:
+        variant = futures[future]
+        if future.cancel():
+            continue
+        if on_late is not None:
+            # Já em execução: termina sozinha e registra o resultado real
+            def finished(f, variant=variant):
+                result, elapsed = future_result(f)
+                on_late([(variant, bool(result), elapsed)])
+
+            future.add_done_callback(finished)
+    return codes, attempts
+
+
+def future_result(future):
+    try:
+        return future.result()
+    except Exception:
+        return [], 0.0
+
+
+class DecodeCascade:
+    """Cascata de decodificação de uma câmera, com estatísticas por variante"""
+
+    def __init__(self, mode="sequential", adaptive=False, variants=VARIANT_ORDER,
+                 min_attempts=200, reprobe_every=500):
+        if mode not in CASCADE_MODES:
+            raise ValueError(f"Modo de cascata inválido: {mode}")
+        self.mode = mode
+        self.adaptive = adaptive
+        self.variants = tuple(variants)
+        self.min_attempts = min_attempts    # tentativas sem acerto antes de descartar uma variante
+        self.reprobe_every = reprobe_every  # a cada N frames, testa também as descartadas
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.stats = {v: {"attempts": 0, "hits": 0} for v in self.variants}
+        self.metrics = None  # PipelineMetrics da câmera: latência e acertos por variante
+
+    def hit_rate(self, variant):
+        st = self.stats[variant]
+        # Suavização de Laplace: variantes pouco testadas não vão para o fim por acaso
+        return (st["hits"] + 1) / (st["attempts"] + 2)
+
+    def is_dropped(self, variant):
+        st = self.stats[variant]
+        return st["attempts"] >= self.min_attempts and st["hits"] == 0
+
+    def plan(self):
+        """Ordem de variantes a tentar no próximo frame"""
+        with self.lock:
+            self.frames += 1
+            if not self.adaptive:
+                return list(self.variants)
+            ranked = sorted(self.variants, key=lambda v: (-self.hit_rate(v), self.variants.index(v)))
+            if self.reprobe_every and self.frames % self.reprobe_every == 0:
+                return ranked
+            active = [v for v in ranked if not self.is_dropped(v)]
+            return active or ranked[:1]
+
+    def record(self, attempts):
+        with self.lock:
+            for variant, hit, *timing in attempts:
+                st = self.stats.get(variant)
+                if st is not None:
+                    st["attempts"] += 1
+                    if hit:
+                        st["hits"] += 1
+        if self.metrics is not None:
+            for variant, hit, *timing in attempts:
+                if timing:
+                    self.metrics.variant(variant, timing[0], hit)
+
+    def decode(self, image):
+        order = self.plan()
+        if self.mode == "parallel" and len(order) > 1:
+            codes, attempts = decode_variants_parallel(image, order, on_late=self.record)
+        else:
+            codes, attempts = decode_variants(image, order)
+        self.record(attempts)
+        return codes
+
+    def summary(self):
+        with self.lock:
+            parts = []
+            for v in self.variants:
+                st = self.stats[v]
+                flag = " (descartada)" if self.adaptive and self.is_dropped(v) else ""
+                parts.append(f"{v} {st['hits']}/{st['attempts']}{flag}")
+            return ", ".join(parts)
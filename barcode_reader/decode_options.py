@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Opções de linha de comando do pipeline de decodificação.
+
+Cascata, detector de movimento, ROIs, localizador, rastreador e pirâmide são
+declarados uma vez aqui e usados pelo leitor (axis_barcode_reader.py) e pelo
+benchmark, para que os dois aceitem as mesmas opções com a mesma validação.
+"""
+
+import argparse
+
+from code_tracker import CodeTracker
+from decode_cascade import CASCADE_MODES, DecodeCascade
+from decode_pyramid import DecodePyramid
+from localizer import BarcodeLocalizer
+from motion_gate import MotionGate
+
+
+def parse_roi(text):
+    try:
+        x, y, w, h = (int(v) for v in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ROI deve ser X,Y,W,H em pixels")
+    if w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError("ROI deve ter largura e altura positivas")
+    return (x, y, w, h)
+
+
+def add_decode_arguments(parser):
+    parser.add_argument("--cascade", choices=CASCADE_MODES, default="sequential",
+                        help="variantes de pré-processamento em sequência ou em paralelo (primeiro acerto vence)")
+    parser.add_argument("--adaptive-cascade", action="store_true",
+                        help="reordena/descarta variantes pela taxa de acerto da câmera")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="pula a decodificação quando a cena não mudou desde a última leitura")
+    parser.add_argument("--motion-threshold", type=int, default=25,
+                        help="diferença mínima de intensidade (0-255) para um pixel contar como alterado")
+    parser.add_argument("--motion-min-area", type=float, default=0.002,
+                        help="fração de pixels alterados que libera a decodificação")
+    parser.add_argument("--motion-max-skip", type=float, default=5.0,
+                        help="decodifica ao menos a cada N segundos mesmo sem movimento (0 = nunca força)")
+    parser.add_argument("--roi", action="append", type=parse_roi, default=[], metavar="X,Y,W,H",
+                        help="região do frame onde os códigos aparecem (pode repetir)")
+    parser.add_argument("--localizer", action="store_true",
+                        help="localiza regiões candidatas e decodifica só recortes pequenos")
+    parser.add_argument("--track-codes", action="store_true",
+                        help="segue códigos já lidos por template matching em vez de redecodificá-los")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="decodifica primeiro em resolução reduzida e só escala para recortes em resolução total")
+    return parser
+
+
+def build_motion_gate(args):
+    if not args.motion_gate:
+        return None
+    return MotionGate(pixel_threshold=args.motion_threshold, min_changed_ratio=args.motion_min_area,
+                      max_skip_seconds=args.motion_max_skip)
+
+
+def build_decode_stages(args):
+    """Argumentos do ScannerEngine para as etapas de decodificação escolhidas na linha de comando"""
+    return {
+        "cascade": DecodeCascade(args.cascade, args.adaptive_cascade),
+        "motion_gate": build_motion_gate(args),
+        "rois": args.roi,
+        "localizer": BarcodeLocalizer() if args.localizer else None,
+        "tracker": CodeTracker() if args.track_codes else None,
+        "pyramid": DecodePyramid() if args.pyramid else None,
+    }
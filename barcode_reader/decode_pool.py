@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Decodificação em processos separados (contorna o GIL em decode_barcodes).
+
+Cada worker é um processo com um bloco de memória compartilhada próprio: o
+frame (já recortado pela ROI) é copiado uma única vez para o bloco e o
+processo lê diretamente dali, sem pickle da imagem. Só os resultados do
+pyzbar (pequenos) voltam pelo Pipe.
+
+O agendamento é o mesmo do DecodeScheduler: último frame vence por câmera e
+rodízio entre câmeras, então a fila nunca acumula atraso. Um worker que não
+responde em decode_timeout segundos (travado ou morto dentro do zbar/OpenCV)
+é encerrado e recriado com um bloco de memória novo; o frame é perdido, mas a
+câmera não fica presa.
+"""
+
+import logging
+import multiprocessing as mp
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from supervisor import DecodeScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def decode_worker_main(conn):
+    """Loop do processo worker: recebe (bloco, shape, dtype, variantes) e devolve (códigos, tentativas)"""
+    import cv2
+    from decode_cascade import decode_variants
+
+    # Ctrl+C/SIGTERM chegam ao grupo de processos inteiro: quem encerra o worker é o processo pai (close)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    # O paralelismo vem dos processos; threads internas do OpenCV só disputariam CPU
+    cv2.setNumThreads(1)
+    shm = None
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        name, shape, dtype, order = task
+        result = ([], [])
+        try:
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=name)
+            image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            result = decode_variants(image, order)
+            del image
+        except Exception as e:
+            logger.error(f"Erro ao decodificar no worker: {e}")
+        conn.send(result)
+
+    if shm is not None:
+        shm.close()
+
+
+class DecodeProcess:
+    """Um processo worker, seu Pipe e seu bloco de memória compartilhada"""
+
+    def __init__(self, ctx, index, timeout=5.0):
+        self.ctx = ctx
+        self.index = index
+        self.timeout = timeout
+        self.shm = None
+        self.conn = None
+        self.process = None
+        self.spawn()
+
+    def spawn(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        self.process = self.ctx.Process(target=decode_worker_main, args=(child_conn,),
+                                        name=f"decode-proc-{self.index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def ensure_capacity(self, nbytes):
+        # O bloco só é recriado quando chega um frame maior (ex.: troca de resolução)
+        if self.shm is None or self.shm.size < nbytes:
+            self.release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def decode(self, image, order):
+        image = np.ascontiguousarray(image)
+        self.ensure_capacity(image.nbytes)
+        np.ndarray(image.shape, dtype=image.dtype, buffer=self.shm.buf)[...] = image
+        self.conn.send((self.shm.name, image.shape, image.dtype.str, order))
+        if not self.conn.poll(self.timeout):
+            raise TimeoutError(f"sem resposta em {self.timeout:g} s")
+        return self.conn.recv()
+
+    def restart(self, reason=""):
+        """Encerra o processo (sem esperar: pode estar travado) e recria processo e bloco de memória"""
+        logger.error(f"Worker de decodificação {self.index} falhou{f' ({reason})' if reason else ''}; reiniciando")
+        try:
+            self.process.kill()  # o worker ignora SIGTERM (e pode estar travado dentro do zbar)
+            self.process.join(timeout=1.0)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.release_shm()  # o worker morto pode ter deixado o bloco em uso; ensure_capacity cria outro
+        self.spawn()
+
+    def release_shm(self):
+        if self.shm is not None:
+            try:
+                self.shm.close()
+                self.shm.unlink()
+            except Exception:
+                pass
+            self.shm = None
+
+    def close(self, join_timeout=2.0):
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=join_timeout)
+        if self.process.is_alive():
+            self.process.kill()  # o worker ignora SIGTERM
+            self.process.join(timeout=1.0)
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ProcessDecodePool(DecodeScheduler):
+    """DecodeScheduler cujos workers delegam a decodificação a processos separados"""
+
+    kind = "processes"
+
+    def __init__(self, processes=None, max_decode_fps=0, decode_timeout=5.0, name=None):
+        super().__init__(workers=processes, max_decode_fps=max_decode_fps, name=name)
+        self.decode_timeout = decode_timeout  # segundos até considerar um worker travado
+        self.procs = []
+
+    def start(self):
+        if self.running:
+            return
+        # spawn: não herda threads/locks do processo pai e funciona igual no Windows
+        ctx = mp.get_context("spawn")
+        self.procs = [DecodeProcess(ctx, i, self.decode_timeout) for i in range(self.workers)]
+        self.running = True
+        for proc in self.procs:
+            t = threading.Thread(target=self.process_worker_loop, args=(proc,),
+                                 name=f"decode-feeder-{proc.index}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        super().stop()
+        for proc in self.procs:
+            proc.close()
+            proc.release_shm()
+        self.procs = []
+
+    def process_worker_loop(self, proc):
+        while self.running:
+            engine, frame = self.take()
+            if engine is None:
+                continue
+            try:
+                self.throttle()
+                if not engine.scanning:
+                    continue
+                start = time.perf_counter()
+                regions = engine.plan_decode(frame)
+
+                def remote_decode(image):
+                    # Os processos já dão o paralelismo: a cascata roda em sequência na ordem da câmera
+                    codes, attempts = proc.decode(image, engine.cascade.plan())
+                    engine.cascade.record(attempts)
+                    return codes
+
+                results = []
+                try:
+                    for crop, dx, dy in regions:
+                        if engine.pyramid is not None:
+                            codes = engine.pyramid.decode(crop, remote_decode)
+                        else:
+                            codes = remote_decode(crop)
+                        results.append((codes, dx, dy))
+                except (EOFError, OSError) as e:
+                    # TimeoutError e BrokenPipeError são OSError: worker travado ou morto
+                    proc.restart(f"{engine.name}: {str(e) or type(e).__name__}")
+                codes = engine.accept_decoded(results, frame, decoded=bool(regions))
+                engine.metrics.decode.observe(time.perf_counter() - start)
+                engine.process_codes(codes)
+            except Exception as e:
+                logger.error(f"Erro na decodificação ({engine.name}): {e}")
+            finally:
+                self.release(engine)
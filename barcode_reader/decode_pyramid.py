@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Pirâmide de resolução adaptativa para a decodificação.
+
+Códigos grandes decodificam bem em uma cópia reduzida do frame, que custa uma
+fração do tempo; códigos pequenos precisam da resolução nativa. A pirâmide
+tenta primeiro as escalas reduzidas e só escala para resolução total em
+recortes ao redor das regiões candidatas (localizador) que os acertos das
+escalas reduzidas não cobriram, de modo que um código pequeno ao lado de um
+grande não se perde. Sem candidatos e sem acertos, a imagem inteira é
+decodificada na resolução nativa. Cada câmera aprende qual escala costuma
+acertar e passa a começar por ela.
+"""
+
+import threading
+
+import cv2
+
+from localizer import BarcodeLocalizer
+from code_geometry import offset_code, scale_code
+
+
+class DecodePyramid:
+    def __init__(self, scales=(0.25, 0.5), min_width=480, localizer=None, full_frame_fallback=True,
+                 min_hits=20):
+        self.scales = sorted(s for s in scales if 0 < s < 1)
+        self.min_width = min_width                      # não reduz abaixo desta largura (nem imagens menores)
+        self.localizer = localizer or BarcodeLocalizer()
+        self.full_frame_fallback = full_frame_fallback  # sem candidatos nem acertos: decodifica a imagem toda
+        self.min_hits = min_hits                        # acertos antes de confiar no aprendizado
+        self.lock = threading.Lock()
+        self.stats = {s: {"attempts": 0, "hits": 0} for s in self.scales + [1.0]}
+
+    def plan(self, width):
+        """Escalas a tentar, da mais barata para a mais cara, começando pela que mais acerta"""
+        order = [s for s in self.scales if width * s >= self.min_width] + [1.0]
+        with self.lock:
+            total_hits = sum(self.stats[s]["hits"] for s in order)
+            if total_hits >= self.min_hits:
+                best = max(order, key=lambda s: self.stats[s]["hits"])
+                order.remove(best)
+                order.insert(0, best)
+        return order
+
+    def record(self, scale, hit):
+        with self.lock:
+            st = self.stats[scale]
+            st["attempts"] += 1
+            if hit:
+                st["hits"] += 1
+
+    def decode(self, image, decode_fn):
+        """Decodifica image com decode_fn (cascata da câmera) subindo a pirâmide até cobrir as regiões candidatas"""
+        width = image.shape[1]
+        if width <= self.min_width:
+            return decode_fn(image)
+        codes = []
+        seen = set()
+        regions = None  # regiões candidatas, calculadas uma vez só se forem necessárias
+        for scale in self.plan(width):
+            if scale < 1.0:
+                found = self.decode_scaled(image, scale, decode_fn)
+            else:
+                if regions is None:
+                    regions = self.localizer.find_regions(image)
+                found = self.decode_regions(image, self.uncovered(regions, codes), decode_fn, fallback=not codes)
+            self.record(scale, bool(found))
+            for code in found:
+                key = (code.data, code.type)
+                if key not in seen:
+                    seen.add(key)
+                    codes.append(code)
+            if codes:
+                if regions is None:
+                    regions = self.localizer.find_regions(image)
+                if not self.uncovered(regions, codes):
+                    break
+        return codes
+
+    def uncovered(self, regions, codes):
+        """Regiões candidatas que não se sobrepõem a nenhum código já decodificado"""
+        def overlaps(region, rect):
+            x, y, w, h = region
+            return rect.left < x + w and x < rect.left + rect.width and rect.top < y + h and y < rect.top + rect.height
+
+        return [r for r in regions if not any(overlaps(r, code.rect) for code in codes)]
+
+    def decode_scaled(self, image, scale, decode_fn):
+        h, w = image.shape[:2]
+        small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return [scale_code(code, 1.0 / scale) for code in decode_fn(small)]
+
+    def decode_regions(self, image, regions, decode_fn, fallback=True):
+        """Resolução total só nos recortes; sem regiões (e com fallback) decodifica a imagem inteira"""
+        if not regions:
+            return decode_fn(image) if fallback and self.full_frame_fallback else []
+        codes = []
+        seen = set()
+        for x, y, w, h in regions:
+            for code in decode_fn(image[y:y + h, x:x + w]):
+                key = (code.data, code.type)
+                if key not in seen:
+                    seen.add(key)
+                    codes.append(offset_code(code, x, y))
+        return codes
+
+    def summary(self):
+        with self.lock:
+            return ", ".join(f"{s:g}x {st['hits']}/{st['attempts']}" for s, st in self.stats.items())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Localizador rápido de regiões candidatas a código de barras/QR.
+
+Em vez de passar o frame inteiro em resolução total para o zbar, procura
+regiões com alta densidade de bordas (gradiente + morfologia) em uma cópia
+reduzida da imagem e devolve apenas pequenos retângulos, já em coordenadas da
+imagem original e com margem, para serem decodificados.
+"""
+
+import cv2
+
+
+class BarcodeLocalizer:
+    def __init__(self, work_width=640, min_gradient=40, close_kernel=15, min_area_ratio=0.0005,
+                 padding=0.15, max_regions=8):
+        self.work_width = work_width          # largura da cópia reduzida usada na busca
+        self.min_gradient = min_gradient      # piso do limiar de gradiente (evita ruído em cena vazia)
+        self.close_kernel = close_kernel      # fechamento morfológico que junta barras/módulos em um bloco
+        self.min_area_ratio = min_area_ratio  # área mínima da região em relação à imagem
+        self.padding = padding                # margem relativa ao redor de cada região
+        self.max_regions = max_regions
+
+    def find_regions(self, image):
+        """Retorna uma lista de (x, y, w, h) candidatos, do maior para o menor"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        h, w = gray.shape[:2]
+        if h == 0 or w == 0:
+            return []
+
+        scale = min(1.0, self.work_width / float(w))
+        small = gray if scale >= 1.0 else cv2.resize(gray, (int(w * scale), int(h * scale)),
+                                                     interpolation=cv2.INTER_AREA)
+
+        # Magnitude do gradiente nas duas direções: pega barras em qualquer rotação e QR
+        gx = cv2.convertScaleAbs(cv2.Sobel(small, cv2.CV_16S, 1, 0, ksize=3))
+        gy = cv2.convertScaleAbs(cv2.Sobel(small, cv2.CV_16S, 0, 1, ksize=3))
+        grad = cv2.blur(cv2.addWeighted(gx, 0.5, gy, 0.5, 0), (9, 9))
+
+        otsu, _ = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        _, mask = cv2.threshold(grad, max(otsu, self.min_gradient), 255, cv2.THRESH_BINARY)
+
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (self.close_kernel, self.close_kernel))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        mask = cv2.erode(mask, None, iterations=2)
+        mask = cv2.dilate(mask, None, iterations=2)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.min_area_ratio * small.shape[0] * small.shape[1]
+        boxes = [cv2.boundingRect(c) for c in contours]
+        boxes = [b for b in boxes if b[2] * b[3] >= min_area]
+        boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+
+        regions = []
+        for bx, by, bw, bh in boxes[:self.max_regions]:
+            # Volta para a escala original com margem (zona de silêncio do código)
+            x, y = bx / scale, by / scale
+            rw, rh = bw / scale, bh / scale
+            pad = max(10, int(self.padding * max(rw, rh)))
+            x0, y0 = max(0, int(x) - pad), max(0, int(y) - pad)
+            x1, y1 = min(w, int(x + rw) + pad), min(h, int(y + rh) + pad)
+            if x1 > x0 and y1 > y0:
+                regions.append((x0, y0, x1 - x0, y1 - y0))
+        return regions
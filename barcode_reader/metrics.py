@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Métricas do pipeline (contadores, gauges e histogramas de latência).
+
+Tudo é registrado em um registro global (REGISTRY), com a câmera como label,
+e pode ser exposto no formato texto do Prometheus por um servidor HTTP local
+(MetricsServer, rota /metrics). Gauges podem ter uma função de leitura,
+avaliada só na hora da coleta (ex.: profundidade de filas).
+"""
+
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [f"{name}{format_labels(labels)} {self.value}"]
+
+
+class Gauge:
+    def __init__(self, fn=None):
+        self.value = 0.0
+        self.fn = fn  # lida na coleta, se informada
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        if self.fn is not None:
+            try:
+                return self.fn()
+            except Exception:
+                return float("nan")
+        return self.value
+
+    def samples(self, name, labels):
+        return [f"{name}{format_labels(labels)} {self.get()}"]
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Quantil aproximado por interpolação linear dentro do bucket"""
+        with self.lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        target = q * total
+        cumulative = 0
+        for i, n in enumerate(counts):
+            if cumulative + n >= target and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (target - cumulative) / n
+            cumulative += n
+        return self.buckets[-1]
+
+    def samples(self, name, labels):
+        with self.lock:
+            counts = list(self.counts)
+            total, total_sum = self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {total_sum}")
+        lines.append(f"{name}_count{format_labels(labels)} {total}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.families = {}  # nome -> [tipo, ajuda, {labels: métrica}]
+
+    def get(self, kind, name, help_text, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = [kind, help_text, {}]
+            elif family[0] != kind:
+                raise ValueError(f"Métrica {name} já registrada como {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory()
+            return metric
+
+    def remove(self, **labels):
+        """Descarta as séries que têm todos estes labels (ex.: camera=nome antigo)"""
+        wanted = set(labels.items())
+        with self.lock:
+            for name in list(self.families):
+                metrics = self.families[name][2]
+                for key in [k for k in metrics if wanted <= set(k)]:
+                    del metrics[key]
+                if not metrics:
+                    del self.families[name]
+
+    def counter(self, name, help_text="", **labels):
+        return self.get("counter", name, help_text, labels, Counter)
+
+    def gauge(self, name, help_text="", fn=None, **labels):
+        gauge = self.get("gauge", name, help_text, labels, Gauge)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS, **labels):
+        return self.get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def render(self):
+        """Formato texto de exposição do Prometheus"""
+        with self.lock:
+            families = [(name, kind, help_text, list(metrics.items()))
+                        for name, (kind, help_text, metrics) in sorted(self.families.items())]
+        lines = []
+        for name, kind, help_text, metrics in families:
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                lines.extend(metric.samples(name, labels))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class PipelineMetrics:
+    """Métricas de uma câmera, já com o label aplicado"""
+
+    def __init__(self, camera, registry=REGISTRY):
+        self.camera = camera
+        self.registry = registry
+        r, c = registry, camera
+        self.frames = r.counter("axis_capture_frames_total", "Frames lidos do stream", camera=c)
+        self.capture_failures = r.counter("axis_capture_failures_total", "Leituras de frame com falha", camera=c)
+        self.dropped_frames = r.counter("axis_capture_dropped_frames_total",
+                                        "Frames substituídos antes de serem processados", camera=c)
+        self.frame_wait = r.histogram("axis_frame_wait_seconds", "Espera por um frame novo", camera=c)
+        self.decode = r.histogram("axis_decode_seconds", "Decodificação de um frame (todas as regiões)", camera=c)
+        self.process = r.histogram("axis_process_codes_seconds", "Deduplicação e registro dos códigos", camera=c)
+        self.emitted = r.counter("axis_codes_emitted_total", "Leituras registradas", camera=c)
+        self.reconnects = r.counter("axis_stream_reconnects_total", "Reaberturas do stream após travamento", camera=c)
+        self.downtime = r.counter("axis_stream_downtime_seconds_total", "Tempo fora do ar somando as quedas", camera=c)
+        self.variants = {}
+        # Para a taxa exibida na barra de status
+        self.last_rate_check = time.monotonic()
+        self.last_frames = 0
+        self.last_decodes = 0
+
+    def variant(self, variant, elapsed, hit):
+        pair = self.variants.get(variant)
+        if pair is None:
+            pair = self.variants[variant] = (
+                self.registry.histogram("axis_decode_variant_seconds", "Tempo do zbar por variante de pré-processamento",
+                                        camera=self.camera, variant=variant),
+                self.registry.counter("axis_decode_variant_hits_total", "Variantes que encontraram código",
+                                      camera=self.camera, variant=variant),
+            )
+        pair[0].observe(elapsed)
+        if hit:
+            pair[1].inc()
+
+    def gauge(self, name, help_text, fn):
+        return self.registry.gauge(name, help_text, fn=fn, camera=self.camera)
+
+    def summary(self):
+        """Resumo curto para a barra de status: fps de captura/decodificação, p50/p95 e descartes"""
+        now = time.monotonic()
+        elapsed = max(1e-6, now - self.last_rate_check)
+        frames, decodes = self.frames.value, self.decode.count
+        capture_fps = (frames - self.last_frames) / elapsed
+        decode_fps = (decodes - self.last_decodes) / elapsed
+        self.last_rate_check, self.last_frames, self.last_decodes = now, frames, decodes
+        text = (f"Captura {capture_fps:.1f} fps | Decodificação {decode_fps:.1f}/s, "
+                f"p50 {self.decode.quantile(0.5) * 1000:.0f} ms, p95 {self.decode.quantile(0.95) * 1000:.0f} ms | "
+                f"Descartados {self.dropped_frames.value}")
+        if self.reconnects.value:
+            text += f" | Reconexões {self.reconnects.value} ({self.downtime.value:.0f} s fora)"
+        return text
+
+
+class MetricsServer:
+    """Servidor HTTP local com as métricas em /metrics"""
+
+    def __init__(self, port=9108, host="127.0.0.1", registry=REGISTRY):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        logger.info(f"Métricas disponíveis em http://{host}:{port}/metrics")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Detector barato de mudança de cena para pular a decodificação de frames parados.
+
+O frame (ou a ROI) é reduzido para poucas dezenas de milhares de pixels em tons
+de cinza e comparado com o último frame que foi de fato decodificado. Se a
+fração de pixels alterados ficar abaixo do limiar, a decodificação é pulada.
+Como a referência só avança quando há decodificação, mudanças lentas também
+acabam acumulando e disparando; max_skip_seconds garante uma decodificação
+periódica mesmo com a cena parada.
+"""
+
+import threading
+import time
+
+import cv2
+
+
+class MotionGate:
+    def __init__(self, enabled=True, width=160, pixel_threshold=25, min_changed_ratio=0.002,
+                 max_skip_seconds=5.0):
+        self.enabled = enabled
+        self.width = width                          # largura do frame reduzido usado na comparação
+        self.pixel_threshold = pixel_threshold      # diferença mínima (0-255) para um pixel contar como alterado
+        self.min_changed_ratio = min_changed_ratio  # fração de pixels alterados que libera a decodificação
+        self.max_skip_seconds = max_skip_seconds    # decodifica ao menos a cada N s (0 = nunca força)
+        self.lock = threading.Lock()
+        self.reference = None
+        self.last_decode = 0.0
+        self.decoded_frames = 0
+        self.skipped_frames = 0
+        self.last_changed_ratio = 0.0
+
+    def reset(self):
+        with self.lock:
+            self.reference = None
+            self.last_decode = 0.0
+
+    def thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        h, w = gray.shape[:2]
+        if w > self.width:
+            height = max(1, int(h * self.width / w))
+            gray = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+        # Suaviza ruído de sensor/compressão que não é movimento real
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+
+    def should_decode(self, frame):
+        """True se o frame mudou o suficiente desde a última decodificação"""
+        if not self.enabled:
+            with self.lock:
+                self.decoded_frames += 1
+            return True
+
+        small = self.thumbnail(frame)
+        now = time.monotonic()
+        with self.lock:
+            ref = self.reference
+            if ref is None or ref.shape != small.shape:
+                changed = True
+                self.last_changed_ratio = 1.0
+            else:
+                diff = cv2.absdiff(small, ref)
+                _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+                self.last_changed_ratio = cv2.countNonZero(mask) / mask.size
+                changed = self.last_changed_ratio >= self.min_changed_ratio
+
+            if not changed and self.max_skip_seconds and (now - self.last_decode) >= self.max_skip_seconds:
+                changed = True
+
+            if changed:
+                self.reference = small
+                self.last_decode = now
+                self.decoded_frames += 1
+            else:
+                self.skipped_frames += 1
+            return changed
+
+    def counters(self):
+        with self.lock:
+            total = self.decoded_frames + self.skipped_frames
+            return {
+                "decoded": self.decoded_frames,
+                "skipped": self.skipped_frames,
+                "skip_ratio": (self.skipped_frames / total) if total else 0.0,
+            }
+
+    def summary(self):
+        c = self.counters()
+        return f"decodificados {c['decoded']}, ignorados {c['skipped']} ({c['skip_ratio']:.0%})"
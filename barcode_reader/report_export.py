@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Exportação XLSX em streaming, com memória constante.
+
+Usa o modo write_only do openpyxl: cada linha é serializada direto no
+arquivo temporário da planilha em vez de virar um objeto Cell em memória,
+então o consumo não cresce com o número de leituras. O progresso é
+informado a cada progress_every linhas.
+"""
+
+import logging
+import os
+import time
+
+from openpyxl import Workbook
+
+logger = logging.getLogger(__name__)
+
+HEADER = ["Data", "Horário", "Código", "Quantidade"]
+
+
+def write_xlsx_report(path, records, total=None, count_of=None, progress=None, progress_every=5000):
+    """Grava (timestamp, código) de records em path. Retorna o número de linhas.
+
+    count_of(código) → quantidade acumulada; progress(feitas, total) é chamado periodicamente.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Relatório de Leituras")
+    ws.append(HEADER)
+
+    # Datas se repetem por milhares de linhas: formata uma vez por dia
+    last_day = None
+    date_str = ""
+    rows = 0
+    for ts, data in records:
+        local_time = time.localtime(ts)
+        day = local_time[:3]
+        if day != last_day:
+            last_day = day
+            date_str = time.strftime("%d/%m/%Y", local_time)
+        time_str = time.strftime("%H:%M:%S", local_time)
+        count = count_of(data) if count_of is not None else 1
+        ws.append([date_str, time_str, data, count])
+        rows += 1
+        if progress is not None and rows % progress_every == 0:
+            progress(rows, total)
+
+    # Grava em um temporário e renomeia: um relatório pela metade nunca fica com o nome final
+    tmp_path = path + ".tmp"
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if progress is not None:
+        progress(rows, total)
+    return rows
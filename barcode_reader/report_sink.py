@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Gravação do CSV em tempo real fora da thread de leitura.
+
+As leituras entram em uma fila limitada e uma thread própria grava em lote,
+com flush + fsync agrupados: a cada commit_interval segundos ou a cada
+commit_records leituras, o que vier primeiro. A garantia de durabilidade é
+explícita: numa queda de energia perde-se no máximo commit_interval segundos
+de leituras. A thread de vídeo nunca espera pelo disco; se a fila encher
+(disco travado), as leituras excedentes são descartadas do CSV e contadas.
+"""
+
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+HEADER = ["Data", "Horário", "Código", "Quantidade"]
+
+
+class LiveReportWriter:
+    def __init__(self, path, commit_interval=1.0, commit_records=100, max_queue=10000, name=""):
+        self.path = path
+        self.commit_interval = commit_interval  # máximo de segundos de leituras sujeitos a perda
+        self.commit_records = commit_records    # commit antecipado quando o lote atinge N leituras
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.commit_time = REGISTRY.histogram("axis_report_commit_seconds", "Gravação em lote (flush + fsync)",
+                                              writer=f"csv:{name}")
+        self.dropped_counter = REGISTRY.counter("axis_report_dropped_total", "Leituras descartadas com a fila cheia",
+                                                writer=f"csv:{name}")
+        REGISTRY.gauge("axis_report_queue_depth", "Leituras aguardando gravação", fn=self.queue.qsize,
+                       writer=f"csv:{name}")
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(HEADER)
+        self.commit()
+        self.written = 0
+        self.dropped = 0
+        self.commits = 0
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="live-report", daemon=True)
+        self.thread.start()
+
+    def append(self, data, ts, count):
+        """Enfileira uma leitura; nunca bloqueia"""
+        try:
+            self.queue.put_nowait((data, ts, count))
+        except queue.Full:
+            self.dropped += 1
+            self.dropped_counter.inc()
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Fila do relatório em tempo real cheia: {self.dropped} leituras fora do CSV")
+
+    def commit(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except Exception as e:
+            logger.error(f"Erro ao gravar relatório em tempo real: {e}")
+
+    def write_row(self, item):
+        data, ts, count = item
+        local_time = time.localtime(ts)
+        self.writer.writerow([time.strftime("%d/%m/%Y", local_time), time.strftime("%H:%M:%S", local_time),
+                              data, count])
+        self.written += 1
+
+    def run(self):
+        pending = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self.closing.is_set():
+                timeout = 0
+            try:
+                item = self.queue.get(timeout=timeout if timeout is not None else 0.5)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                try:
+                    self.write_row(item)
+                except Exception as e:
+                    logger.error(f"Erro ao escrever leitura no CSV: {e}")
+                pending += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.commit_interval
+
+            if pending and (pending >= self.commit_records or time.monotonic() >= deadline
+                            or (item is None and self.closing.is_set())):
+                with self.commit_time.time():
+                    self.commit()
+                self.commits += 1
+                pending = 0
+                deadline = None
+
+            if item is None and self.closing.is_set():
+                break
+        # O arquivo é fechado pela própria thread: close() pode desistir de esperar sem cortar a gravação
+        try:
+            self.commit()
+            self.file.close()
+        except Exception:
+            pass
+
+    def close(self, timeout=5.0):
+        """Grava o que restou na fila, faz o último commit e fecha o arquivo (espera no máximo timeout s)"""
+        self.closing.set()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.warning(f"Relatório em tempo real: gravação não terminou em {timeout:g} s "
+                           f"({self.queue.qsize()} leituras na fila); o arquivo será fechado ao final")
+        if self.dropped:
+            logger.warning(f"Relatório em tempo real: {self.dropped} leituras descartadas (fila cheia)")
+        logger.info(f"Relatório em tempo real: {self.written} leituras em {self.commits} commits")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Histórico de leituras compacto e limitado em memória.
+
+As leituras recentes ficam em arrays paralelos (timestamp, id do código, id
+do tipo) com códigos e tipos internados, em vez de um dict por leitura. Ao
+passar de max_recent leituras, as mais antigas são despejadas em blocos de
+SPILL_CHUNK (custo pequeno e limitado na thread de decodificação) em um
+segmento binário só de acréscimo em disco (arquivo temporário apagado ao
+encerrar), que relatórios e consultas continuam lendo. Cada código em RAM tem
+um contador de referências: o id é liberado quando a última leitura que o usa
+vai para o disco. As estatísticas por código (__slots__) ficam em um LRU de
+até max_codes códigos; um código que sai do LRU volta a contar do zero se
+reaparecer.
+"""
+
+import logging
+import struct
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Registro no segmento: timestamp, tamanho do tipo, tamanho do código + bytes UTF-8
+_HEADER = struct.Struct("<dHH")
+_READ_CHUNK = 1 << 20
+_MAX_FIELD = 0xFFFF
+SPILL_CHUNK = 256  # leituras despejadas de cada vez
+
+
+def encode_field(text):
+    """UTF-8 limitado ao tamanho do campo, cortando em fronteira de caractere"""
+    data = text.encode("utf-8")
+    if len(data) > _MAX_FIELD:
+        data = data[:_MAX_FIELD].decode("utf-8", "ignore").encode("utf-8")
+    return data
+
+
+class CodeStat:
+    __slots__ = ("type", "first_seen", "last_seen", "count")
+
+    def __init__(self, ctype, ts):
+        self.type = ctype
+        self.first_seen = ts
+        self.last_seen = ts
+        self.count = 1
+
+
+class ScanHistory:
+    def __init__(self, max_recent=50000, max_codes=100000, spill_dir=None):
+        self.max_recent = max(2, max_recent)  # leituras mantidas em RAM
+        self.max_codes = max(1, max_codes)    # códigos com estatística em RAM
+        self.spill_dir = spill_dir
+        self.lock = threading.Lock()
+        self.timestamps = array("d")
+        self.code_ids = array("I")
+        self.type_ids = array("B")
+        self.codes = []          # id -> código (só os referenciados pela janela em RAM; None = id livre)
+        self.code_index = {}     # código -> id
+        self.code_refs = array("I")  # id -> leituras em RAM que usam o código
+        self.free_ids = []
+        self.types = []
+        self.type_index = {}
+        self.stats = OrderedDict()  # código -> CodeStat, do menos para o mais recente
+        self.segment = None
+        self.spilled = 0
+
+    def __len__(self):
+        with self.lock:
+            return self.spilled + len(self.timestamps)
+
+    def intern(self, value, values, index):
+        ident = index.get(value)
+        if ident is None:
+            ident = len(values)
+            values.append(value)
+            index[value] = ident
+        return ident
+
+    def intern_code(self, data):
+        """Id do código na janela em RAM (reaproveita ids liberados) com uma referência a mais"""
+        ident = self.code_index.get(data)
+        if ident is None:
+            if self.free_ids:
+                ident = self.free_ids.pop()
+                self.codes[ident] = data
+            else:
+                ident = len(self.codes)
+                self.codes.append(data)
+                self.code_refs.append(0)
+            self.code_index[data] = ident
+        self.code_refs[ident] += 1
+        return ident
+
+    def add(self, data, ctype, ts):
+        """Registra uma leitura e devolve a quantidade acumulada do código"""
+        with self.lock:
+            if len(self.timestamps) >= self.max_recent:
+                self.spill(min(SPILL_CHUNK, len(self.timestamps) // 2))
+            self.timestamps.append(ts)
+            self.code_ids.append(self.intern_code(data))
+            self.type_ids.append(self.intern(ctype, self.types, self.type_index))
+
+            st = self.stats.get(data)
+            if st is None:
+                st = self.stats[data] = CodeStat(self.types[self.type_index[ctype]], ts)
+                if len(self.stats) > self.max_codes:
+                    self.stats.popitem(last=False)
+            else:
+                st.last_seen = ts
+                st.count += 1
+                self.stats.move_to_end(data)
+            return st.count
+
+    def count(self, data):
+        with self.lock:
+            st = self.stats.get(data)
+            return st.count if st is not None else 1
+
+    def stat(self, data):
+        with self.lock:
+            return self.stats.get(data)
+
+    def spill(self, n):
+        """Move as n leituras mais antigas da RAM para o segmento em disco (com lock)"""
+        if self.segment is None:
+            self.segment = tempfile.TemporaryFile(prefix="axis_scans_", suffix=".seg", dir=self.spill_dir)
+        out = bytearray()
+        for i in range(n):
+            code_id = self.code_ids[i]
+            code = self.codes[code_id]
+            ctype = encode_field(self.types[self.type_ids[i]])
+            encoded = encode_field(code)
+            out += _HEADER.pack(self.timestamps[i], len(ctype), len(encoded))
+            out += ctype
+            out += encoded
+            self.code_refs[code_id] -= 1
+            if self.code_refs[code_id] == 0:
+                # Última leitura em RAM com este código: libera o id
+                del self.code_index[code]
+                self.codes[code_id] = None
+                self.free_ids.append(code_id)
+        # Sem flush: o segmento só é lido pelo mesmo objeto de arquivo, e o seek de records() descarrega o buffer
+        self.segment.seek(0, 2)
+        self.segment.write(out)
+        del self.timestamps[:n]
+        del self.code_ids[:n]
+        del self.type_ids[:n]
+        self.spilled += n
+        logger.debug(f"Histórico: {n} leituras despejadas em disco ({self.spilled} no total)")
+
+    def records(self):
+        """Itera (timestamp, tipo, código) em ordem, do disco para a RAM.
+
+        Vale o conteúdo do momento da chamada: leituras novas (ou despejos)
+        durante a iteração não alteram o resultado.
+        """
+        with self.lock:
+            end = 0
+            if self.segment is not None:
+                self.segment.seek(0, 2)
+                end = self.segment.tell()
+            timestamps = array("d", self.timestamps)
+            code_ids = array("I", self.code_ids)
+            type_ids = array("B", self.type_ids)
+            codes = list(self.codes)
+            types = list(self.types)
+
+        pos = 0
+        buf = b""
+        while pos < end:
+            with self.lock:
+                self.segment.seek(pos)
+                chunk = self.segment.read(min(_READ_CHUNK, end - pos))
+            if not chunk:
+                break
+            pos += len(chunk)
+            buf += chunk
+            offset = 0
+            while len(buf) - offset >= _HEADER.size:
+                ts, tlen, clen = _HEADER.unpack_from(buf, offset)
+                stop = offset + _HEADER.size + tlen + clen
+                if stop > len(buf):
+                    break
+                start = offset + _HEADER.size
+                yield ts, buf[start:start + tlen].decode("utf-8"), buf[start + tlen:stop].decode("utf-8")
+                offset = stop
+            buf = buf[offset:]
+
+        for ts, code_id, type_id in zip(timestamps, code_ids, type_ids):
+            yield ts, types[type_id], codes[code_id]
+
+    def close(self):
+        """Fecha (e apaga) o segmento em disco; as leituras despejadas deixam de fazer parte do histórico"""
+        with self.lock:
+            if self.segment is not None:
+                try:
+                    self.segment.close()
+                except Exception:
+                    pass
+            self.segment = None
+            self.spilled = 0
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Banco persistente de leituras (SQLite em modo WAL) com consultas indexadas.
+
+Todas as câmeras gravam no mesmo arquivo, identificadas pelo nome. As
+inserções vão para uma fila e uma thread própria grava em lote (uma
+transação por lote), então a thread de vídeo nunca espera pelo banco.
+Índices em (código, câmera, horário), (câmera, horário) e horário mantêm consultas
+como "quando o código X foi visto pela última vez na câmera Y" em
+milissegundos mesmo com milhões de linhas.
+
+Também pode ser usado pela linha de comando:
+
+    python scan_store.py axis_scans.db last CODIGO [--camera NOME]
+    python scan_store.py axis_scans.db count [--code C] [--since ...] [--until ...]
+    python scan_store.py axis_scans.db histogram --interval 3600 [--code C]
+"""
+
+import argparse
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    type TEXT NOT NULL,
+    code TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scans_code ON scans(code, camera, ts);
+CREATE INDEX IF NOT EXISTS idx_scans_camera_ts ON scans(camera, ts);
+CREATE INDEX IF NOT EXISTS idx_scans_ts ON scans(ts);
+"""
+
+
+def connect(path, readonly=False):
+    conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL: um commit só espera o fsync no checkpoint; numa queda perde-se no máximo o último lote
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if not readonly:
+        conn.executescript(SCHEMA)
+    return conn
+
+
+def where_clause(code=None, camera=None, since=None, until=None):
+    conditions = []
+    params = []
+    if code is not None:
+        conditions.append("code = ?")
+        params.append(code)
+    if camera is not None:
+        conditions.append("camera = ?")
+        params.append(camera)
+    if since is not None:
+        conditions.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("ts < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+class ScanQuery:
+    """Consultas indexadas (somente leitura) ao banco de leituras"""
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = connect(path, readonly=True)
+        self.read_lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        with self.read_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    def last_seen(self, code, camera=None):
+        """(ts, câmera, tipo) da última leitura do código, ou None"""
+        where, params = where_clause(code=code, camera=camera)
+        rows = self.query(f"SELECT ts, camera, type FROM scans{where} ORDER BY ts DESC LIMIT 1", params)
+        return rows[0] if rows else None
+
+    def first_seen(self, code, camera=None):
+        where, params = where_clause(code=code, camera=camera)
+        rows = self.query(f"SELECT ts, camera, type FROM scans{where} ORDER BY ts ASC LIMIT 1", params)
+        return rows[0] if rows else None
+
+    def count(self, code=None, camera=None, since=None, until=None):
+        where, params = where_clause(code, camera, since, until)
+        return self.query(f"SELECT COUNT(*) FROM scans{where}", params)[0][0]
+
+    def counts_per_interval(self, interval, code=None, camera=None, since=None, until=None):
+        """[(início do intervalo, leituras), ...] em janelas de interval segundos"""
+        where, params = where_clause(code, camera, since, until)
+        sql = (f"SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, COUNT(*) FROM scans{where} "
+               f"GROUP BY bucket ORDER BY bucket")
+        return self.query(sql, [interval, interval] + params)
+
+    def history(self, code, camera=None, limit=100):
+        """Leituras mais recentes do código: [(ts, câmera, tipo), ...]"""
+        where, params = where_clause(code=code, camera=camera)
+        return self.query(f"SELECT ts, camera, type FROM scans{where} ORDER BY ts DESC LIMIT ?", params + [limit])
+
+    def close(self):
+        try:
+            self.reader.close()
+        except Exception:
+            pass
+
+
+class ScanStore(ScanQuery):
+    """Banco de leituras com gravação em lote por uma thread própria"""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_queue=50000):
+        self.writer = connect(path)
+        super().__init__(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # máximo de segundos entre a leitura e o commit
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.commit_time = REGISTRY.histogram("axis_report_commit_seconds", "Gravação em lote (flush + fsync)",
+                                              writer="scan_store")
+        self.dropped_counter = REGISTRY.counter("axis_report_dropped_total", "Leituras descartadas com a fila cheia",
+                                                writer="scan_store")
+        REGISTRY.gauge("axis_report_queue_depth", "Leituras aguardando gravação", fn=self.queue.qsize,
+                       writer="scan_store")
+        self.dropped = 0
+        self.inserted = 0
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="scan-store", daemon=True)
+        self.thread.start()
+
+    def add(self, camera, data, ctype, ts):
+        """Enfileira uma leitura; nunca bloqueia"""
+        try:
+            self.queue.put_nowait((ts, camera or "", ctype or "", data))
+        except queue.Full:
+            self.dropped += 1
+            self.dropped_counter.inc()
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Fila do banco de leituras cheia: {self.dropped} leituras descartadas")
+
+    def run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = 0 if self.closing.is_set() else (
+                0.5 if deadline is None else max(0.0, deadline - time.monotonic()))
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+            except queue.Empty:
+                if not batch and self.closing.is_set():
+                    break
+            if batch:
+                self.insert(batch)
+                batch = []
+                deadline = None
+
+    def insert(self, batch):
+        try:
+            with self.commit_time.time(), self.writer:
+                self.writer.executemany("INSERT INTO scans (ts, camera, type, code) VALUES (?, ?, ?, ?)", batch)
+            self.inserted += len(batch)
+        except Exception as e:
+            logger.error(f"Erro ao gravar {len(batch)} leituras no banco: {e}")
+
+    def close(self):
+        self.closing.set()
+        self.thread.join()
+        for conn in (self.writer, self.reader):
+            try:
+                conn.close()
+            except Exception:
+                pass
+        logger.info(f"Banco de leituras: {self.inserted} leituras gravadas em {self.path}")
+
+
+# ----------------------------------------------------------------------
+# Linha de comando
+# ----------------------------------------------------------------------
+def parse_time(text):
+    """Aceita epoch ou 'AAAA-MM-DD[ HH:MM[:SS]]' (horário local)"""
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Data inválida: {text}")
+
+
+def format_ts(ts):
+    return time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(ts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas ao banco de leituras")
+    parser.add_argument("db", help="arquivo SQLite gerado com --scan-db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("last", "first", "history"):
+        p = sub.add_parser(name, help=f"{name} leitura(s) de um código")
+        p.add_argument("code")
+        p.add_argument("--camera", default=None)
+        p.add_argument("--limit", type=int, default=20)
+
+    for name in ("count", "histogram"):
+        p = sub.add_parser(name, help="total de leituras" if name == "count" else "leituras por intervalo")
+        p.add_argument("--code", default=None)
+        p.add_argument("--camera", default=None)
+        p.add_argument("--since", type=parse_time, default=None)
+        p.add_argument("--until", type=parse_time, default=None)
+        if name == "histogram":
+            p.add_argument("--interval", type=float, default=3600, help="tamanho do intervalo em segundos")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"Banco não encontrado: {args.db}")
+        return 2
+    store = ScanQuery(args.db)
+    try:
+        if args.command in ("last", "first"):
+            row = store.last_seen(args.code, args.camera) if args.command == "last" else \
+                store.first_seen(args.code, args.camera)
+            rows = [row] if row else []
+        elif args.command == "history":
+            rows = store.history(args.code, args.camera, args.limit)
+        elif args.command == "count":
+            print(store.count(args.code, args.camera, args.since, args.until))
+            return 0
+        else:
+            for bucket, total in store.counts_per_interval(args.interval, args.code, args.camera,
+                                                           args.since, args.until):
+                print(f"{format_ts(bucket)}\t{total}")
+            return 0
+
+        if not rows:
+            print("Nenhuma leitura encontrada")
+            return 1
+        for ts, camera, ctype in rows:
+            print(f"{format_ts(ts)}\t{camera}\t{ctype}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,910 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Motor de leitura independente da interface gráfica.
+
+Concentra o pipeline captura → decodificação → deduplicação → relatórios.
+A interface Tkinter (ou qualquer outro consumidor, como o modo headless)
+apenas assina os eventos publicados pelo motor através de um ScannerListener.
+"""
+
+import logging
+import itertools
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import cv2
+
+from camera_capabilities import fetch_capabilities, fetch_serial
+from code_dedup import CodeDeduplicator
+from capture_backends import open_capture
+from code_geometry import offset_code, scale_code
+from decode_cascade import DecodeCascade
+from metrics import PipelineMetrics
+from motion_gate import MotionGate
+from report_export import write_xlsx_report
+from report_sink import LiveReportWriter
+from scan_history import ScanHistory
+from stream_profiles import HighResStreamSource, SnapshotSource, media_url
+from stream_watchdog import StreamWatchdog
+from vapix_client import VapixClient
+
+logger = logging.getLogger(__name__)
+
+
+class ScannerListener:
+    """Assinante de eventos do ScannerEngine.
+
+    Os métodos são chamados a partir das threads do motor; quem precisar
+    tocar em uma UI deve encaminhar a chamada para a sua própria thread.
+    """
+
+    # Só recebe on_frame quem realmente vai exibir o vídeo
+    wants_frames = False
+
+    def on_status(self, message):
+        pass
+
+    def on_result(self, message):
+        pass
+
+    def on_frame(self, frame, codes):
+        pass
+
+    def on_code(self, data, ctype, ts, count):
+        pass
+
+    def on_ptz_limits(self, min_z, max_z):
+        pass
+
+
+class LoggingListener(ScannerListener):
+    """Assinante usado no modo headless: apenas registra os eventos no log"""
+
+    def __init__(self, name=""):
+        self.prefix = f"[{name}] " if name else ""
+
+    def on_status(self, message):
+        logger.info(f"{self.prefix}[status] {message}")
+
+    def on_result(self, message):
+        logger.info(f"{self.prefix}[leitura] {message}")
+
+
+class ScannerEngine:
+    def __init__(self, camera_ip="", camera_username="", camera_password="", scan_cooldown=30, report_dir=None,
+                 name="", rois=None, decode_scheduler=None, report_tag="", cascade=None, motion_gate=None,
+                 localizer=None, tracker=None, pyramid=None, capture_backend="opencv", capture_options=None,
+                 stream_params=None, dual_stream=None, live_report_options=None,
+                 history=None, scan_store=None, metrics=None, http_port=None, capability_cache=None,
+                 reconnect=None, trigger=None, dedup=None, confirm=None):
+        # Configurações da câmera
+        self.label = name
+        self.camera_ip = camera_ip
+        self.camera_username = camera_username
+        self.camera_password = camera_password
+        # Porta do VAPIX (axis-cgi) quando não é a 80, ex.: câmera atrás de NAT ou simulador
+        self.http_port = http_port
+        self.connected = False  # Estado da conexão RTSP
+        # Cliente VAPIX persistente (sessão keep-alive, fila única com coalescência de zoom/foco)
+        self.vapix = None
+        self.autofocus_enabled = None
+        # Recursos descobertos (CameraCapabilities) e cache em disco por número de série (CapabilityCache)
+        self.capabilities = None
+        self.capability_cache = capability_cache
+        self.scanning = False   # Estado da leitura de códigos
+        self.last_code = None
+        self.last_scan_time = 0
+        self.scan_cooldown = scan_cooldown  # segundos entre leituras para evitar duplicatas
+        self.report_dir = report_dir
+        # Identifica a câmera nos nomes de arquivo quando várias gravam na mesma pasta
+        self.report_tag = "".join(c if c.isalnum() or c in "-_" else "_" for c in report_tag)
+        self.rois = [tuple(r) for r in (rois or [])]  # [(x, y, w, h), ...] em pixels do frame; vazio = frame inteiro
+        # Localizador de regiões candidatas (BarcodeLocalizer): o zbar só vê recortes pequenos
+        self.localizer = localizer
+        # Rastreador (CodeTracker): códigos já confirmados são seguidos sem passar de novo pelo zbar
+        self.tracker = tracker
+        # Pirâmide de resolução (DecodePyramid): tenta escalas reduzidas antes da resolução total
+        self.pyramid = pyramid
+        self.cap = None  # RTSP VideoCapture (ou outro backend de capture_backends)
+        # Detecção de travamento e reconexão automática: stall_timeout, frozen_timeout, initial_delay, max_delay...
+        self.watchdog = StreamWatchdog(**(reconnect or {}))
+        # Backend de captura: "opencv", "gstreamer" ou "pyav"; opções: gray, keyframes_only, ring_size, decoder...
+        self.capture_backend = capture_backend
+        self.capture_options = dict(capture_options or {})
+        # Parâmetros VAPIX do stream principal (resolution, fps, compression, videocodec, streamprofile)
+        self.stream_params = dict(stream_params or {})
+        # Stream duplo: {"source": "snapshot"|"stream", "params": {...}, "min_interval": s, "idle_seconds": s}.
+        # O stream principal (leve) só alimenta a visualização e o detector de movimento.
+        self.dual_stream = dict(dual_stream) if dual_stream else None
+        self.decode_source = None
+        self.decode_scale = 1.0  # frame de visualização / frame decodificado (para a anotação)
+
+        # Decodificação compartilhada entre câmeras (supervisor); None = decodifica na própria thread de vídeo
+        self.decode_scheduler = decode_scheduler
+        self.last_codes = []
+        # Cascata de pré-processamento (sequencial por padrão; paralela/adaptativa por câmera)
+        self.cascade = cascade or DecodeCascade()
+        # Métricas da câmera (latências, contadores e gauges; ver metrics.py). As criadas aqui usam o
+        # nome da câmera como label e são refeitas na conexão se o nome mudar (IP digitado na janela)
+        self.metrics = None
+        self.own_metrics = metrics is None
+        # Modo disparado (TriggerController): decodifica só na janela após cada evento (entrada digital, HTTP)
+        self.trigger = trigger
+        # Detector de mudança (MotionGate): frames parados não são decodificados
+        self.motion_gate = motion_gate
+        if self.dual_stream is not None and self.motion_gate is None and self.trigger is None:
+            # Sem detector, o stream duplo buscaria a imagem de alta resolução a cada frame
+            self.motion_gate = MotionGate()
+
+        # Variáveis para controle de thread de captura (baixa latência)
+        self.frame_lock = threading.Lock()
+        self.new_frame_event = threading.Event()
+        self.latest_frame = None
+        self.capture_thread = None
+        self.video_thread = None
+
+        # Controle de duplicidade por código (tempo e presença)
+        # Deduplicação (CodeDeduplicator): própria da câmera ou compartilhada entre câmeras pelo supervisor
+        self.dedup = dedup if dedup is not None else CodeDeduplicator(scan_cooldown)
+        self.confirm = confirm  # (K, N) desta câmera; None = padrão do CodeDeduplicator
+        # Histórico compacto: janela recente em RAM, leituras antigas despejadas em disco
+        self.history = history or ScanHistory()
+        # Banco persistente e indexado (ScanStore), opcional e possivelmente compartilhado entre câmeras
+        self.scan_store = scan_store
+        self.export_thread = None
+        self.live_report_path = None
+        self.live_report_writer = None  # LiveReportWriter: grava em lote fora da thread de vídeo
+        # commit_interval (s de perda máxima), commit_records, max_queue
+        self.live_report_options = dict(live_report_options or {})
+
+        self.listeners = []
+
+        self.bind_metrics(metrics)
+
+    def bind_metrics(self, metrics=None):
+        """Passa a usar estas métricas (ou novas com o nome atual da câmera) e registra os gauges"""
+        previous = self.metrics
+        self.metrics = metrics or PipelineMetrics(self.name)
+        if self.cascade.metrics is None or self.cascade.metrics is previous:
+            self.cascade.metrics = self.metrics
+        if self.motion_gate is not None:
+            self.metrics.gauge("axis_motion_skipped_frames", "Frames não decodificados por falta de movimento",
+                               lambda: self.motion_gate.skipped_frames)
+        self.metrics.gauge("axis_stream_up", "1 com o stream aberto, 0 durante uma queda",
+                           lambda: 1 if self.connected and self.watchdog.down_since is None else 0)
+        self.metrics.gauge("axis_history_resident_scans", "Leituras mantidas em memória",
+                           lambda: len(self.history.timestamps))
+
+    @property
+    def name(self):
+        """Nome da câmera para logs (o IP, se nenhum nome foi configurado)"""
+        return self.label or self.camera_ip or "câmera"
+
+    # ------------------------------------------------------------------
+    # Assinantes
+    # ------------------------------------------------------------------
+    def add_listener(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        try:
+            self.listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def emit(self, event, *args):
+        """Publica um evento para todos os assinantes sem deixar falhas de um afetarem os outros"""
+        for listener in list(self.listeners):
+            try:
+                getattr(listener, event)(*args)
+            except Exception as e:
+                logger.error(f"Erro no assinante ({event}): {e}")
+
+    def wants_frames(self):
+        return any(getattr(listener, "wants_frames", False) for listener in self.listeners)
+
+    def update_status(self, message):
+        self.emit("on_status", message)
+
+    def update_result(self, message):
+        self.emit("on_result", message)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def connect(self, retry=False):
+        """Abre o stream e inicia as threads de captura e processamento. Retorna True em caso de sucesso.
+
+        Com retry=True, uma câmera indisponível não é erro: as threads sobem e o
+        stream é reaberto em segundo plano até a câmera responder.
+        """
+        if self.connected:
+            return True
+
+        if self.own_metrics and self.metrics.camera != self.name:
+            # IP/nome definidos depois da construção: as séries do label antigo dão lugar às do atual
+            self.metrics.registry.remove(camera=self.metrics.camera)
+            self.bind_metrics()
+
+        self.open_rtsp_stream()
+        if self.cap is None or not self.cap.isOpened():
+            if not retry:
+                return False
+            logger.warning(f"[{self.name}] Câmera indisponível; tentando novamente em segundo plano")
+            self.release_capture()
+
+        self.connected = True
+        self.open_decode_source()
+
+        # Iniciar thread de captura (buffer cleaning) para baixa latência
+        self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.capture_thread.start()
+
+        # Iniciar thread de vídeo (processamento e publicação)
+        self.video_thread = threading.Thread(target=self.video_loop, daemon=True)
+        self.video_thread.start()
+
+        # Verificar suporte PTZ e limites
+        self.open_vapix()
+        self.check_ptz_support()
+        if self.trigger is not None:
+            self.trigger.start(self)
+        return True
+
+    def disconnect(self):
+        self.connected = False
+        if self.scanning:
+            self.stop_scanning()
+        else:
+            self.stop_live_report()
+
+        for thread in (self.capture_thread, self.video_thread):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self.capture_thread = None
+        self.video_thread = None
+
+        # Liberar recursos
+        self.release_capture()
+        if self.watchdog.reconnects or self.watchdog.failed_attempts:
+            logger.info(f"[{self.name}] Conexão: {self.watchdog.summary()}")
+        with self.frame_lock:
+            self.latest_frame = None
+        self.close_decode_source()
+        self.close_vapix()
+        if self.trigger is not None:
+            self.trigger.stop()
+
+    def close(self):
+        """Encerramento definitivo do motor: desconecta e libera o histórico (segmentos em disco).
+
+        disconnect() mantém o histórico para relatórios depois de desconectar; close()
+        é chamado só quando o motor não será mais usado (fim do processo/da janela).
+        """
+        if self.connected:
+            self.disconnect()
+        self.history.close()
+
+    def start_scanning(self, scan_cooldown=None):
+        if scan_cooldown is not None:
+            self.scan_cooldown = scan_cooldown
+
+        # Reiniciar a sessão de leitura limpa o cache recente, mas mantém o histórico
+        self.dedup.reset(self.name)
+        self.last_codes = []
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.tracker is not None:
+            self.tracker.reset()
+        self.start_live_report(self.report_dir)
+        self.scanning = True
+
+    def stop_scanning(self):
+        self.scanning = False
+        self.stop_live_report()
+        logger.info(f"[{self.name}] Acertos por variante: {self.cascade.summary()}")
+        if self.motion_gate is not None:
+            logger.info(f"[{self.name}] Detector de movimento: {self.motion_gate.summary()}")
+        if self.pyramid is not None:
+            logger.info(f"[{self.name}] Acertos por escala: {self.pyramid.summary()}")
+        if self.tracker is not None:
+            logger.info(f"[{self.name}] Rastreador: {self.tracker.summary()}")
+
+    # ------------------------------------------------------------------
+    # VAPIX (PTZ / foco)
+    # ------------------------------------------------------------------
+    def camera_host(self):
+        ip = self.camera_ip
+        if ":" in ip:
+            ip = ip.split(":")[0]
+        if self.http_port:
+            return f"{ip}:{self.http_port}"
+        return ip
+
+    def open_vapix(self):
+        """Cria o cliente VAPIX da conexão atual (host/credenciais podem ter mudado desde a última)"""
+        self.close_vapix()
+        self.vapix = VapixClient(self.camera_host(), self.camera_username, self.camera_password, name=self.name)
+        self.autofocus_enabled = None  # desconhecido até o primeiro comando
+
+    def close_vapix(self):
+        if self.vapix is not None:
+            self.vapix.close()
+        self.vapix = None
+
+    def check_ptz_support(self):
+        """Obtém os recursos da câmera (PTZ, limites de zoom) do cache em disco ou, se preciso, da câmera"""
+        host = self.camera_host()
+        cached = self.capability_cache.get(host) if self.capability_cache is not None else None
+        if cached is not None:
+            logger.info(f"[{self.name}] Recursos da câmera {cached.serial} obtidos do cache")
+            self.apply_capabilities(cached)
+
+        def _verify():
+            # Confere (em segundo plano) se a câmera do host ainda é a do cache
+            try:
+                serial = fetch_serial(self.vapix)
+            except Exception as e:
+                logger.debug(f"[{self.name}] Não foi possível conferir o número de série: {e}")
+                return
+            if serial and serial != cached.serial:
+                logger.warning(f"[{self.name}] Câmera em {host} trocou (série {serial}, cache {cached.serial}); "
+                               f"redescobrindo recursos")
+                self.capability_cache.invalidate(host)
+                _check()
+
+        def _check():
+            try:
+                caps = fetch_capabilities(self.vapix)
+                logger.info(f"[{self.name}] Recursos: {caps.model} {caps.serial} (firmware {caps.firmware}), "
+                            f"PTZ={'sim' if caps.ptz else 'não'}, zoom {caps.min_zoom}-{caps.max_zoom}")
+                if self.capability_cache is not None:
+                    self.capability_cache.put(host, caps)
+                self.apply_capabilities(caps)
+            except Exception as e:
+                logger.error(f"Erro ao checar PTZ: {e}")
+
+        self.vapix.submit(_check if cached is None else _verify, key="ptz_info")
+
+    def apply_capabilities(self, caps):
+        self.capabilities = caps
+        if not caps.ptz:
+            self.update_status("PTZ desabilitado ou restrito na câmera")
+        elif caps.has_zoom_limits():
+            self.emit("on_ptz_limits", caps.min_zoom, caps.max_zoom)
+            self.update_status(f"PTZ Ativo. Zoom: {caps.min_zoom}-{caps.max_zoom}{caps.zoom_kind()}")
+        else:
+            self.update_status("PTZ Ativo (Limites desconhecidos)")
+
+    def send_zoom_command(self, val):
+        """Envia comando de zoom para a câmera via API VAPIX (último valor vence)"""
+        if not self.connected or self.vapix is None:
+            return
+
+        def _request():
+            try:
+                params = {"zoom": int(float(val)), "camera": 1}
+                response = self.vapix.get("com/ptz.cgi", params=params)
+
+                # 200 = OK com corpo, 204 = OK sem corpo (sucesso)
+                if response.status_code in [200, 204]:
+                    logger.info(f"Zoom definido para {val}. Status: {response.status_code}")
+                else:
+                    logger.warning(f"Falha ao definir zoom. Status: {response.status_code}, Msg: {response.text}")
+            except Exception as e:
+                logger.error(f"Erro ao enviar comando de zoom: {e}")
+
+        self.vapix.submit(_request, key="zoom")
+
+    def send_focus_command(self, val):
+        """Envia comando de foco manual para a câmera (último valor vence)"""
+        if not self.connected or self.vapix is None:
+            return
+
+        def _request():
+            try:
+                # Desabilita o autofoco para permitir o manual (só se não sabemos que já está desligado)
+                if self.autofocus_enabled is not False:
+                    off = self.vapix.get("com/ptz.cgi", params={"autofocus": "off", "camera": 1}, timeout=3)
+                    if off.status_code in [200, 204]:
+                        self.autofocus_enabled = False
+
+                # Envia valor de foco
+                params = {"focus": int(float(val)), "camera": 1}
+                response = self.vapix.get("com/ptz.cgi", params=params)
+
+                if response.status_code in [200, 204]:
+                    logger.info(f"Foco manual definido para {val}. Status: {response.status_code}")
+                else:
+                    logger.warning(f"Falha ao definir foco. Status: {response.status_code}, Msg: {response.text}")
+            except Exception as e:
+                logger.error(f"Erro ao enviar comando de foco: {e}")
+
+        self.vapix.submit(_request, key="focus")
+
+    def trigger_autofocus(self):
+        """Aciona o autofoco da câmera via API VAPIX (Toggle Off/On para forçar)"""
+        if not self.connected or self.vapix is None:
+            self.update_status("Conecte a câmera primeiro.")
+            return
+
+        self.update_status("Tentando realizar autofoco...")
+
+        def _request():
+            try:
+                # 1. Tenta desabilitar primeiro (Toggle strategy)
+                logger.info("Enviando comando: autofocus=off")
+                self.vapix.get("com/ptz.cgi", params={"autofocus": "off", "camera": 1})
+                time.sleep(0.5)
+
+                # 2. Habilita autofocus
+                logger.info("Enviando comando: autofocus=on")
+                params = {"autofocus": "on", "camera": 1}
+                response = self.vapix.get("com/ptz.cgi", params=params, timeout=10)
+
+                if response.status_code in [200, 204]:
+                    self.autofocus_enabled = True
+                    logger.info(f"Autofoco acionado com sucesso. Status: {response.status_code}")
+                    self.update_status("Autofoco realizado com sucesso!")
+                else:
+                    # Fallback: tentar focus=auto (algumas câmeras antigas/específicas)
+                    logger.warning(f"Autofoco padrão falhou ({response.status_code}). Tentando método alternativo...")
+                    params_alt = {"focus": "auto", "camera": 1}
+                    resp_alt = self.vapix.get("com/ptz.cgi", params=params_alt, timeout=10)
+
+                    if resp_alt.status_code in [200, 204]:
+                        self.autofocus_enabled = True
+                        logger.info(f"Autofoco alternativo sucesso. Status: {resp_alt.status_code}")
+                        self.update_status("Autofoco realizado (método alt)!")
+                    else:
+                        logger.warning(f"Falha no autofoco. Msg: {response.text}")
+                        self.update_status("Câmera não suporta autofoco remoto ou falhou.")
+
+            except Exception as e:
+                logger.error(f"Erro ao enviar comando de autofoco: {e}")
+                self.update_status(f"Erro no autofoco: {e}")
+
+        # Um foco manual ainda na fila perderia o efeito depois do autofoco
+        self.vapix.submit(_request, key="focus")
+
+    # ------------------------------------------------------------------
+    # Captura e processamento
+    # ------------------------------------------------------------------
+    def capture_loop(self):
+        """Loop dedicado para ler frames o mais rápido possível e manter buffer vazio.
+
+        Se o stream trava (sem frames ou timestamps congelados), esta mesma thread
+        fecha e reabre a captura com recuo exponencial (StreamWatchdog).
+        """
+        self.watchdog.reset()
+        while self.connected:
+            try:
+                if self.cap is not None and self.cap.isOpened():
+                    ret, frame = self.cap.read()
+                    if ret:
+                        self.metrics.frames.inc()
+                        self.watchdog.frame(self.capture_position())
+                        if self.new_frame_event.is_set():
+                            # O frame anterior nem chegou a ser processado
+                            self.metrics.dropped_frames.inc()
+                        with self.frame_lock:
+                            self.latest_frame = frame
+                        self.new_frame_event.set()
+                    elif getattr(self.cap, "ring_full", False):
+                        # Todos os buffers do anel ainda em uso (decodificação lenta): frame descartado,
+                        # mas o stream está vivo
+                        self.metrics.dropped_frames.inc()
+                        self.watchdog.frame(self.capture_position())
+                    else:
+                        self.metrics.capture_failures.inc()
+                        time.sleep(0.01)
+                    reason = self.watchdog.stalled()
+                    if reason is not None:
+                        self.reconnect_stream(reason)
+                elif self.watchdog.enabled:
+                    self.reconnect_stream("stream fechado")
+                else:
+                    time.sleep(0.1)
+            except Exception as e:
+                logger.error(f"Erro no loop de captura: {e}")
+                time.sleep(0.1)
+
+    def capture_position(self):
+        position = getattr(self.cap, "position", None)
+        return position() if position is not None else None
+
+    def reconnect_stream(self, reason):
+        """Fecha e reabre o stream até conseguir (ou até desconectar), esperando cada vez mais entre tentativas"""
+        self.watchdog.stream_lost()
+        logger.warning(f"[{self.name}] Stream travado ({reason}); reconectando")
+        self.release_capture()
+        while self.connected:
+            delay = self.watchdog.next_delay()
+            self.update_status(f"Conexão perdida ({reason}). Nova tentativa em {delay:.0f} s...")
+            deadline = time.monotonic() + delay
+            while self.connected and time.monotonic() < deadline:
+                time.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+            if not self.connected:
+                return
+
+            self.open_rtsp_stream()
+            if not self.connected:
+                # disconnect() durante a abertura: não deixa a captura nova órfã
+                self.release_capture()
+                return
+            if self.cap is not None and self.cap.isOpened():
+                outage = self.watchdog.reconnected()
+                self.metrics.reconnects.inc()
+                self.metrics.downtime.inc(outage)
+                logger.info(f"[{self.name}] Stream reaberto após {outage:.1f} s fora do ar ({self.watchdog.summary()})")
+                self.update_status(f"Stream reaberto após {outage:.1f} s fora do ar")
+                if self.capabilities is None and self.vapix is not None:
+                    # Câmera estava fora do ar na conexão: a descoberta de PTZ ainda não rodou
+                    self.check_ptz_support()
+                return
+            self.watchdog.attempt_failed()
+            self.release_capture()
+
+    def video_loop(self):
+        while self.connected:
+            try:
+                # Frame mais recente (sincronizado com evento de nova imagem)
+                frame = self.capture_frame()
+                if frame is None:
+                    continue
+
+                codes = []
+                if self.scanning and self.trigger is not None and not self.trigger.active():
+                    # Modo disparado, fora da janela: nada é decodificado
+                    self.last_codes = []
+                elif self.scanning and self.trigger is None and not self.scene_changed(frame):
+                    # Cena parada desde a última decodificação: mantém os últimos códigos na anotação
+                    codes = self.last_codes
+                elif self.scanning:
+                    # Stream duplo: a decodificação usa a imagem de alta resolução; senão o próprio frame
+                    target = self.decode_target(frame)
+                    if target is None:
+                        codes = self.last_codes
+                    elif self.decode_scheduler is not None:
+                        # Workers compartilhados decodificam; aqui só entregamos o frame mais recente
+                        self.decode_scheduler.submit(self, target)
+                        codes = self.last_codes
+                    else:
+                        # Processar a imagem para encontrar códigos
+                        codes = self.decode_frame(target)
+                        self.process_codes(codes)
+
+                # Sem assinantes de vídeo (ex.: headless) nada é desenhado
+                if self.wants_frames():
+                    if self.decode_scale != 1:
+                        codes = [scale_code(c, self.decode_scale) for c in codes]
+                    self.emit("on_frame", frame, codes)
+
+            except Exception as e:
+                logger.error(f"Erro no loop de vídeo: {e}")
+                time.sleep(1)
+
+    def scene_changed(self, frame):
+        if self.motion_gate is None:
+            return True
+        return self.motion_gate.should_decode(self.gate_region(frame))
+
+    def decode_target(self, frame):
+        """Imagem a decodificar: o frame do stream ou, no modo duplo, a de alta resolução"""
+        if self.decode_source is None:
+            self.decode_scale = 1.0
+            return frame
+        target = self.decode_source.frame()
+        if target is not None and target.shape[1]:
+            self.decode_scale = frame.shape[1] / float(target.shape[1])
+        return target
+
+    def open_decode_source(self):
+        if self.dual_stream is None and self.trigger is not None and self.trigger.snapshot:
+            # Modo disparado com snapshot: o JPEG em alta resolução só é buscado dentro da janela, em segundo
+            # plano para a thread de vídeo não esperar pela câmera
+            self.decode_source = SnapshotSource(self.camera_host(), self.camera_username, self.camera_password,
+                                                self.trigger.snapshot_params,
+                                                gray=self.capture_options.get("gray", False),
+                                                min_interval=self.trigger.snapshot_interval, background=True)
+            logger.info(f"[{self.name}] Disparo: decodificação via snapshot "
+                        f"(image.cgi {self.trigger.snapshot_params or {}})")
+            return
+        if self.dual_stream is None:
+            return
+        source = self.dual_stream.get("source", "snapshot")
+        params = self.dual_stream.get("params") or {}
+        if source == "stream":
+            url = media_url(self.camera_ip, params)
+
+            def _open():
+                logger.info(f"[{self.name}] Abrindo stream de decodificação ({self.capture_backend}): {url}")
+                return open_capture(self.capture_backend, url, self.camera_username,
+                                    self.camera_password, **self.capture_options)
+
+            self.decode_source = HighResStreamSource(_open, idle_seconds=self.dual_stream.get("idle_seconds", 10.0))
+        else:
+            self.decode_source = SnapshotSource(self.camera_host(), self.camera_username, self.camera_password, params,
+                                                gray=self.capture_options.get("gray", False),
+                                                min_interval=self.dual_stream.get("min_interval", 0.2))
+        logger.info(f"[{self.name}] Stream duplo: decodificação via {source} {params or ''}")
+
+    def close_decode_source(self):
+        if self.decode_source is not None:
+            try:
+                self.decode_source.close()
+            except Exception:
+                pass
+        self.decode_source = None
+        self.decode_scale = 1.0
+
+    def process_codes(self, codes):
+        with self.metrics.process.time():
+            current_time = time.time()
+            # Mapear códigos visíveis no frame atual
+            visible_codes = {}
+            for code in codes:
+                try:
+                    data = code.data.decode('utf-8')
+                except Exception:
+                    data = str(code.data)
+                visible_codes[data] = code.type
+
+            # Frames sem códigos também contam: avançam a confirmação K de N e a expiração
+            emitted = self.dedup.observe(visible_codes, current_time, source=self.name, cooldown=self.scan_cooldown,
+                                         confirm=self.confirm)
+            for data in emitted:
+                ctype = visible_codes[data]
+                self.last_code = data
+                self.last_scan_time = current_time
+                self.update_result(f"Tipo: {ctype}, Dados: {data}")
+                self.update_status(f"Código {ctype} detectado!")
+                try:
+                    self.record_scan(data, ctype, current_time)
+                except Exception:
+                    pass
+
+    def build_rtsp_url(self):
+        """Constroi a URL RTSP padrão para câmeras Axis com credenciais codificadas e porta padrão"""
+        # Codificar caracteres especiais em usuário e senha (ex.: @, #, :, etc.)
+        username_enc = quote(self.camera_username or "", safe="")
+        password_enc = quote(self.camera_password or "", safe="")
+
+        host = (self.camera_ip or "").strip()
+        # Adicionar porta padrão 554 se nenhuma porta for especificada
+        # Considera IPv4 comum; se houver ':' assumimos que já há porta.
+        if host and ":" not in host:
+            host = f"{host}:554"
+
+        return f"rtsp://{username_enc}:{password_enc}@{host}/axis-media/media.amp"
+
+    def release_capture(self):
+        try:
+            if self.cap is not None:
+                self.cap.release()
+        except Exception:
+            pass
+        self.cap = None
+
+    def open_rtsp_stream(self):
+        """Abre o stream RTSP da câmera"""
+        try:
+            # Montar URL RTSP corretamente
+            # rtsp://IP:PORT/axis-media/media.amp?camera=1[&resolution=...&fps=...&streamprofile=...]
+            # Credenciais são passadas ao backend, que as codifica (ou usa propriedades próprias, no GStreamer)
+            rtsp_url = media_url(self.camera_ip, self.stream_params)
+
+            logger.info(f"Tentando abrir RTSP ({self.capture_backend}): {rtsp_url}")
+
+            options = dict(self.capture_options)
+            if self.watchdog.enabled and self.watchdog.stall_timeout > 0:
+                # read() não pode bloquear mais que o limite de travamento
+                options.setdefault("read_timeout", self.watchdog.stall_timeout)
+            self.cap = open_capture(self.capture_backend, rtsp_url, self.camera_username,
+                                    self.camera_password, **options)
+
+            # Otimização para baixa latência: buffer pequeno
+            try:
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            except Exception:
+                pass
+
+            if self.cap.isOpened():
+                self.update_status("Stream RTSP aberto com sucesso")
+            else:
+                self.update_status("Falha ao abrir stream RTSP")
+        except Exception as e:
+            logger.error(f"Erro ao abrir RTSP: {e}")
+            self.update_status(f"Erro ao abrir RTSP: {str(e)}")
+
+    def capture_frame(self):
+        """Captura o frame mais recente da thread de captura"""
+        try:
+            # Espera por um novo frame (com timeout para não travar se a câmera cair)
+            start = time.perf_counter()
+            if self.new_frame_event.wait(timeout=0.2):
+                self.metrics.frame_wait.observe(time.perf_counter() - start)
+                self.new_frame_event.clear()
+                with self.frame_lock:
+                    if self.latest_frame is not None:
+                        return self.latest_frame
+        except Exception as e:
+            logger.error(f"Erro ao recuperar frame do buffer: {e}")
+        return None
+
+    def roi_crops(self, frame):
+        """Recorta as ROIs configuradas (views, sem cópia). Retorna [(recorte, dx, dy), ...]."""
+        if not self.rois:
+            return [(frame, 0, 0)]
+        crops = []
+        for x, y, w, h in self.rois:
+            x, y = max(0, x), max(0, y)
+            crops.append((frame[y:y + h, x:x + w], x, y))
+        return crops
+
+    def gate_region(self, frame):
+        """Área observada pelo detector de movimento: a ROI única ou o frame inteiro"""
+        if self.decode_source is not None:
+            # No stream duplo as ROIs estão em pixels da imagem de alta resolução
+            return frame
+        return self.roi_crops(frame)[0][0] if len(self.rois) == 1 else frame
+
+    def decode_regions(self, frame):
+        """Recortes a decodificar: as ROIs estáticas ou, com localizador, só as regiões candidatas nelas"""
+        regions = []
+        for crop, dx, dy in self.roi_crops(frame):
+            if crop.size == 0:
+                continue
+            if self.localizer is None:
+                regions.append((crop, dx, dy))
+                continue
+            for x, y, w, h in self.localizer.find_regions(crop):
+                regions.append((crop[y:y + h, x:x + w], dx + x, dy + y))
+        return regions
+
+    def plan_decode(self, frame):
+        """Regiões a decodificar neste frame, já descontadas as áreas de códigos rastreados"""
+        regions = self.decode_regions(frame)
+        if self.tracker is None:
+            return regions
+        self.tracker.follow(frame)
+        if self.localizer is not None:
+            # Só regiões novas: candidatas cobertas por um rastro firme não vão para o zbar
+            return [r for r in regions if not self.tracker.covers(r[1], r[2], r[0].shape[1], r[0].shape[0])]
+        return regions if self.tracker.needs_decode() else []
+
+    def decode_frame(self, frame):
+        """Decodifica o frame respeitando ROIs/localizador e devolve coordenadas do frame inteiro"""
+        with self.metrics.decode.time():
+            regions = self.plan_decode(frame)
+            results = [(self.decode_barcodes(crop), dx, dy) for crop, dx, dy in regions]
+            return self.accept_decoded(results, frame, decoded=bool(regions))
+
+    def accept_decoded(self, results, frame=None, decoded=True):
+        """Junta os resultados [(códigos, dx, dy), ...] dos recortes em coordenadas do frame e guarda para anotação"""
+        codes = []
+        seen = set()
+        for region_codes, dx, dy in results:
+            for code in region_codes:
+                # Regiões com margem podem se sobrepor: o mesmo código só entra uma vez
+                key = (code.data, code.type)
+                if key in seen:
+                    continue
+                seen.add(key)
+                codes.append(offset_code(code, dx, dy))
+        if self.tracker is not None and frame is not None:
+            # Códigos rastreados continuam "vistos" para a deduplicação, sem nova decodificação
+            codes = self.tracker.confirm(frame, codes, decoded)
+        self.last_codes = codes
+        return codes
+
+    def decode_barcodes(self, image):
+        """Decodifica códigos de barras/QR de uma imagem"""
+        try:
+            if self.pyramid is not None:
+                return self.pyramid.decode(image, self.cascade.decode)
+            return self.cascade.decode(image)
+        except Exception as e:
+            logger.error(f"Erro ao decodificar códigos: {e}")
+            return []
+
+    # ------------------------------------------------------------------
+    # Histórico e relatórios
+    # ------------------------------------------------------------------
+    def record_scan(self, data, ctype, ts):
+        count = 1
+        try:
+            count = self.history.add(data, ctype, ts)
+        except Exception as e:
+            logger.error(f"Erro ao registrar leitura no histórico: {e}")
+        self.metrics.emitted.inc()
+        if self.scan_store is not None:
+            self.scan_store.add(self.name, data, ctype, ts)
+        try:
+            self.append_live_record(data, ts, count)
+        except Exception:
+            pass
+        self.emit("on_code", data, ctype, ts, count)
+
+    def generate_report(self, dir_path=None):
+        """Gera o relatório XLSX da sessão (streaming, memória constante). Retorna o caminho salvo ou None."""
+        try:
+            total = len(self.history)
+            if not total:
+                self.update_result("Nenhum código lido para relatório")
+                return None
+            ts = time.strftime("%Y%m%d-%H%M%S")
+            base = dir_path or self.report_dir or os.getcwd()
+            # Gerar apenas o relatório detalhado conforme solicitado
+            report_path = os.path.join(base, f"axis_codes_{self.report_file_tag()}{ts}.xlsx")
+
+            # Só as leituras existentes no início da exportação; novas leituras continuam chegando
+            records = ((ts, data) for ts, _, data in itertools.islice(self.history.records(), total))
+
+            def _progress(done, total):
+                self.update_status(f"Exportando relatório: {done}/{total} leituras")
+
+            write_xlsx_report(report_path, records, total=total, count_of=self.history.count,
+                               progress=_progress)
+
+            self.update_result(f"Relatório salvo: {report_path}")
+            self.update_status("Relatório gerado com sucesso")
+            return report_path
+        except Exception as e:
+            self.update_status(f"Erro ao gerar relatórios: {str(e)}")
+            return None
+
+    def generate_report_async(self, dir_path=None, on_done=None):
+        """Gera o relatório em segundo plano; on_done(caminho ou None) é chamado na thread de exportação"""
+        if self.export_thread is not None and self.export_thread.is_alive():
+            self.update_status("Exportação já em andamento")
+            return False
+
+        def _export():
+            path = self.generate_report(dir_path)
+            if on_done is not None:
+                try:
+                    on_done(path)
+                except Exception as e:
+                    logger.error(f"Erro após exportar relatório: {e}")
+
+        self.export_thread = threading.Thread(target=_export, name="xlsx-export", daemon=True)
+        self.export_thread.start()
+        return True
+
+    def report_file_tag(self):
+        return f"{self.report_tag}_" if self.report_tag else ""
+
+    def start_live_report(self, dir_path=None):
+        try:
+            ts = time.strftime("%Y%m%d-%H%M%S")
+            base = dir_path or os.getcwd()
+            self.live_report_path = os.path.join(base, f"axis_codes_live_{self.report_file_tag()}{ts}.csv")
+            self.live_report_writer = LiveReportWriter(self.live_report_path, name=self.name,
+                                                       **self.live_report_options)
+            self.update_result(f"Relatório em tempo real: {self.live_report_path}")
+            self.update_status(f"Relatório gravado a cada {self.live_report_writer.commit_interval:g} s")
+        except Exception as e:
+            self.live_report_path = None
+            self.live_report_writer = None
+            self.update_status(f"Erro ao iniciar relatório: {str(e)}")
+
+    def stop_live_report(self):
+        try:
+            if self.live_report_writer:
+                # Chamado também da thread da interface: não espera indefinidamente por um disco travado
+                self.live_report_writer.close(timeout=2.0)
+        except Exception:
+            pass
+        self.live_report_writer = None
+        self.live_report_path = None
+
+    def append_live_record(self, data, ts, count=1):
+        try:
+            if self.live_report_writer:
+                self.live_report_writer.append(data, ts, count)
+        except Exception:
+            pass
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Parâmetros de stream VAPIX e modo de stream duplo.
+
+O media.amp da Axis aceita parâmetros como resolution, fps, compression,
+videocodec e streamprofile; assim a câmera entrega um substream leve em vez
+da resolução/fps máximos.
+
+No modo duplo, o stream contínuo é o de baixa resolução (visualização e
+detecção de movimento) e a imagem de decodificação só é obtida quando há
+atividade: um snapshot JPEG em alta resolução (axis-cgi/jpg/image.cgi) ou o
+último frame de um segundo stream RTSP de alta resolução, aberto sob demanda
+e fechado depois de um período ocioso.
+"""
+
+import logging
+import threading
+import time
+from urllib.parse import urlencode
+
+import cv2
+import numpy as np
+import requests
+from requests.auth import HTTPDigestAuth
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros aceitos pelo media.amp / image.cgi (VAPIX)
+STREAM_PARAMS = ("resolution", "fps", "compression", "videocodec", "streamprofile", "videokeyframeinterval")
+DUAL_SOURCES = ("snapshot", "stream")
+
+
+def split_host_port(camera_ip):
+    """'ip' ou 'ip:porta' → (ip, ':porta' ou '')"""
+    ip_clean = camera_ip
+    port_part = ""
+    if ":" in camera_ip:
+        parts = camera_ip.split(":")
+        # Se for apenas IP:Porta (ex: 192.168.0.90:554)
+        if len(parts) == 2:
+            ip_clean = parts[0]
+            port_part = f":{parts[1]}"
+    return ip_clean, port_part
+
+
+def media_url(camera_ip, params=None, camera=1):
+    """URL RTSP do media.amp com os parâmetros de stream informados (sem credenciais)"""
+    ip_clean, port_part = split_host_port(camera_ip)
+    query = {"camera": camera}
+    for key, value in (params or {}).items():
+        if key in STREAM_PARAMS and value not in (None, ""):
+            query[key] = value
+    return f"rtsp://{ip_clean}{port_part}/axis-media/media.amp?{urlencode(query)}"
+
+
+class SnapshotSource:
+    """Snapshot JPEG em alta resolução sob demanda, com sessão HTTP reaproveitada.
+
+    Com background=True a requisição sai em uma thread própria: frame() nunca
+    bloqueia e devolve o último snapshot ainda não entregue (ou None).
+    """
+
+    def __init__(self, host, username, password, params=None, gray=False, min_interval=0.2, timeout=3.0,
+                 background=False):
+        self.url = f"http://{host}/axis-cgi/jpg/image.cgi"
+        self.params = {k: v for k, v in (params or {}).items() if k in ("resolution", "compression", "camera")}
+        self.params.setdefault("camera", 1)
+        self.gray = gray
+        self.min_interval = min_interval  # intervalo mínimo entre snapshots com movimento contínuo
+        self.timeout = timeout
+        self.background = background
+        self.session = requests.Session()
+        self.session.auth = HTTPDigestAuth(username, password)
+        self.lock = threading.Lock()
+        self.fetching = False
+        self.ready = None  # (imagem, instante) do último snapshot em segundo plano ainda não entregue
+        self.last_fetch = 0.0
+        self.fetched = 0
+
+    def frame(self):
+        now = time.monotonic()
+        if not self.background:
+            if now - self.last_fetch < self.min_interval:
+                return None
+            self.last_fetch = now
+            return self.fetch()
+        with self.lock:
+            ready, self.ready = self.ready, None
+            if not self.fetching and now - self.last_fetch >= self.min_interval:
+                self.fetching = True
+                self.last_fetch = now
+                threading.Thread(target=self.fetch_background, name="snapshot", daemon=True).start()
+        # Snapshot antigo (ex.: pedido no fim da janela anterior) não é decodificado
+        if ready is None or now - ready[1] > max(1.0, 2 * self.min_interval):
+            return None
+        return ready[0]
+
+    def fetch_background(self):
+        image = None
+        try:
+            image = self.fetch()
+        finally:
+            with self.lock:
+                if image is not None:
+                    self.ready = (image, time.monotonic())
+                self.fetching = False
+
+    def fetch(self):
+        try:
+            resp = self.session.get(self.url, params=self.params, timeout=self.timeout)
+            if resp.status_code != 200:
+                logger.warning(f"Snapshot falhou. Status: {resp.status_code}")
+                return None
+            flag = cv2.IMREAD_GRAYSCALE if self.gray else cv2.IMREAD_COLOR
+            image = cv2.imdecode(np.frombuffer(resp.content, dtype=np.uint8), flag)
+            if image is not None:
+                self.fetched += 1
+            return image
+        except Exception as e:
+            logger.error(f"Erro ao obter snapshot: {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+class HighResStreamSource:
+    """Segundo stream RTSP em alta resolução, aberto só enquanto há atividade.
+
+    A abertura (que pode levar segundos) e a leitura rodam em uma thread
+    própria: frame() nunca bloqueia e devolve None (o chamador usa o frame do
+    stream leve) até chegar o primeiro frame em alta resolução. Falhas de
+    abertura são repetidas com espera crescente, não a cada frame.
+    """
+
+    def __init__(self, open_fn, idle_seconds=10.0, retry_delay=1.0, max_retry_delay=30.0):
+        self.open_fn = open_fn                  # callable que devolve um backend de captura aberto
+        self.idle_seconds = idle_seconds
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lock = threading.Lock()
+        self.cap = None
+        self.thread = None
+        self.latest = None
+        self.last_request = 0.0
+        self.running = False
+        self.failures = 0
+        self.next_attempt = 0.0                 # antes disso não tenta abrir de novo (após falha)
+
+    def frame(self):
+        now = time.monotonic()
+        self.last_request = now
+        with self.lock:
+            if not self.running and now >= self.next_attempt:
+                self.running = True
+                self.latest = None
+                self.thread = threading.Thread(target=self.read_loop, name="highres", daemon=True)
+                self.thread.start()
+            return self.latest
+
+    def open(self):
+        try:
+            cap = self.open_fn()
+        except Exception as e:
+            logger.error(f"Erro ao abrir stream de alta resolução: {e}")
+            cap = None
+        if cap is not None and cap.isOpened():
+            self.failures = 0
+            logger.info("Stream de alta resolução aberto (atividade detectada)")
+            return cap
+        if cap is not None:
+            try:
+                cap.release()
+            except Exception:
+                pass
+        delay = min(self.max_retry_delay, self.retry_delay * (2 ** self.failures))
+        self.failures += 1
+        self.next_attempt = time.monotonic() + delay
+        logger.warning(f"Falha ao abrir stream de alta resolução; nova tentativa em {delay:.1f} s "
+                       f"(até lá, decodificação no stream principal)")
+        return None
+
+    def read_loop(self):
+        cap = self.open()
+        with self.lock:
+            if cap is None or not self.running:
+                self.running = False
+                if cap is not None:
+                    cap.release()  # close() chamado durante a abertura
+                return
+            self.cap = cap
+        while self.running:
+            if time.monotonic() - self.last_request > self.idle_seconds:
+                logger.info("Stream de alta resolução fechado (ocioso)")
+                break
+            ret, frame = cap.read()
+            if ret:
+                with self.lock:
+                    self.latest = frame
+            else:
+                time.sleep(0.01)
+        with self.lock:
+            self.running = False
+            try:
+                cap.release()
+            except Exception:
+                pass
+            self.cap = None
+            self.latest = None
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Detecção de stream parado e política de reconexão com recuo exponencial.
+
+O capture_loop informa cada frame lido (com o timestamp do stream, quando o
+backend o fornece) e pergunta se o stream travou:
+
+- sem frame há mais de stall_timeout segundos (queda de rede, câmera
+  reiniciando, read() devolvendo falha);
+- timestamps congelados: frames continuam chegando, mas a posição do stream
+  não avança há frozen_timeout segundos (decodificador repetindo o último
+  quadro). Só é considerado depois que a posição avançou ao menos uma vez,
+  para backends/streams sem timestamp.
+
+A própria thread de captura fecha e reabre o stream, esperando entre as
+tentativas initial_delay, initial_delay*factor, ... até max_delay (com
+jitter, para várias câmeras não reconectarem em sincronia). Reconexões e o
+tempo total fora do ar vão para o log e para as métricas.
+"""
+
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StreamWatchdog:
+    def __init__(self, stall_timeout=5.0, frozen_timeout=10.0, initial_delay=1.0, max_delay=30.0, factor=2.0,
+                 jitter=0.2, enabled=True):
+        self.enabled = enabled
+        self.stall_timeout = stall_timeout
+        self.frozen_timeout = frozen_timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.reconnects = 0       # reaberturas bem-sucedidas
+        self.failed_attempts = 0  # tentativas de reabertura sem sucesso (total)
+        self.downtime = 0.0       # segundos fora do ar, somando todas as quedas já encerradas
+        self.reset()
+
+    def reset(self):
+        """Stream (re)aberto: começa a contar a partir de agora"""
+        now = time.monotonic()
+        self.last_frame = now
+        self.last_position = None
+        self.position_moved = False
+        self.last_position_change = now
+        self.attempt = 0
+        self.down_since = None
+
+    def frame(self, position=None):
+        now = time.monotonic()
+        self.last_frame = now
+        if position is None:
+            return
+        if self.last_position is None or position != self.last_position:
+            if self.last_position is not None:
+                self.position_moved = True
+            self.last_position = position
+            self.last_position_change = now
+
+    def stalled(self):
+        """Motivo do travamento ou None se o stream está saudável"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        if now - self.last_frame > self.stall_timeout:
+            return f"sem frames há {now - self.last_frame:.1f} s"
+        if self.position_moved and self.frozen_timeout and now - self.last_position_change > self.frozen_timeout:
+            return f"timestamps congelados há {now - self.last_position_change:.1f} s"
+        return None
+
+    def stream_lost(self):
+        """Marca o início da queda no último frame recebido (idempotente enquanto a queda durar)"""
+        if self.down_since is None:
+            self.down_since = min(self.last_frame, time.monotonic())
+
+    def next_delay(self):
+        """Espera antes da próxima tentativa de reabertura"""
+        delay = min(self.max_delay, self.initial_delay * (self.factor ** self.attempt))
+        self.attempt += 1
+        if self.jitter:
+            delay *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def attempt_failed(self):
+        self.failed_attempts += 1
+
+    def reconnected(self):
+        """Stream reaberto: devolve quantos segundos ficou fora do ar"""
+        outage = time.monotonic() - self.down_since if self.down_since is not None else 0.0
+        self.downtime += outage
+        self.reconnects += 1
+        self.reset()
+        return outage
+
+    def current_outage(self):
+        return time.monotonic() - self.down_since if self.down_since is not None else 0.0
+
+    def summary(self):
+        return (f"{self.reconnects} reconexões, {self.downtime + self.current_outage():.1f} s fora do ar, "
+                f"{self.failed_attempts} tentativas sem sucesso")
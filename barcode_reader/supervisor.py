@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Supervisor multi-câmera: vários streams RTSP em um único processo.
+
+Cada câmera tem o seu ScannerEngine (captura + deduplicação + relatórios), mas a
+decodificação é feita por um pool fixo de workers compartilhado. O escalonador
+atende as câmeras em rodízio e guarda apenas o frame mais recente de cada uma,
+de modo que uma câmera movimentada não consegue monopolizar os workers.
+"""
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import cv2
+
+from decode_cascade import DecodeCascade
+from code_dedup import CodeDeduplicator, parse_confirm
+from code_tracker import CodeTracker
+from decode_pyramid import DecodePyramid
+from localizer import BarcodeLocalizer
+from metrics import REGISTRY
+from motion_gate import MotionGate
+from scan_history import ScanHistory
+from scanner_engine import LoggingListener, ScannerEngine
+from trigger import TriggerController
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_IDS = itertools.count()
+
+
+@dataclass
+class CameraConfig:
+    """Configuração de uma câmera do supervisor"""
+    ip: str
+    username: str = "root"
+    password: str = ""
+    name: str = ""
+    http_port: Optional[int] = None  # porta do axis-cgi, se não for a 80
+    cooldown: float = 30
+    confirm: Optional[Tuple[int, int]] = None  # (K, N): emite após K leituras em N frames; None = padrão
+    rois: List[Tuple[int, int, int, int]] = field(default_factory=list)  # [(x, y, w, h), ...]
+    localizer: Optional[dict] = None  # parâmetros do BarcodeLocalizer; None = sem localizador
+    tracker: Optional[dict] = None    # parâmetros do CodeTracker; None = sem rastreamento
+    pyramid: Optional[dict] = None    # parâmetros do DecodePyramid; None = só resolução nativa
+    capture: dict = field(default_factory=dict)  # {"backend": "gstreamer", "gray": true, ...}
+    stream: dict = field(default_factory=dict)   # parâmetros VAPIX: {"resolution": "640x360", "fps": 10, ...}
+    history: dict = field(default_factory=dict)      # {"max_recent": 50000, "max_codes": 100000}
+    live_report: dict = field(default_factory=dict)  # {"commit_interval": 1.0, "commit_records": 100}
+    reconnect: dict = field(default_factory=dict)    # {"stall_timeout": 5, "max_delay": 30, ...}
+    dual_stream: Optional[dict] = None  # {"source": "snapshot"|"stream", "params": {...}}; None = stream único
+    trigger: Optional[dict] = None  # {"source": "input"|"http", "port": 1, "duration": 1.0, ...}; None = contínuo
+    cascade: str = "sequential"   # "sequential" ou "parallel"
+    adaptive_cascade: bool = False
+    motion: Optional[dict] = None   # parâmetros do MotionGate; None = decodifica todos os frames
+
+    @classmethod
+    def from_dict(cls, data):
+        # "roi": [x, y, w, h] (uma faixa) ou "rois": [[x, y, w, h], ...]
+        rois = data.get("rois") or ([data["roi"]] if data.get("roi") else [])
+        return cls(
+            ip=data["ip"],
+            username=data.get("username", "root"),
+            password=data.get("password") or os.environ.get("AXIS_PASSWORD", ""),
+            name=data.get("name") or data["ip"],
+            http_port=int(data["http_port"]) if data.get("http_port") else None,
+            cooldown=float(data.get("cooldown", 30)),
+            confirm=parse_confirm(data["confirm"]) if data.get("confirm") else None,
+            rois=[tuple(int(v) for v in roi) for roi in rois],
+            localizer=data.get("localizer"),
+            tracker=data.get("tracker"),
+            pyramid=data.get("pyramid"),
+            capture=dict(data.get("capture") or {}),
+            stream=dict(data.get("stream") or {}),
+            dual_stream=data.get("dual_stream"),
+            trigger=data.get("trigger"),
+            live_report=dict(data.get("live_report") or {}),
+            reconnect=dict(data.get("reconnect") or {}),
+            history=dict(data.get("history") or {}),
+            cascade=data.get("cascade", "sequential"),
+            adaptive_cascade=bool(data.get("adaptive_cascade", False)),
+            motion=data.get("motion"),
+        )
+
+
+def load_camera_configs(path):
+    """Lê a lista de câmeras de um arquivo JSON (lista ou {"cameras": [...]})"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("cameras", [])
+    return [CameraConfig.from_dict(item) for item in data]
+
+
+class DecodeScheduler:
+    """Pool de workers de decodificação compartilhado entre câmeras.
+
+    - Último frame vence: cada câmera tem no máximo um frame pendente.
+    - Rodízio: câmeras com frame pendente entram no fim da fila e uma câmera
+      nunca é decodificada por dois workers ao mesmo tempo.
+    - Teto de CPU: número fixo de workers e, opcionalmente, um limite global
+      de decodificações por segundo somando todas as câmeras.
+    """
+
+    kind = "threads"  # prefixo do rótulo scheduler nas métricas
+
+    def __init__(self, workers=None, max_decode_fps=0, name=None):
+        # Rótulo das métricas: vários escalonadores no mesmo processo não sobrescrevem as séries uns dos outros
+        self.name = name or f"{self.kind}-{next(SCHEDULER_IDS)}"
+        self.workers = max(1, workers or max(1, (os.cpu_count() or 2) - 1))
+        self.max_decode_fps = max_decode_fps
+        self.cond = threading.Condition()
+        self.pending = {}        # engine -> frame mais recente
+        self.ready = deque()     # câmeras aguardando worker, em ordem de chegada
+        self.queued = set()
+        self.busy = set()
+        self.running = False
+        self.threads = []
+        self.next_slot = 0.0     # próximo instante liberado pelo limite global de fps
+        self.dropped_frames = 0
+        REGISTRY.gauge("axis_decode_pending_cameras", "Câmeras com frame aguardando worker",
+                       fn=lambda: len(self.pending), scheduler=self.name)
+        REGISTRY.gauge("axis_decode_busy_workers", "Workers decodificando no momento",
+                       fn=lambda: len(self.busy), scheduler=self.name)
+        REGISTRY.gauge("axis_decode_replaced_frames", "Frames pendentes substituídos por um mais novo",
+                       fn=lambda: self.dropped_frames, scheduler=self.name)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        for i in range(self.workers):
+            t = threading.Thread(target=self.worker_loop, name=f"decode-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.pending.clear()
+            self.ready.clear()
+            self.queued.clear()
+            self.cond.notify_all()
+        for t in self.threads:
+            t.join(timeout=1.0)
+        self.threads = []
+
+    def submit(self, engine, frame):
+        with self.cond:
+            if engine in self.pending:
+                self.dropped_frames += 1
+            self.pending[engine] = frame
+            if engine not in self.busy and engine not in self.queued:
+                self.ready.append(engine)
+                self.queued.add(engine)
+                self.cond.notify()
+
+    def discard(self, engine):
+        """Remove frames pendentes de uma câmera (ex.: ao desconectar)"""
+        with self.cond:
+            self.pending.pop(engine, None)
+            if engine in self.queued:
+                self.queued.discard(engine)
+                self.ready.remove(engine)
+
+    def take(self):
+        with self.cond:
+            while self.running and not self.ready:
+                self.cond.wait(timeout=0.5)
+            if not self.running:
+                return None, None
+            engine = self.ready.popleft()
+            self.queued.discard(engine)
+            self.busy.add(engine)
+            return engine, self.pending.pop(engine)
+
+    def release(self, engine):
+        with self.cond:
+            self.busy.discard(engine)
+            # Chegou frame novo enquanto decodificava: volta para o fim da fila
+            if engine in self.pending and engine not in self.queued:
+                self.ready.append(engine)
+                self.queued.add(engine)
+                self.cond.notify()
+
+    def throttle(self):
+        if self.max_decode_fps <= 0:
+            return
+        with self.cond:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.max_decode_fps
+        if slot > now:
+            time.sleep(slot - now)
+
+    def worker_loop(self):
+        while self.running:
+            engine, frame = self.take()
+            if engine is None:
+                continue
+            try:
+                self.throttle()
+                if engine.scanning:
+                    codes = engine.decode_frame(frame)
+                    engine.process_codes(codes)
+            except Exception as e:
+                logger.error(f"Erro na decodificação ({engine.name}): {e}")
+            finally:
+                self.release(engine)
+
+
+class CameraSupervisor:
+    """Conecta e mantém várias câmeras lendo em paralelo com decodificação compartilhada"""
+
+    def __init__(self, configs: List[CameraConfig], report_dir=None, workers=None, max_decode_fps=0,
+                 scheduler=None, scan_store=None, capability_cache=None, trigger_server=None, dedup=None,
+                 confirm=(1, 1)):
+        self.configs = configs
+        self.report_dir = report_dir
+        # Banco de leituras (ScanStore) compartilhado: as câmeras são identificadas pelo nome
+        self.scan_store = scan_store
+        # Cache de recursos (CapabilityCache) compartilhado: a partida não repete a descoberta por câmera
+        self.capability_cache = capability_cache
+        # Servidor de disparos HTTP (HttpTriggerServer) para as câmeras com "trigger": {"source": "http"}
+        self.trigger_server = trigger_server
+        # Deduplicação compartilhada (CodeDeduplicator): um código lido por uma câmera não é emitido por outra
+        # dentro do cooldown. Sem ela, cada câmera deduplica sozinha. Nos dois casos cada câmera usa o próprio
+        # cooldown e a própria confirmação (K, N) do JSON, ou confirm como padrão.
+        self.dedup = dedup
+        self.confirm = confirm
+        # scheduler permite trocar os workers em thread por um ProcessDecodePool
+        self.scheduler = scheduler or DecodeScheduler(workers=workers, max_decode_fps=max_decode_fps)
+        self.engines = []
+
+    def start(self):
+        """Conecta as câmeras; devolve quantas ficaram ativas (conectadas ou reconectando), 0 = nenhuma"""
+        # Com vários workers em paralelo, threads internas do OpenCV só disputariam CPU
+        if self.scheduler.workers > 1:
+            cv2.setNumThreads(1)
+        self.scheduler.start()
+
+        for cfg in self.configs:
+            engine = ScannerEngine(cfg.ip, cfg.username, cfg.password, scan_cooldown=cfg.cooldown,
+                                   report_dir=self.report_dir, name=cfg.name, rois=cfg.rois,
+                                   decode_scheduler=self.scheduler, report_tag=cfg.name,
+                                   cascade=DecodeCascade(cfg.cascade, cfg.adaptive_cascade),
+                                   motion_gate=MotionGate(**cfg.motion) if cfg.motion is not None else None,
+                                   localizer=BarcodeLocalizer(**cfg.localizer) if cfg.localizer is not None else None,
+                                   tracker=CodeTracker(**cfg.tracker) if cfg.tracker is not None else None,
+                                   pyramid=DecodePyramid(**cfg.pyramid) if cfg.pyramid is not None else None,
+                                   capture_backend=cfg.capture.get("backend", "opencv"),
+                                   capture_options={k: v for k, v in cfg.capture.items() if k != "backend"},
+                                   stream_params=cfg.stream, dual_stream=cfg.dual_stream,
+                                   live_report_options=cfg.live_report, history=ScanHistory(**cfg.history),
+                                   scan_store=self.scan_store, http_port=cfg.http_port,
+                                   capability_cache=self.capability_cache, reconnect=cfg.reconnect,
+                                   trigger=TriggerController(**cfg.trigger, http_server=self.trigger_server)
+                                   if cfg.trigger is not None else None,
+                                   dedup=self.dedup if self.dedup is not None else CodeDeduplicator(cfg.cooldown),
+                                   confirm=cfg.confirm or self.confirm)
+            engine.add_listener(LoggingListener(cfg.name))
+            self.engines.append(engine)
+            # Câmera fora do ar na partida não fica de fora: o motor reabre o stream em segundo plano
+            if engine.connect(retry=engine.watchdog.enabled):
+                engine.start_scanning()
+            else:
+                logger.error(f"[{cfg.name}] Falha ao conectar à câmera")
+
+        # Ativas: stream aberto ou reconectando em segundo plano (StreamWatchdog habilitado)
+        active = sum(1 for e in self.engines if e.connected)
+        connected = sum(1 for e in self.engines if e.connected and e.cap is not None and e.cap.isOpened())
+        logger.info(f"Supervisor ativo: {connected}/{len(self.engines)} câmeras conectadas, "
+                    f"{active - connected} tentando em segundo plano, {self.scheduler.workers} workers")
+        return active
+
+    def stop(self):
+        for engine in self.engines:
+            engine.disconnect()
+            self.scheduler.discard(engine)
+        self.scheduler.stop()
+
+    def generate_reports(self):
+        return [engine.generate_report() for engine in self.engines]
+
+    def close(self):
+        """Libera os recursos das câmeras (histórico em disco) depois do stop() e dos relatórios finais"""
+        for engine in self.engines:
+            engine.close()
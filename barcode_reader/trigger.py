@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Modo disparado: decodifica só dentro de uma janela após cada evento.
+
+Fontes de disparo:
+- input: entrada digital da câmera (ex.: fotocélula na esteira), acompanhada
+  pelo long-poll do VAPIX axis-cgi/io/port.cgi?monitor=1.
+- http: servidor HTTP local (HttpTriggerServer) que recebe GET/POST
+  /trigger?camera=NOME. Serve para CLPs e para as regras de ação da própria
+  câmera ("enviar notificação HTTP"), o que cobre qualquer evento Axis
+  (movimento, análise de vídeo, entrada virtual) sem assinar o stream de eventos.
+  Escuta só em 127.0.0.1 por padrão; para receber da rede, use outro endereço
+  junto com um token (?token=..., cabeçalho X-Trigger-Token ou Bearer).
+
+Cada disparo abre uma janela [t + delay, t + delay + duration]; disparos
+próximos estendem a janela aberta. Fora dela o frame não passa pelo zbar
+(nem pelo detector de movimento) e, com snapshot=True, a decodificação usa um
+JPEG em alta resolução do axis-cgi/jpg/image.cgi em vez do frame do vídeo.
+"""
+
+import hmac
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.auth import HTTPDigestAuth
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_SOURCES = ("input", "http")
+TRIGGER_EDGES = ("rising", "falling", "both")
+
+# Estado da porta no monitor do port.cgi: "1:H", "1:L", "I1:H"; "/" e "\" indicam borda de subida/descida
+PORT_STATE = re.compile(r"I?(\d+)\s*:\s*([HL/\\])")
+
+
+class TriggerWindow:
+    """Janelas de decodificação abertas pelos disparos (sobrepostas são unidas)"""
+
+    def __init__(self, delay=0.0, duration=1.0):
+        self.delay = max(0.0, delay)
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.windows = []  # [[início, fim], ...] em ordem, sem sobreposição
+
+    def fire(self, now=None):
+        now = time.monotonic() if now is None else now
+        start, end = now + self.delay, now + self.delay + self.duration
+        with self.lock:
+            if self.windows and start <= self.windows[-1][1]:
+                self.windows[-1][1] = max(self.windows[-1][1], end)
+            else:
+                self.windows.append([start, end])
+
+    def active(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while self.windows and self.windows[0][1] < now:
+                self.windows.pop(0)
+            return bool(self.windows) and self.windows[0][0] <= now
+
+    def clear(self):
+        with self.lock:
+            self.windows = []
+
+
+class InputPortMonitor:
+    """Acompanha uma entrada digital pelo port.cgi?monitor=1 (multipart contínuo) e reconecta se cair"""
+
+    def __init__(self, host, username, password, port=1, edge="rising", on_edge=None, name=""):
+        self.url = f"http://{host}/axis-cgi/io/port.cgi"
+        self.port = int(port)
+        self.edge = edge
+        self.on_edge = on_edge
+        self.name = name or host
+        self.session = requests.Session()
+        self.session.auth = HTTPDigestAuth(username, password)
+        self.running = False
+        self.response = None
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=f"io-{self.name}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        try:
+            if self.response is not None:
+                self.response.close()
+        except Exception:
+            pass
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.session.close()
+
+    def run(self):
+        delay = 1.0
+        last_state = None
+        while self.running:
+            try:
+                # Tempo de leitura longo: sem mudanças na entrada a câmera não envia nada
+                self.response = self.session.get(self.url, params={"monitor": 1}, stream=True, timeout=(5, 3600))
+                if self.response.status_code != 200:
+                    raise IOError(f"port.cgi respondeu {self.response.status_code}")
+                logger.info(f"[{self.name}] Monitorando a entrada {self.port} ({self.edge})")
+                for line in self.response.iter_lines(chunk_size=1):
+                    if not self.running:
+                        break
+                    delay = 1.0  # a câmera respondeu: a próxima queda volta a esperar pouco
+                    for port, state in PORT_STATE.findall(line.decode("latin-1")):
+                        if int(port) != self.port:
+                            continue
+                        high = state in ("H", "/")
+                        # Nível (H/L) só conta quando muda; o primeiro é o estado atual, não um evento
+                        changed = state in ("/", "\\") or (last_state is not None and high != last_state)
+                        last_state = high
+                        if not changed:
+                            continue
+                        if self.edge == "both" or (self.edge == "rising") == high:
+                            self.on_edge(f"entrada {self.port} {'H' if high else 'L'}")
+            except Exception as e:
+                if self.running:
+                    logger.warning(f"[{self.name}] Monitor da entrada {self.port} caiu: {e}; nova tentativa em "
+                                   f"{delay:.0f} s")
+            finally:
+                self.response = None
+            if self.running:
+                time.sleep(delay)
+                delay = min(30.0, delay * 2)
+
+
+class HttpTriggerServer:
+    """Recebe disparos por HTTP: /trigger?camera=NOME (ou /trigger/NOME); sem nome, vale para a única câmera"""
+
+    def __init__(self, port=9110, host="127.0.0.1", token=None):
+        self.targets = {}  # nome da câmera -> TriggerController
+        self.token = token or None  # exigido em toda requisição, se definido
+        server_ref = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_trigger(self):
+                url = urlsplit(self.path)
+                parts = [p for p in url.path.split("/") if p]
+                if not parts or parts[0] != "trigger":
+                    self.send_error(404)
+                    return
+                query = dict(parse_qsl(url.query))
+                if not server_ref.authorized(query.get("token") or self.headers.get("X-Trigger-Token")
+                                             or self.headers.get("Authorization", "").replace("Bearer ", "", 1)):
+                    self.send_error(403, "Token inválido")
+                    return
+                name = parts[1] if len(parts) > 1 else query.get("camera")
+                target = server_ref.find(name)
+                if target is None:
+                    self.send_error(404, "Câmera desconhecida")
+                    return
+                target.fire("http")
+                body = b"OK\n"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self.handle_trigger()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                self.handle_trigger()
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="trigger-http", daemon=True)
+
+    def authorized(self, token):
+        if self.token is None:
+            return True
+        return bool(token) and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def register(self, name, controller):
+        self.targets[name] = controller
+
+    def unregister(self, name):
+        self.targets.pop(name, None)
+
+    def find(self, name):
+        if name:
+            return self.targets.get(name)
+        if len(self.targets) == 1:
+            return next(iter(self.targets.values()))
+        return None
+
+    def start(self):
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        logger.info(f"Disparos HTTP em http://{host}:{port}/trigger?camera=NOME"
+                    f"{' (com token)' if self.token else ''}")
+        if self.token is None and host not in ("127.0.0.1", "localhost", "::1"):
+            logger.warning("Servidor de disparos aberto na rede sem token: qualquer um pode abrir janelas de leitura")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TriggerController:
+    """Configuração e estado do modo disparado de uma câmera"""
+
+    def __init__(self, source="input", port=1, edge="rising", delay=0.0, duration=1.0, snapshot=False,
+                 snapshot_params=None, snapshot_interval=0.2, http_server=None):
+        if source not in TRIGGER_SOURCES:
+            raise ValueError(f"Fonte de disparo desconhecida: {source}")
+        if edge not in TRIGGER_EDGES:
+            raise ValueError(f"Borda desconhecida: {edge}")
+        self.source = source
+        self.port = port
+        self.edge = edge
+        self.window = TriggerWindow(delay, duration)
+        self.snapshot = snapshot  # decodifica um JPEG em alta resolução em vez do frame do vídeo
+        self.snapshot_params = dict(snapshot_params or {})
+        self.snapshot_interval = snapshot_interval
+        self.http_server = http_server
+        self.engine = None
+        self.monitor = None
+        self.fired = None
+        self.last_source = ""
+
+    def start(self, engine):
+        self.engine = engine
+        self.window.clear()
+        self.fired = REGISTRY.counter("axis_trigger_events_total", "Disparos recebidos", camera=engine.name)
+        if self.source == "input":
+            self.monitor = InputPortMonitor(engine.camera_host(), engine.camera_username, engine.camera_password,
+                                            port=self.port, edge=self.edge, on_edge=self.fire,
+                                            name=engine.name).start()
+        elif self.http_server is not None:
+            self.http_server.register(engine.name, self)
+        else:
+            logger.warning(f"[{engine.name}] Disparo HTTP sem servidor configurado (--trigger-http-port)")
+
+    def stop(self):
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.monitor = None
+        if self.http_server is not None and self.engine is not None:
+            self.http_server.unregister(self.engine.name)
+        self.window.clear()
+
+    def fire(self, source):
+        self.window.fire()
+        self.last_source = source
+        if self.fired is not None:
+            self.fired.inc()
+        if self.engine is not None:
+            logger.info(f"[{self.engine.name}] Disparo ({source})")
+
+    def active(self):
+        return self.window.active()
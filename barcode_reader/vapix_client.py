@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Cliente VAPIX (axis-cgi) persistente, um por câmera.
+
+Todas as chamadas HTTP da câmera passam por uma única thread de trabalho,
+com uma requests.Session keep-alive: a conexão TCP é reaproveitada e o
+HTTPDigestAuth guarda o nonce da thread, então depois do primeiro desafio
+cada comando sai em uma só ida e volta.
+
+Comandos com chave (ex.: "zoom", "focus") são coalescidos: se um comando
+com a mesma chave ainda está na fila, ele é substituído pelo mais novo
+(último valor vence) sem perder a posição. Arrastar o slider gera no
+máximo um comando pendente por chave, em vez de uma thread por movimento.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPDigestAuth
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class VapixClient:
+    def __init__(self, host, username, password, name="", timeout=5.0):
+        self.host = host  # "ip" ou "ip:porta" do axis-cgi
+        self.name = name or host
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = HTTPDigestAuth(username, password)
+        # Uma thread só: basta uma conexão no pool
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.lock = threading.Condition()
+        self.pending = OrderedDict()  # chave -> função; comandos sem chave recebem uma chave única
+        self.sequence = 0
+        self.closed = False
+        self.thread = None
+        self.request_time = REGISTRY.histogram("axis_vapix_request_seconds", "Requisições VAPIX (axis-cgi)",
+                                               camera=self.name)
+        self.coalesced = REGISTRY.counter("axis_vapix_coalesced_total",
+                                          "Comandos VAPIX substituídos por um mais novo antes do envio",
+                                          camera=self.name)
+
+    def url(self, path):
+        return f"http://{self.host}/axis-cgi/{path.lstrip('/')}"
+
+    def get(self, path, params=None, timeout=None):
+        """Requisição síncrona; deve rodar na thread do cliente (dentro de submit) para reaproveitar o digest"""
+        with self.request_time.time():
+            return self.session.get(self.url(path), params=params, timeout=timeout or self.timeout)
+
+    def submit(self, fn, key=None):
+        """Enfileira fn(); com key, substitui um comando ainda pendente com a mesma chave"""
+        with self.lock:
+            if self.closed:
+                return
+            if key is None:
+                self.sequence += 1
+                key = ("once", self.sequence)
+            elif key in self.pending:
+                self.coalesced.inc()
+            self.pending[key] = fn  # atribuir a uma chave existente mantém a posição na fila
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=f"vapix-{self.name}", daemon=True)
+                self.thread.start()
+            self.lock.notify()
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.closed:
+                    self.lock.wait()
+                if self.closed:
+                    break
+                _, fn = self.pending.popitem(last=False)
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"[{self.name}] Erro em comando VAPIX: {e}")
+
+    def close(self):
+        """Descarta os comandos pendentes e encerra a thread (o comando em andamento termina)"""
+        with self.lock:
+            self.closed = True
+            self.pending.clear()
+            self.lock.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.timeout)
+        try:
+            self.session.close()
+        except Exception:
+            pass